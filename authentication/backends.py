@@ -0,0 +1,273 @@
+import datetime
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from authentication.models import TokenRevocation
+
+# Authenticated token, with its user, and expiry time by token key, least recently used first.
+_token_cache = OrderedDict()
+_token_cache_lock = threading.Lock()
+
+# Revocations applied to the token cache, ("key", key) or ("user", user_id), with the time they were applied.
+# Tokens loaded before a matching revocation was applied are not cached.
+_revoked = {}
+# TokenRevocation rows already applied, as (id, key, user_id), with the time they were applied.
+# The target is part of the identity as SQLite reuses the ids of rolled back rows.
+_applied_revocations = {}
+_revocations_lock = threading.Lock()
+_last_revocation_sync = 0.0
+# Revocations recorded before this process started can not affect its cache.
+_revocations_synced_at = timezone.now()
+
+
+def _cache_get(key):
+    with _token_cache_lock:
+        entry = _token_cache.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del _token_cache[key]
+            return None
+        _token_cache.move_to_end(key)
+        return entry[0]
+
+
+def _cache_set(key, token, loaded):
+    ttl = getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60)
+    size = getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 1024)
+    if ttl <= 0 or size <= 0:
+        return
+    with _token_cache_lock:
+        if _revoked.get(("key", key), 0) >= loaded or _revoked.get(("user", token.user_id), 0) >= loaded:
+            # revoked while the token was being loaded
+            return
+        _token_cache[key] = (token, time.monotonic() + ttl)
+        _token_cache.move_to_end(key)
+        while len(_token_cache) > size:
+            _token_cache.popitem(last=False)
+
+
+def invalidate_token(key):
+    """
+    Drop a token from the authentication cache of this process.
+
+    Args:
+        key (str): The token key.
+    """
+    with _token_cache_lock:
+        _revoked[("key", key)] = time.monotonic()
+        _token_cache.pop(key, None)
+
+
+def invalidate_user(*user_ids):
+    """
+    Drop all cached tokens of users from the authentication cache of this process.
+
+    Args:
+        *user_ids (int): The ids of the users.
+    """
+    user_ids = set(user_ids)
+    with _token_cache_lock:
+        now = time.monotonic()
+        for user_id in user_ids:
+            _revoked[("user", user_id)] = now
+        for key in [key for key, (token, _) in _token_cache.items() if token.user_id in user_ids]:
+            del _token_cache[key]
+
+
+def clear_token_cache():
+    """
+    Drop all cached tokens and applied revocations.
+    """
+    with _token_cache_lock:
+        _token_cache.clear()
+        _revoked.clear()
+    with _revocations_lock:
+        _applied_revocations.clear()
+
+
+def _revocation_retention():
+    # a revocation is useless once every token cached before it has expired
+    return getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60) + 2 * getattr(settings, "AUTH_REVOCATION_SYNC_INTERVAL", 5)
+
+
+def _record_revocations(revocations):
+    """
+    Store revocations for the other workers, the tokens are already dropped from the cache of this process.
+    """
+    rows = TokenRevocation.objects.bulk_create([TokenRevocation(**revocation) for revocation in revocations])
+    now = time.monotonic()
+    with _revocations_lock:
+        for row in rows:
+            if row.pk is not None:
+                _applied_revocations[(row.pk, row.key, row.user_id)] = now
+    TokenRevocation.objects.filter(
+        created__lt=timezone.now() - datetime.timedelta(seconds=_revocation_retention())
+    ).delete()
+
+
+def revoke_token(key):
+    """
+    Revoke a token in the authentication cache of all workers, e.g. after it was deleted.
+
+    Args:
+        key (str): The token key.
+    """
+    invalidate_token(key)
+    _record_revocations([{"key": key}])
+
+
+def revoke_user(*user_ids):
+    """
+    Revoke all cached tokens of users in all workers, e.g. after their permissions changed.
+
+    Args:
+        *user_ids (int): The ids of the users.
+    """
+    if not user_ids:
+        return
+    invalidate_user(*user_ids)
+    _record_revocations([{"user_id": user_id} for user_id in user_ids])
+
+
+def sync_revocations(force=False):
+    """
+    Apply the revocations recorded by other workers to the token cache of this process,
+    at most every AUTH_REVOCATION_SYNC_INTERVAL seconds.
+
+    Args:
+        force (bool, optional): Whether to sync before the interval has passed. Defaults to False.
+    """
+    global _last_revocation_sync, _revocations_synced_at
+    interval = getattr(settings, "AUTH_REVOCATION_SYNC_INTERVAL", 5)
+    with _revocations_lock:
+        now = time.monotonic()
+        if not force and now - _last_revocation_sync < interval:
+            return
+        _last_revocation_sync = now
+        # overlaps the previous sync, rows committed late are picked up and applied rows skipped
+        since = _revocations_synced_at - datetime.timedelta(seconds=interval)
+        _revocations_synced_at = timezone.now()
+        rows = TokenRevocation.objects.filter(created__gte=since).values_list("id", "key", "user_id")
+        revocations = [row for row in rows if row not in _applied_revocations]
+        for row in revocations:
+            _applied_revocations[row] = now
+        for row in [row for row, applied in _applied_revocations.items() if now - applied > 3 * interval]:
+            del _applied_revocations[row]
+    for _, key, user_id in revocations:
+        if key:
+            invalidate_token(key)
+        if user_id is not None:
+            invalidate_user(user_id)
+    with _token_cache_lock:
+        for target in [target for target, applied in _revoked.items() if now - applied > interval]:
+            del _revoked[target]
+
+
+def token_expires(token):
+    """
+    Get the expiry time of a token, AUTH_TOKEN_TTL seconds after it was created.
+
+    Args:
+        token (Token): The token.
+
+    Returns:
+        datetime: The expiry time, None if tokens do not expire.
+    """
+    ttl = getattr(settings, "AUTH_TOKEN_TTL", 0)
+    if ttl <= 0:
+        return None
+    return token.created + datetime.timedelta(seconds=ttl)
+
+
+def token_expired(token):
+    """
+    Check if a token has expired.
+
+    Args:
+        token (Token): The token.
+
+    Returns:
+        bool: True if the token has expired.
+    """
+    expires = token_expires(token)
+    return expires is not None and expires <= timezone.now()
+
+
+def issue_token(user, rotate=False):
+    """
+    Get a valid token of a user, an expired token is replaced by a new one.
+
+    Args:
+        user (User): The user.
+        rotate (bool, optional): Whether to replace the token even if it is still valid. Defaults to False.
+
+    Returns:
+        Token: The token of the user.
+    """
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and (rotate or token_expired(token)):
+        token.delete()
+        token = Token.objects.create(user=user)
+    return token
+
+
+def delete_expired_tokens():
+    """
+    Delete the expired tokens.
+
+    Returns:
+        int: The number of deleted tokens.
+    """
+    ttl = getattr(settings, "AUTH_TOKEN_TTL", 0)
+    if ttl <= 0:
+        return 0
+    deleted, _ = Token.objects.filter(created__lte=timezone.now() - datetime.timedelta(seconds=ttl)).delete()
+    return deleted
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication caching the token's user for AUTH_TOKEN_CACHE_TTL seconds,
+    so authenticated requests do not query the token and user tables every time.
+    The cache holds at most AUTH_TOKEN_CACHE_SIZE tokens and drops a token when it is deleted
+    or its user is saved or deleted, in other workers within AUTH_REVOCATION_SYNC_INTERVAL seconds.
+    Tokens expire AUTH_TOKEN_TTL seconds after they were issued.
+    """
+
+    def authenticate_credentials(self, key):
+        sync_revocations()
+        token = _cache_get(key)
+        if token is None:
+            loaded = time.monotonic()
+            user, token = super().authenticate_credentials(key)
+            _cache_set(key, token, loaded)
+        if token_expired(token):
+            invalidate_token(key)
+            raise AuthenticationFailed("Token has expired.")
+        return token.user, token
+
+
+@receiver(post_delete, sender=Token)
+def _token_deleted(sender, instance, **kwargs):
+    if token_expired(instance):
+        # expired tokens are rejected by every worker anyway
+        invalidate_token(instance.key)
+    else:
+        revoke_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def _user_changed(sender, instance, **kwargs):
+    revoke_user(instance.pk)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from authentication.backends import delete_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete the expired authentication tokens."
+
+    def handle(self, *args, **options):
+        deleted = delete_expired_tokens()
+        self.stdout.write(f"Deleted {deleted} expired tokens.")
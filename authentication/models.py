@@ -0,0 +1,13 @@
+from django.db import models
+
+
+class TokenRevocation(models.Model):
+    """
+    Revoked token, or all tokens of a user, that other workers must drop from their token cache.
+    Rows are only kept as long as a revoked token may still be cached.
+    """
+    key = models.CharField(max_length=40, null=True, blank=True)
+    user_id = models.IntegerField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = models.Manager()
@@ -42,5 +42,6 @@ class TestAuthentication(APITestCase):
 
     @classmethod
     def tearDownClass(cls):
+        cls._rollback_atomics(cls.cls_atomics)
         cls.user.delete()
         return cls
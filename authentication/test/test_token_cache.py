@@ -0,0 +1,82 @@
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from authentication.backends import clear_token_cache, sync_revocations
+from authentication.test.test_authentication import TestAuthentication
+
+
+class TestTokenCache(TestAuthentication):
+
+    def setUp(self):
+        clear_token_cache()
+        result = super().setUp()
+        # no revocation sync is due while the queries are counted
+        sync_revocations(force=True)
+        return result
+
+    def test_cached_token_skips_auth_queries(self):
+        """
+        Testing only the first request of a token queries the token and its user.
+        """
+        with self.assertNumQueries(2):
+            # token with user, then the requested user
+            assert self.client.get("/auth/user/test_admin").status_code == 200
+        with self.assertNumQueries(1):
+            assert self.client.get("/auth/user/test_admin").status_code == 200
+
+    def test_admin_check_uses_cached_user(self):
+        """
+        Testing admin only apis do not query the token owner again.
+        """
+        assert self.client.get("/auth/users").status_code == 200
+        with self.assertNumQueries(1):
+            # the user list only
+            assert self.client.get("/auth/users").status_code == 200
+
+    def test_logout_invalidates_token(self):
+        """
+        Testing a logged out token is rejected although it was cached.
+        """
+        assert self.client.get("/auth/user/test_admin").status_code == 200
+        assert self.client.post("/auth/logout").status_code == 200
+        assert not Token.objects.filter(user=self.user).exists()
+        assert self.client.get("/auth/user/test_admin").status_code == 401
+
+    def test_token_delete_invalidates_token(self):
+        """
+        Testing a token deleted from the db is rejected although it was cached.
+        """
+        assert self.client.get("/auth/user/test_admin").status_code == 200
+        Token.objects.filter(user=self.user).delete()
+        assert self.client.get("/auth/user/test_admin").status_code == 401
+
+    def test_user_change_invalidates_token(self):
+        """
+        Testing a revoked admin is denied admin apis immediately.
+        """
+        create_resp = self.client.post(
+            path="/auth/user/register", format="json", data={
+                "username": "test_user",
+                "email": "test_user@gmail.com",
+                "first_name": "first_name",
+                "last_name": "last_name",
+                "password": "test@123"
+            },
+        )
+        assert create_resp.status_code == 200
+        assert self.client.put(
+            path="/auth/user/is_admin/true", format="json", data={"email": "test_user@gmail.com"}
+        ).status_code == 200
+        login_resp = self.client.post("/auth/login", {"username": "test_user", "password": "test@123"})
+        user_client = APIClient()
+        user_client.credentials(HTTP_AUTHORIZATION=f"Token {login_resp.json()['token']}")
+        assert user_client.get("/auth/users").status_code == 200
+
+        assert self.client.put(
+            path="/auth/user/is_admin/false", format="json", data={"email": "test_user@gmail.com"}
+        ).status_code == 200
+        assert user_client.get("/auth/users").status_code == 403
+
+        self.user.is_staff = False
+        self.user.save()
+        assert self.client.get("/auth/users").status_code == 403
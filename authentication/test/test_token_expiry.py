@@ -0,0 +1,161 @@
+import datetime
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from authentication.backends import clear_token_cache, sync_revocations
+from authentication.models import TokenRevocation
+from authentication.test.test_authentication import TestAuthentication
+
+
+class TestTokenExpiry(TestAuthentication):
+
+    def setUp(self):
+        clear_token_cache()
+        return super().setUp()
+
+    def _expire_token(self, user):
+        Token.objects.filter(user=user).update(created=timezone.now() - datetime.timedelta(days=2))
+
+    def _register_user(self, username, is_staff=False):
+        resp = self.client.post(
+            path="/auth/user/register", format="json", data={
+                "username": username,
+                "email": f"{username}@gmail.com",
+                "first_name": "first_name",
+                "last_name": "last_name",
+                "password": "test@123"
+            },
+        )
+        assert resp.status_code == 200
+        if is_staff:
+            assert self.client.put(
+                path="/auth/user/is_admin/true", format="json", data={"email": f"{username}@gmail.com"}
+            ).status_code == 200
+        client = APIClient()
+        login_resp = client.post("/auth/login", {"username": username, "password": "test@123"})
+        client.credentials(HTTP_AUTHORIZATION=f"Token {login_resp.json()['token']}")
+        return client
+
+    def test_login_returns_expiry(self):
+        """
+        Testing login returns when the token expires.
+        """
+        resp = self.client.post("/auth/login", {"username": "test_admin", "password": "test@123"})
+        assert resp.status_code == 200
+        token = Token.objects.get(user=self.user)
+        assert resp.json()["expires"] == (token.created + datetime.timedelta(days=1)).isoformat().replace(
+            "+00:00", "Z"
+        )
+
+    def test_expired_token_rejected(self):
+        """
+        Testing an expired token is rejected and replaced on the next login.
+        """
+        old_key = Token.objects.get(user=self.user).key
+        self._expire_token(self.user)
+        resp = self.client.get("/auth/user/test_admin")
+        assert resp.status_code == 401
+        assert resp.json()["detail"] == "Token has expired."
+
+        resp = self.client.post("/auth/login", {"username": "test_admin", "password": "test@123"})
+        assert resp.status_code == 200
+        assert resp.json()["token"] != old_key
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {resp.json()['token']}")
+        assert self.client.get("/auth/user/test_admin").status_code == 200
+
+    @override_settings(AUTH_REVOCATION_SYNC_INTERVAL=60)
+    def test_cached_token_expires_without_queries(self):
+        """
+        Testing the expiry of a cached token is checked without querying it.
+        """
+        assert self.client.get("/auth/users").status_code == 200
+        later = timezone.now() + datetime.timedelta(days=2)
+        with mock.patch("authentication.backends.timezone.now", return_value=later), self.assertNumQueries(0):
+            assert self.client.get("/auth/users").status_code == 401
+
+    def test_refresh_token(self):
+        """
+        Testing a refreshed token replaces the old token, which is rejected although it was cached.
+        """
+        assert self.client.get("/auth/user/test_admin").status_code == 200
+        resp = self.client.post("/auth/token/refresh")
+        assert resp.status_code == 200
+        assert self.client.get("/auth/user/test_admin").status_code == 401
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {resp.json()['token']}")
+        assert self.client.get("/auth/user/test_admin").status_code == 200
+
+    def test_logout_all(self):
+        """
+        Testing logout all rejects the cached tokens of all users.
+        """
+        user_client = self._register_user("test_user")
+        assert user_client.get("/auth/user/test_user").status_code == 200
+        assert self.client.get("/auth/user/test_admin").status_code == 200
+        resp = self.client.post("/auth/logout_all")
+        assert resp.status_code == 200
+        assert not Token.objects.exists()
+        assert user_client.get("/auth/user/test_user").status_code == 401
+        assert self.client.get("/auth/user/test_admin").status_code == 401
+
+    def test_logout_all_of_user(self):
+        """
+        Testing logout all of one user keeps the tokens of the other users.
+        """
+        user_client = self._register_user("test_user")
+        assert user_client.get("/auth/user/test_user").status_code == 200
+        resp = self.client.post("/auth/logout_all", {"username": "test_user"}, format="json")
+        assert resp.status_code == 200
+        assert user_client.get("/auth/user/test_user").status_code == 401
+        assert self.client.get("/auth/user/test_admin").status_code == 200
+
+    def test_logout_all_requires_admin(self):
+        """
+        Testing only admins can logout all users.
+        """
+        user_client = self._register_user("test_user")
+        assert user_client.post("/auth/logout_all").status_code == 403
+        assert Token.objects.filter(user=self.user).exists()
+
+    def test_revocation_of_other_worker(self):
+        """
+        Testing revocations recorded by another worker are applied to the token cache on the next sync.
+        """
+        user_client = self._register_user("test_user", is_staff=True)
+        assert user_client.get("/auth/users").status_code == 200
+        user = User.objects.get(username="test_user")
+        # another worker revokes admin rights, this worker only learns from the revocation table
+        User.objects.filter(pk=user.pk).update(is_staff=False)
+        TokenRevocation.objects.create(user_id=user.pk)
+        with override_settings(AUTH_REVOCATION_SYNC_INTERVAL=60):
+            assert user_client.get("/auth/users").status_code == 200
+        sync_revocations(force=True)
+        assert user_client.get("/auth/users").status_code == 403
+
+    def test_revocations_pruned(self):
+        """
+        Testing revocations are only kept while a revoked token may still be cached.
+        """
+        TokenRevocation.objects.create(user_id=0)
+        TokenRevocation.objects.filter(user_id=0).update(created=timezone.now() - datetime.timedelta(hours=1))
+        self._register_user("test_user")
+        assert not TokenRevocation.objects.filter(user_id=0).exists()
+        assert TokenRevocation.objects.exists()
+
+    def test_clear_expired_tokens(self):
+        """
+        Testing the command deletes only the expired tokens.
+        """
+        self._register_user("test_user")
+        self._expire_token(self.user)
+        out = StringIO()
+        call_command("clear_expired_tokens", stdout=out)
+        assert "Deleted 1 expired tokens." in out.getvalue()
+        assert not Token.objects.filter(user=self.user).exists()
+        assert Token.objects.filter(user__username="test_user").exists()
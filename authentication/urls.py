@@ -5,6 +5,9 @@ from authentication import views
 urlpatterns = [
     path("user/register", views.RegisterView.as_view()),
     path('login', views.LoginView.as_view(), name="login"),
+    path("logout", views.LogoutView.as_view(), name="logout"),
+    path("logout_all", views.LogoutAllView.as_view(), name="logout_all"),
+    path("token/refresh", views.RefreshTokenView.as_view(), name="token_refresh"),
     path("user/change_password", views.ChangePasswordView.as_view()),
     path("user/delete", views.DeleteUserView.as_view()),
     path("users", views.UserList.as_view()),
@@ -8,6 +8,7 @@ from rest_framework.views import APIView
 
 from log_manager.logger import get_backend_logger
 from orca_backend import settings
+from .backends import issue_token, revoke_user, token_expires
 from .permission import IsAdmin
 from .serializers import RegisterSerializer
 
@@ -62,6 +63,8 @@ class LoginView(APIView):
     """
     This Used to login user based on username name and password
     """
+    # an expired token sent along must not prevent getting a new one
+    authentication_classes = []
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
@@ -85,14 +88,98 @@ class LoginView(APIView):
             if not user.check_password(raw_password=data["password"]):
                 _logger.error("Invalid credentials")
                 return Response({'message': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
-            token, created = Token.objects.get_or_create(user=user)
+            token = issue_token(user)
             _logger.info("User logged in successfully.")
-            return Response({'token': token.key}, status=status.HTTP_200_OK)
+            return Response({'token': token.key, 'expires': token_expires(token)}, status=status.HTTP_200_OK)
         except Exception as e:
             _logger.error("Error while login user: %s", str(e))
             return Response(data={"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class LogoutView(APIView):
+    """
+    This Used to logout user by deleting the token of the request.
+    """
+
+    def post(self, request):
+        """
+        A function to delete the token of the user.
+
+        Parameters:
+        - request: The Django request object.
+
+        Returns:
+        - If successful, returns a JSON response with 200 ok status.
+        - If fails returns a JSON response with 500 status.
+        """
+        try:
+            # deleting the token also drops it from the authentication cache
+            request.auth.delete()
+            _logger.info("User logged out successfully.")
+            return Response({"message": "Successfully logged out."}, status=status.HTTP_200_OK)
+        except Exception as e:
+            _logger.error("Error while logout user: %s", str(e))
+            return Response(data={"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class LogoutAllView(APIView):
+    """
+    This Used to logout all users, or one user, by deleting their tokens.
+    """
+    permission_classes = [IsAdmin]
+
+    def post(self, request):
+        """
+        A function to delete the tokens of all users or of the given user.
+
+        Parameters:
+        - request: The Django request object.
+
+        Returns:
+        - If successful, returns a JSON response with 200 ok status.
+        - If fails returns a JSON response with 500 status.
+
+        Optional Keys:
+        - username.
+        """
+        try:
+            tokens = Token.objects.all()
+            if username := request.data.get("username"):
+                tokens = tokens.filter(user__username=username)
+            # deleting the tokens also revokes them in the authentication cache of all workers
+            count, _ = tokens.delete()
+            _logger.info("Logged out %s users.", count)
+            return Response({"message": f"Successfully logged out {count} users."}, status=status.HTTP_200_OK)
+        except Exception as e:
+            _logger.error("Error while logout users: %s", str(e))
+            return Response(data={"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class RefreshTokenView(APIView):
+    """
+    This Used to replace the token of the request by a new token.
+    """
+
+    def post(self, request):
+        """
+        A function to rotate the token of the user.
+
+        Parameters:
+        - request: The Django request object.
+
+        Returns:
+        - If successful, returns a JSON response with the new token details and 200 ok status.
+        - If fails returns a JSON response with 500 status.
+        """
+        try:
+            token = issue_token(request.user, rotate=True)
+            _logger.info("Token refreshed successfully.")
+            return Response({'token': token.key, 'expires': token_expires(token)}, status=status.HTTP_200_OK)
+        except Exception as e:
+            _logger.error("Error while refreshing token: %s", str(e))
+            return Response(data={"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class GetUserView(APIView):
     """
     Class to get user based on username.
@@ -236,7 +323,10 @@ class UpdateUserView(APIView):
             data = request.data
             email = data.pop("email", "")
             update_data = {k: v for k, v in data.items() if k not in ["is_staff", "is_superuser", "password"]}
-            User.objects.filter(email=email).update(**update_data)
+            user_ids = list(User.objects.filter(email=email).values_list("pk", flat=True))
+            User.objects.filter(pk__in=user_ids).update(**update_data)
+            # queryset updates send no signals, so cached tokens of the users are dropped explicitly
+            revoke_user(*user_ids)
             _logger.info("User updated successfully.")
             return Response(data={"message": "Update successful."}, status=status.HTTP_200_OK)
         except KeyError as e:
@@ -275,7 +365,10 @@ class UpdateIsStaffView(APIView):
             data = request.data
             email = data.pop("email", "")
             update_data = {"is_staff": True if kwargs.get("value") == "true" else False}
-            User.objects.filter(email=email).update(**update_data)
+            user_ids = list(User.objects.filter(email=email).values_list("pk", flat=True))
+            User.objects.filter(pk__in=user_ids).update(**update_data)
+            # queryset updates send no signals, so cached tokens of the users are dropped explicitly
+            revoke_user(*user_ids)
             _logger.info("User updated successfully.")
             return Response(data={"message": "Update successful."}, status=status.HTTP_200_OK)
         except KeyError as e:
@@ -0,0 +1,148 @@
+"""
+Benchmark JSON rendering and response compression of large API responses.
+
+Payloads resemble the responses of device_interfaces_list (interfaces of every device),
+get_logs (logs with their request and response) and celery_task (install results of many devices).
+Each payload is rendered with DRF's JSONRenderer and ORJSONRenderer, and the rendered JSON
+is compressed with gzip, as CompressionMiddleware does, and brotli if it is installed.
+
+Usage:
+    python benchmarks/json_compression.py [--devices 16] [--interfaces 64] [--logs 500] [--tasks 200] [--repeat 20]
+"""
+import argparse
+import datetime
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def interfaces_payload(devices, interfaces):
+    return [
+        {
+            "mgt_ip": f"10.10.130.{device}",
+            "name": f"Ethernet{port * 4}",
+            "enabled": port % 3 != 0,
+            "mtu": 9100,
+            "fec": "FEC_DISABLED",
+            "speed": "SPEED_100GB",
+            "oper_sts": "UP" if port % 3 else "DOWN",
+            "admin_sts": "UP" if port % 3 else "DOWN",
+            "description": f"link to spine{port % 4} port {port}",
+            "last_chng": "1713257316948612368",
+            "mac_addr": f"0c:18:1f:55:{device:02x}:{port:02x}",
+            "alias": f"Eth1/{port + 1}",
+            "lanes": ",".join(str(lane) for lane in range(port * 4, port * 4 + 4)),
+            "valid_speeds": "10000,25000,40000,100000",
+            "adv_speeds": "all",
+            "link_training": "off",
+            "autoneg": "off",
+            "breakout_mode": "1x100G",
+            "breakout_supported": True,
+            "oper_sts_reason": "",
+        }
+        for device in range(devices)
+        for port in range(interfaces)
+    ]
+
+
+def logs_payload(logs):
+    start = datetime.datetime(2024, 4, 16, 8, 0, tzinfo=datetime.timezone.utc)
+    return {
+        "result": [
+            {
+                "id": i,
+                "timestamp": (start + datetime.timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"),
+                "request_json": [{"mgt_ip": f"10.10.130.{i % 16}", "name": f"Ethernet{i % 64 * 4}", "mtu": 9100}],
+                "status": "success" if i % 7 else "failed",
+                "processing_time": f"{(i % 40) / 10:.1f}",
+                "status_code": 200 if i % 7 else 500,
+                "response": {"result": [{"message": f"Ethernet{i % 64 * 4} updated.", "status": "success"}]},
+                "http_method": "PUT",
+                "http_path": "/interfaces",
+            }
+            for i in range(logs)
+        ]
+    }
+
+
+def tasks_payload(tasks):
+    created = datetime.datetime(2024, 4, 16, 8, 0, tzinfo=datetime.timezone.utc)
+    return [
+        {
+            "task_id": f"4c1b1a8e-0000-4000-8000-{i:012d}",
+            "task_name": "orca_setup.tasks.install_task",
+            "status": "SUCCESS",
+            "date_created": created + datetime.timedelta(minutes=i),
+            "date_done": created + datetime.timedelta(minutes=i, seconds=300),
+            "task_kwargs": {"device_ips": [f"10.10.130.{d}" for d in range(8)], "discover_also": True},
+            "result": {
+                f"10.10.130.{d}": {
+                    "output": f"Installed image sonic-4.2.0.bin on 10.10.130.{d}, rebooting.",
+                    "error": "",
+                    "next_task_ids": [f"7f2e0000-0000-4000-8000-{i * 8 + d:012d}"],
+                }
+                for d in range(8)
+            },
+        }
+        for i in range(tasks)
+    ]
+
+
+def measure(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return result, statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=16)
+    parser.add_argument("--interfaces", type=int, default=64, help="Interfaces per device.")
+    parser.add_argument("--logs", type=int, default=500)
+    parser.add_argument("--tasks", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per measurement, the median is reported.")
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    settings.configure(USE_TZ=True)
+    django.setup()
+    from django.utils.text import compress_string
+    from rest_framework.renderers import JSONRenderer
+
+    from orca_backend import middleware
+    from orca_backend.renderers import ORJSONRenderer, orjson
+
+    if orjson is None:
+        print("orjson is not installed, ORJSONRenderer falls back to JSONRenderer.")
+    payloads = {
+        "interfaces": interfaces_payload(args.devices, args.interfaces),
+        "logs": logs_payload(args.logs),
+        "celery_tasks": tasks_payload(args.tasks),
+    }
+    print(f"{'payload':<14}{'renderer':<16}{'render ms':>10}{'bytes':>10}"
+          f"{'gzip ms':>9}{'gzip bytes':>12}{'br ms':>8}{'br bytes':>10}")
+    for name, data in payloads.items():
+        for renderer in (JSONRenderer(), ORJSONRenderer()):
+            content, render_ms = measure(lambda: renderer.render(data, "application/json"), args.repeat)
+            gzipped, gzip_ms = measure(
+                lambda: compress_string(content, max_random_bytes=middleware.CompressionMiddleware.max_random_bytes),
+                args.repeat,
+            )
+            line = (f"{name:<14}{type(renderer).__name__:<16}{render_ms:>10.2f}{len(content):>10}"
+                    f"{gzip_ms:>9.2f}{len(gzipped):>12}")
+            if middleware.brotli:
+                brotli_content, brotli_ms = measure(lambda: middleware.brotli.compress(content, quality=4), args.repeat)
+                line += f"{brotli_ms:>8.2f}{len(brotli_content):>10}"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark concurrent PUT-like writes on SQLite with and without SQLITE_PRAGMAS and SQLITE_TRANSACTION_MODE.
+
+Every simulated PUT does what BlockPutMiddleware, log_request and task_sent do:
+check and set ORCABusyState, store a Logs row and a TaskResult row, then clear the busy state.
+Reader threads list logs and tasks at the same time.
+
+Usage:
+    python benchmarks/sqlite_pragmas.py [--writers 8] [--readers 4] [--requests 200] [--read-interval 0.01]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run(args):
+    import django
+    from django.conf import settings
+
+    from orca_backend import settings as orca_settings
+
+    settings.configure(
+        INSTALLED_APPS=[
+            "django.contrib.contenttypes", "django.contrib.auth",
+            "state_manager", "log_manager", "django_celery_results",
+        ],
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": args.database}},
+        MIGRATION_MODULES={"state_manager": None, "log_manager": None},
+        SQLITE_PRAGMAS=orca_settings.SQLITE_PRAGMAS if args.pragmas else {},
+        SQLITE_TRANSACTION_MODE=(orca_settings.SQLITE_TRANSACTION_MODE or "IMMEDIATE") if args.pragmas else "",
+        DEFAULT_AUTO_FIELD="django.db.models.BigAutoField",
+        USE_TZ=True,
+    )
+    django.setup()
+    import orca_backend.sqlite  # noqa: F401
+    from celery import states
+    from django.core.management import call_command
+    from django.db import connection, OperationalError
+    from django_celery_results.models import TaskResult
+
+    from log_manager.models import Logs
+    from state_manager.models import ORCABusyState, State
+
+    call_command("migrate", run_syncdb=True, verbosity=0)
+    with connection.cursor() as cursor:
+        journal_mode = cursor.execute("PRAGMA journal_mode").fetchone()[0]
+    connection.close()
+
+    errors = []
+    completed = []
+    done = threading.Event()
+    read_latencies = []
+
+    def put_requests(writer):
+        from django.db import connection
+        for i in range(args.requests):
+            device_ip = f"10.{writer}.{i // 250}.{i % 250}"
+            try:
+                if ORCABusyState.objects.filter(device_ip=device_ip).first() is None:
+                    ORCABusyState.update_state(device_ip, State.CONFIG_IN_PROGRESS)
+                Logs.objects.create(
+                    timestamp=time.strftime("%Y-%m-%d %H:%M:%S"), request_json={"mgt_ip": device_ip},
+                    status="success", processing_time="0.01", status_code=200, response={"result": []},
+                    http_method="PUT", http_path="/interfaces",
+                )
+                TaskResult.objects.store_result(
+                    "application/json", "utf-8", f"task-{writer}-{i}", "{}", states.PENDING,
+                    task_kwargs=str({"device_ips": [device_ip]}),
+                )
+                ORCABusyState.objects.filter(device_ip=device_ip).delete()
+                completed.append(device_ip)
+            except OperationalError as e:
+                errors.append(str(e))
+        connection.close()
+
+    def read_requests():
+        from django.db import connection
+        while not done.is_set():
+            start = time.perf_counter()
+            try:
+                list(Logs.objects.order_by("-timestamp")[:10].values())
+                list(TaskResult.objects.order_by("-date_created")[:10])
+                read_latencies.append(time.perf_counter() - start)
+            except OperationalError as e:
+                errors.append(str(e))
+            # a UI polling logs and tasks, not a tight loop competing with the writers for the GIL
+            time.sleep(args.read_interval)
+        connection.close()
+
+    readers = [threading.Thread(target=read_requests) for _ in range(args.readers)]
+    writers = [threading.Thread(target=put_requests, args=(w,)) for w in range(args.writers)]
+    for thread in readers:
+        thread.start()
+    start = time.perf_counter()
+    for thread in writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    for thread in readers:
+        thread.join()
+    read_latencies.sort()
+    print(json.dumps({
+        "journal_mode": journal_mode,
+        "puts_per_second": round(len(completed) / elapsed, 1),
+        "failed_puts": args.writers * args.requests - len(completed),
+        "reads": len(read_latencies),
+        "read_p50_ms": round(read_latencies[len(read_latencies) // 2] * 1000, 2) if read_latencies else None,
+        "read_p99_ms": round(read_latencies[int(len(read_latencies) * 0.99)] * 1000, 2) if read_latencies else None,
+        "errors": len(errors),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--requests", type=int, default=200, help="PUT requests per writer.")
+    parser.add_argument("--read-interval", type=float, default=0.01, help="Seconds between reads per reader.")
+    parser.add_argument("--pragmas", type=int, choices=(0, 1), default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--database", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.pragmas is not None:
+        return run(args)
+    # every profile runs in its own process on a fresh database, settings can only be configured once
+    for pragmas, name in ((0, "default"), (1, "SQLITE_PRAGMAS")):
+        with tempfile.TemporaryDirectory() as directory:
+            output = subprocess.run(
+                [sys.executable, __file__, "--writers", str(args.writers), "--readers", str(args.readers),
+                 "--requests", str(args.requests), "--read-interval", str(args.read_interval),
+                 "--pragmas", str(pragmas),
+                 "--database", os.path.join(directory, "db.sqlite3")],
+                check=True, capture_output=True, text=True,
+            ).stdout
+        print(f"{name:>15}: {output.strip()}")
+
+
+if __name__ == "__main__":
+    main()
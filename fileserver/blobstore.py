@@ -0,0 +1,338 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+import uuid
+
+from fileserver import constants
+from log_manager.logger import get_backend_logger
+
+_logger = get_backend_logger()
+
+# sha256 checksum of each blob by (device, inode), shared by all hard links to the blob.
+_blob_inodes = {}
+_blob_inodes_lock = threading.Lock()
+_last_scan = 0.0
+# Serializes adding and releasing references, so a blob is not deleted while it is being linked.
+_refs_lock = threading.RLock()
+
+
+def get_blobs_path():
+    """
+    Get the path of the content addressed blob store.
+
+    Returns:
+        str: The path of the blob store.
+    """
+    app_directory = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(app_directory, constants.blobs_path)
+
+
+def blob_path(checksum):
+    """
+    Get the path of a blob.
+
+    Args:
+        checksum (str): The sha256 checksum of the blob.
+
+    Returns:
+        str: The path of the blob, <blobs>/<first two characters>/<checksum>.
+    """
+    return os.path.join(get_blobs_path(), checksum[:2], checksum)
+
+
+def _register(path, checksum):
+    stat = os.stat(path)
+    with _blob_inodes_lock:
+        _blob_inodes[(stat.st_dev, stat.st_ino)] = checksum
+
+
+def _scan_blobs():
+    """
+    Rebuild the inode index from the blob store, e.g. for blobs added by another process.
+    """
+    global _last_scan
+    inodes = {}
+    root = get_blobs_path()
+    if os.path.isdir(root):
+        for prefix in os.scandir(root):
+            if not prefix.is_dir() or len(prefix.name) != 2:
+                continue
+            for blob in os.scandir(prefix.path):
+                stat = blob.stat()
+                inodes[(stat.st_dev, stat.st_ino)] = blob.name
+    with _blob_inodes_lock:
+        _blob_inodes.clear()
+        _blob_inodes.update(inodes)
+        _last_scan = time.monotonic()
+
+
+def _link(source, dest):
+    """
+    Atomically replace dest with a hard link to source, or a copy if hard links are not supported.
+    """
+    if os.path.exists(dest) and os.path.samefile(source, dest):
+        # renaming a link over another link to the same file is a no-op that would leave the temp link behind
+        return
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = os.path.join(os.path.dirname(dest), f".{os.path.basename(dest)}.{uuid.uuid4().hex}")
+    try:
+        os.link(source, tmp)
+    except OSError as e:
+        _logger.warning(f"Hard link of {dest} failed, copying the file instead: {e}")
+        shutil.copyfile(source, tmp)
+    os.replace(tmp, dest)
+
+
+def checksum_of(path):
+    """
+    Get the sha256 checksum of a file stored in the blob store without reading it.
+
+    Args:
+        path (str): The path of the file.
+
+    Returns:
+        str: The sha256 checksum, None if the file is not linked to a blob.
+    """
+    stat = os.stat(path)
+    if stat.st_nlink < 2:
+        return None
+    key = (stat.st_dev, stat.st_ino)
+    with _blob_inodes_lock:
+        checksum = _blob_inodes.get(key)
+        scan = checksum is None and time.monotonic() - _last_scan > constants.blob_scan_interval
+    if scan:
+        _scan_blobs()
+        with _blob_inodes_lock:
+            checksum = _blob_inodes.get(key)
+    return checksum
+
+
+def _write_tmp(chunks):
+    """
+    Write content to a temp file in the blob store, calculating its checksum while writing.
+
+    Returns:
+        tuple: The path of the temp file and the sha256 checksum of the content.
+    """
+    tmp_dir = os.path.join(get_blobs_path(), "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    tmp = os.path.join(tmp_dir, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    try:
+        with open(tmp, "wb") as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tmp, digest.hexdigest()
+
+
+def store_blob(chunks):
+    """
+    Store content in the blob store, content that is already stored is not written twice.
+
+    Args:
+        chunks (Iterable[bytes]): The content to store.
+
+    Returns:
+        str: The sha256 checksum of the content.
+    """
+    tmp, checksum = _write_tmp(chunks)
+    try:
+        with _refs_lock:
+            _add_blob(tmp, checksum)
+    finally:
+        os.remove(tmp)
+    return checksum
+
+
+def _add_blob(path, checksum):
+    """
+    Link a file into the blob store under its checksum, unless the blob already exists.
+    Blobs are read-only, files linked to them must be replaced instead of modified in place.
+    """
+    target = blob_path(checksum)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.chmod(path, 0o444)
+        try:
+            os.link(path, target)
+        except FileExistsError:
+            pass
+    _register(target, checksum)
+    return target
+
+
+def store_file(dest, chunks):
+    """
+    Store content under a name, sharing the blob with all files of the same content.
+
+    Args:
+        dest (str): The path of the named file.
+        chunks (bytes | str | Iterable[bytes]): The content of the file.
+
+    Returns:
+        str: The sha256 checksum of the content.
+    """
+    if isinstance(chunks, str):
+        chunks = chunks.encode("utf-8")
+    if isinstance(chunks, bytes):
+        chunks = [chunks]
+    tmp, checksum = _write_tmp(chunks)
+    store_path(dest, tmp, checksum)
+    return checksum
+
+
+def store_path(dest, path, checksum):
+    """
+    Move a complete file into the blob store and name it, e.g. a file downloaded next to the store.
+    The file must be on the same file system as the blob store.
+
+    Args:
+        dest (str): The path of the named file.
+        path (str): The path of the file to store, it is removed afterwards.
+        checksum (str): The sha256 checksum of the file.
+    """
+    try:
+        with _refs_lock:
+            _add_blob(path, checksum)
+            _replace(dest, checksum)
+    finally:
+        os.remove(path)
+
+
+def link_blob(dest, checksum):
+    """
+    Name an already stored blob, without reading or writing its content.
+
+    Args:
+        dest (str): The path of the named file.
+        checksum (str): The sha256 checksum of the blob.
+
+    Returns:
+        bool: True if the blob exists and was linked, False otherwise.
+    """
+    with _refs_lock:
+        if not os.path.exists(blob_path(checksum)):
+            return False
+        _register(blob_path(checksum), checksum)
+        _replace(dest, checksum)
+    return True
+
+
+def _replace(dest, checksum):
+    """
+    Replace dest by a link to a blob, releasing the blob dest referenced before.
+    """
+    previous = checksum_of(dest) if os.path.exists(dest) else None
+    _link(blob_path(checksum), dest)
+    if previous and previous != checksum:
+        _release_blob(previous)
+
+
+def remove_file(path):
+    """
+    Remove a named file and its blob if no other file references it.
+
+    Args:
+        path (str): The path of the named file.
+    """
+    with _refs_lock:
+        checksum = checksum_of(path)
+        os.remove(path)
+        if checksum:
+            _release_blob(checksum)
+
+
+def release_blob(checksum):
+    """
+    Delete a blob that is no longer referenced by any named file.
+
+    Args:
+        checksum (str): The sha256 checksum of the blob.
+    """
+    with _refs_lock:
+        _release_blob(checksum)
+
+
+def _release_blob(checksum):
+    path = blob_path(checksum)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return
+    if stat.st_nlink <= 1:
+        os.remove(path)
+        with _blob_inodes_lock:
+            _blob_inodes.pop((stat.st_dev, stat.st_ino), None)
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            # other blobs share the prefix directory
+            pass
+        _logger.debug(f"Deleted unreferenced blob {checksum}.")
+
+
+def deduplicate(directory):
+    """
+    Move the files of a directory into the blob store, replacing duplicates by hard links to one blob.
+
+    Args:
+        directory (str): The directory to deduplicate, sub directories included.
+
+    Returns:
+        tuple: The number of files stored and the number of bytes saved.
+    """
+    files = 0
+    saved = 0
+    for dirpath, dirnames, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if os.path.islink(path) or checksum_of(path):
+                continue
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(constants.download_chunk_size), b""):
+                    digest.update(chunk)
+            checksum = digest.hexdigest()
+            with _refs_lock:
+                if os.path.exists(blob_path(checksum)):
+                    saved += os.path.getsize(path)
+                    _link(blob_path(checksum), path)
+                else:
+                    _add_blob(path, checksum)
+            files += 1
+    return files, saved
+
+
+def collect_garbage():
+    """
+    Delete blobs that are not referenced by any named file and stale temp files.
+
+    Returns:
+        int: The number of deleted blobs.
+    """
+    deleted = 0
+    root = get_blobs_path()
+    if not os.path.isdir(root):
+        return deleted
+    for prefix in os.scandir(root):
+        if prefix.name == "tmp":
+            for tmp in os.scandir(prefix.path):
+                if time.time() - tmp.stat().st_mtime > constants.blob_scan_interval:
+                    os.remove(tmp.path)
+            continue
+        if not prefix.is_dir() or len(prefix.name) != 2:
+            # e.g. partial downloads waiting to be stored
+            continue
+        with _refs_lock:
+            for blob in os.scandir(prefix.path):
+                if blob.stat().st_nlink <= 1:
+                    os.remove(blob.path)
+                    deleted += 1
+    _scan_blobs()
+    return deleted
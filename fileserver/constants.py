@@ -2,6 +2,24 @@ dhcp_schedule_interval = 15 * 60  # set to 15 minutes in seconds
 dhcp_path = "/etc/dhcp/"
 dhcp_leases_path = "/var/lib/dhcp/dhcpd.leases"
 dhcp_backup_prefix = "dhcpd.conf.orca."
+dhcp_backup_count = 10  # number of dhcp config backups kept on the dhcp server
+dhcp_upload_tmp_path = "/tmp/"
+sftp_chunk_size = 32 * 1024  # bytes written per sftp request when uploading files
 ztp_path = "media/download/ztp"
 ssh_key_path = "~/.ssh/orca/"
 templates_path = "media/templates"
+render_templates_path = "media/render_templates"  # templates with django markup, only read by templates/render
+blobs_path = "media/blobs"
+ssh_pool_idle_timeout = 30 * 60  # close pooled ssh connections unused for 30 minutes
+ssh_pool_max_connections = 4  # maximum idle ssh connections kept per server and user
+ssh_keepalive_interval = 30  # seconds between ssh keepalive packets
+dhcp_scan_max_workers = 8  # number of dhcp servers whose leases are fetched concurrently
+dhcp_lease_actions = ["commit", "release", "expiry"]  # lease event actions accepted by the lease ingest api
+remote_file_cache_max_entries = 64  # remote dhcp files kept in memory, validated by size and mtime
+download_max_concurrency_per_file = 64  # concurrent downloads of the same file, further requests get 503
+download_retry_after = 10  # seconds a client should wait before retrying a download rejected with 503
+download_chunk_size = 64 * 1024  # bytes read per chunk when streaming partial downloads
+file_index_max_cached_size = 1024 * 1024  # files up to this size keep their content cached in the file index
+blob_scan_interval = 60  # minimum seconds between rescans of the blob store for blobs added by other processes
+images_path = "media/download/images"  # installer images cached for device installs, served as <checksum>/<file name>
+image_partial_path = "media/blobs/partial"  # image downloads in progress, kept to resume interrupted downloads
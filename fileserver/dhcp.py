@@ -1,15 +1,82 @@
 import datetime
 import hashlib
+import shlex
+import threading
+import uuid
+from collections import OrderedDict
 
 from fileserver import constants
+from fileserver.dhcp_config import validate_dhcp_config
 from fileserver.models import DHCPServerDetails
-from fileserver.ssh import create_ssh_key_based_authentication, ssh_client_with_private_key, \
-    is_ssh_key_based_authentication_enabled
+from fileserver.ssh import create_ssh_key_based_authentication, is_ssh_key_based_authentication_enabled, \
+    ssh_session, ssh_pool
 from log_manager.logger import get_backend_logger
 
 _logger = get_backend_logger()
 
 
+class RemoteFileCache:
+    """
+    LRU cache of remote file contents keyed by server and path, validated by the size and modification
+    time of the remote file so that unchanged files are not transferred again.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, ip, file_path, attr):
+        """
+        Get the cached content of a remote file if it is unchanged.
+
+        Args:
+            ip (str): The IP address of the server.
+            file_path (str): The path of the remote file.
+            attr (paramiko.SFTPAttributes): The current attributes of the remote file.
+
+        Returns:
+            bytes: The cached content, None if not cached or the file changed.
+        """
+        with self._lock:
+            entry = self._entries.get((ip, file_path))
+            if entry is None or entry[:2] != (attr.st_size, attr.st_mtime):
+                return None
+            self._entries.move_to_end((ip, file_path))
+            return entry[2]
+
+    def put(self, ip, file_path, attr, content):
+        """
+        Store the content of a remote file with the attributes it was read with.
+
+        Args:
+            ip (str): The IP address of the server.
+            file_path (str): The path of the remote file.
+            attr (paramiko.SFTPAttributes): The attributes of the remote file before reading.
+            content (bytes): The content of the remote file.
+        """
+        with self._lock:
+            self._entries[(ip, file_path)] = (attr.st_size, attr.st_mtime, content)
+            self._entries.move_to_end((ip, file_path))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, ip, file_path=None):
+        """
+        Drop cached files of a server, e.g. after writing to it.
+
+        Args:
+            ip (str): The IP address of the server.
+            file_path (str, optional): The path of the remote file, all files of the server if not given.
+        """
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == ip and file_path in (None, k[1])]:
+                del self._entries[key]
+
+
+remote_file_cache = RemoteFileCache(max_entries=constants.remote_file_cache_max_entries)
+
+
 def get_dhcp_backup_file(ip, username, filename):
     """
     Get the specified backup file from the DHCP server.
@@ -22,47 +89,55 @@ def get_dhcp_backup_file(ip, username, filename):
     Returns:
         dict: A dictionary containing the content of the backup file and its name.
     """
-    client = ssh_client_with_private_key(ip, username)
-    with client.open_sftp() as sftp:
-        file_content = get_sftp_file_content(sftp, constants.dhcp_path, filename)
-
-    client.close()
-    return file_content
+    with ssh_session(ip, username) as session:
+        return get_sftp_file_content(session, constants.dhcp_path, filename)
 
 
 def get_dhcp_backup_files_list(ip, username):
     """
     Get the list of backup files from the DHCP server.
+    Only the file metadata is returned, the content of a backup is fetched with get_dhcp_backup_file.
 
     Args:
         ip (str): The IP address of the DHCP server.
         username (str): The username to use for authentication.
 
     Returns:
-        list: A list of dictionaries, each containing the content of a backup file and its name.
+        list: A list of dictionaries, each containing the name, size and modification time of a backup file.
     """
-    client = ssh_client_with_private_key(ip, username)
-    files = []
-    sftp = client.open_sftp()
-    back_files = list_backup_files(sftp, constants.dhcp_path)
-    for f in back_files:
-        files.append(get_sftp_file_content(sftp, constants.dhcp_path, f))
-
-    client.close()
-    return files
-
-
-def get_sftp_file_content(sftp, path, filename):
+    with ssh_session(ip, username) as session:
+        return [
+            {
+                "filename": attr.filename,
+                "size": attr.st_size,
+                "modified": datetime.datetime.fromtimestamp(attr.st_mtime).strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            for attr in list_backup_files(session.sftp, constants.dhcp_path)
+        ]
+
+
+def get_sftp_file_content(session, path, filename):
     """
     Get the specified file from the SFTP server.
+    The file is only transferred if it is not cached or its size or modification time changed.
 
     Args:
-        sftp (paramiko.sftp_client.SFTPClient): An SFTP client object.
+        session (fileserver.ssh.SSHSession): An SSH session to the server.
         path (str): The path to the file on the SFTP server.
         filename (str): The name of the file to retrieve.
     """
-    with sftp.open(f"{path}{filename}", 'r') as f:
-        return {"content": f.read(), "filename": filename}
+    ip = session.key[0]
+    file_path = f"{path}{filename}"
+    attr = session.sftp.stat(file_path)
+    content = remote_file_cache.get(ip, file_path, attr)
+    if content is None:
+        _logger.debug(f"Reading {file_path} from {ip}.")
+        with session.sftp.open(file_path, 'r') as f:
+            if attr.st_size:
+                f.prefetch(attr.st_size)
+            content = f.read()
+        remote_file_cache.put(ip, file_path, attr, content)
+    return {"content": content, "filename": filename}
 
 
 def get_dhcp_config(ip, username):
@@ -76,11 +151,8 @@ def get_dhcp_config(ip, username):
     Returns:
         dict: A dictionary containing the content of the DHCP configuration file.
     """
-    client = ssh_client_with_private_key(ip, username)
-    with client.open_sftp() as sftp:
-        file_content = get_sftp_file_content(sftp, path=constants.dhcp_path, filename="dhcpd.conf")
-    client.close()
-    return file_content
+    with ssh_session(ip, username) as session:
+        return get_sftp_file_content(session, path=constants.dhcp_path, filename="dhcpd.conf")
 
 
 def update_dhcp_access(ip, username, password):
@@ -96,6 +168,9 @@ def update_dhcp_access(ip, username, password):
         None
     """
     try:
+        # Drop pooled connections and cached files, credentials of the server might have changed
+        ssh_pool.close(ip)
+        remote_file_cache.invalidate(ip)
         # Check if SSH access is already enabled
         _logger.info(f"Enabling SSH access on {ip}.")
         if is_ssh_key_based_authentication_enabled(ip, username):
@@ -148,17 +223,18 @@ def delete_dhcp_backup_file(ip, username, file_name: str):
     Returns:
         None
     """
-    client = ssh_client_with_private_key(ip=ip, username=username)
-    stdin, stdout, stderr = client.exec_command(f"sudo rm {constants.dhcp_path}{file_name}")
-    output = stdout.read().decode()
-    error = stderr.read().decode()
-    client.close()
+    with ssh_session(ip, username) as session:
+        stdin, stdout, stderr = session.client.exec_command(f"sudo rm {constants.dhcp_path}{file_name}")
+        output = stdout.read().decode()
+        error = stderr.read().decode()
+    remote_file_cache.invalidate(ip, f"{constants.dhcp_path}{file_name}")
     return output, error
 
 
 def calculate_checksum(content):
     """
-    Calculate the MD5 checksum of the given content after stripping trailing newlines.
+    Calculate the MD5 checksum of the given content as it is written to the DHCP server,
+    i.e. with surrounding whitespace stripped and a single trailing newline.
 
     Args:
         content (str): The content to calculate the checksum for.
@@ -166,13 +242,19 @@ def calculate_checksum(content):
     Returns:
         str: The MD5 checksum as a hexadecimal string.
     """
-    # Strip trailing newlines before calculating the checksum
-    return hashlib.md5(content.strip().encode('utf-8')).hexdigest()
+    return hashlib.md5(_normalize_content(content).encode('utf-8')).hexdigest()
+
+
+def _normalize_content(content):
+    return content.strip() + "\n"
 
 
 def put_dhcp_config(ip, username, content):
     """
     Upload the DHCP configuration file to the DHCP server.
+    The content is validated locally first, invalid configs are rejected without connecting to the server.
+    The current file is compared by its remote checksum, the new content is streamed to a temp file
+    and then backed up, installed and rotated by a single remote command.
 
     Args:
         ip (str): The IP address of the DHCP server.
@@ -181,48 +263,47 @@ def put_dhcp_config(ip, username, content):
 
     Returns:
         None
+
+    Raises:
+        DHCPConfigError: If the content is not a valid dhcpd.conf.
     """
-    client = ssh_client_with_private_key(ip, username)
-    sftp = client.open_sftp()
+    validate_dhcp_config(content)
     dhcp_filename = "dhcpd.conf"
+    with ssh_session(ip, username) as session:
+        client = session.client
+
+        # verify if there are any changes
+        new_checksum = calculate_checksum(content)
+        if get_remote_checksum(client, f"{constants.dhcp_path}{dhcp_filename}") == new_checksum:
+            _logger.info(f"No changes detected in DHCP configuration.")
+            return "", "No changes detected in DHCP configuration."
+
+        _logger.info(f"Updating DHCP configuration on {ip}.")
+
+        tmp_path = f"{constants.dhcp_upload_tmp_path}{dhcp_filename}.orca-upload.{uuid.uuid4().hex}"
+        try:
+            # Stream the new DHCP configuration file to a temp file
+            uploaded_checksum = upload_dhcp_config(session.sftp, tmp_path, content)
+            if uploaded_checksum != new_checksum:
+                raise ValueError("Checksum of the uploaded DHCP configuration does not match.")
+
+            # Backup the old DHCP configuration file and replace it with the new one
+            output, error = install_dhcp_config(
+                client=client, tmp_path=tmp_path, checksum=new_checksum,
+                path=constants.dhcp_path, filename=dhcp_filename,
+            )
 
-    # verify if there are any changes
-    try:
-        current_file_details = get_sftp_file_content(sftp, path=constants.dhcp_path, filename=dhcp_filename)
-        current_content = current_file_details["content"].decode("utf-8")
-    except FileNotFoundError:
-        current_content = ""
-
-    current_checksum = calculate_checksum(current_content)
-    new_checksum = calculate_checksum(content)
-
-    # Check if there are any changes
-    if current_checksum == new_checksum:
-        _logger.info(f"No changes detected in DHCP configuration.")
-        return "", "No changes detected in DHCP configuration."
-
-    _logger.info(f"Updating DHCP configuration on {ip}.")
-
-    try:
-
-        # Backup the old DHCP configuration file before saving the new one
-        backup_old_dhcp_config(client, sftp, path=constants.dhcp_path, filename=dhcp_filename)
-
-        # Update the DHCP configuration file
-        output, error = update_dhcp_config(
-            client=client, path=constants.dhcp_path, filename=dhcp_filename, content=content
-        )
-
-        # Restart the DHCP server
-        restart_dhcpd(client)
-
-    except Exception as e:
-        _logger.error(f"Failed to update DHCP configuration on {ip}: {e}")
-        raise
+            # Restart the DHCP server
+            if not error:
+                restart_dhcpd(client)
 
-    finally:
-        sftp.close()
-        client.close()
+        except Exception as e:
+            _logger.error(f"Failed to update DHCP configuration on {ip}: {e}")
+            _remove_remote_file(session.sftp, tmp_path)
+            raise
+        finally:
+            # The file may have changed within the mtime resolution of the cache
+            remote_file_cache.invalidate(ip)
 
     return output, error
 
@@ -243,56 +324,94 @@ def restart_dhcpd(client):
     _logger.debug("stderr: " + stderr.read().decode())
 
 
-def update_dhcp_config(client, path, filename, content):
+def get_remote_checksum(client, file_path):
     """
-    Update the DHCP configuration file on the DHCP server.
+    Get the MD5 checksum of a file on the remote server without transferring it.
 
     Args:
         client (paramiko.client.SSHClient): An SSH client object.
-        path (str): The path to the DHCP configuration file.
-        filename (str): The name of the DHCP configuration file.
-        content (str): The content of the DHCP configuration file.
+        file_path (str): The path of the remote file.
 
     Returns:
-        None
+        str: The MD5 checksum as a hexadecimal string, empty if the file does not exist.
     """
-    _logger.info(f"Updating DHCP configuration.")
-    stdin, stdout, stderr = client.exec_command(f'sudo tee {path}{filename} <<EOF\n{content}\nEOF')
+    stdin, stdout, stderr = client.exec_command(f"md5sum {shlex.quote(file_path)}")
     output = stdout.read().decode()
-    error = stderr.read().decode()
-    return output, error
+    return output.split()[0] if output else ""
 
 
-def backup_old_dhcp_config(client, sftp, path, filename):
+def upload_dhcp_config(sftp, remote_path, content):
     """
-    Backup the old DHCP configuration file.
+    Stream the DHCP configuration to a file on the DHCP server, calculating the checksum while writing.
 
     Args:
-        client (paramiko.client.SSHClient): An SSH client object.
         sftp (paramiko.SFTPClient): An SFTP client object.
+        remote_path (str): The path of the remote file to write.
+        content (str): The content of the DHCP configuration file.
+
+    Returns:
+        str: The MD5 checksum of the written content as a hexadecimal string.
+    """
+    _logger.info(f"Uploading DHCP configuration to {remote_path}.")
+    data = _normalize_content(content).encode('utf-8')
+    checksum = hashlib.md5()
+    with sftp.open(remote_path, "wb") as f:
+        f.set_pipelined(True)
+        for start in range(0, len(data), constants.sftp_chunk_size):
+            chunk = data[start:start + constants.sftp_chunk_size]
+            checksum.update(chunk)
+            f.write(chunk)
+    return checksum.hexdigest()
+
+
+def install_dhcp_config(client, tmp_path, checksum, path, filename):
+    """
+    Replace the DHCP configuration file with an uploaded temp file in a single remote command.
+    The uploaded file is verified, the old file is backed up, the new file is moved in place atomically
+    and only the newest backups are kept. The uploaded and staged files are removed whether the command
+    succeeds or fails.
+
+    Args:
+        client (paramiko.client.SSHClient): An SSH client object.
+        tmp_path (str): The path of the uploaded temp file.
+        checksum (str): The expected MD5 checksum of the uploaded file.
         path (str): The path to the DHCP configuration file.
         filename (str): The name of the DHCP configuration file.
 
     Returns:
-        None
+        tuple: The output and error of the remote command.
     """
-    _logger.info(f"Backing up old DHCP configuration on {client.get_transport().getpeername()}.")
-    backup_files = list_backup_files(sftp, path)
-    if len(backup_files) > 9:
-        _logger.info(f"Deleting oldest backup file on {client.get_transport().getpeername()}.")
-        for file in backup_files[9:]:
-            stdin, stdout, stderr = client.exec_command(
-                f"sudo rm {path}{file}"
-            )
-            _logger.debug(f"stdout: {stdout.read().decode()}")
-            _logger.debug(f"stderr: {stderr.read().decode()}")
-    new_backup_filename = f"{constants.dhcp_backup_prefix}{datetime.datetime.now().strftime('%Y-%m-%d_%H:%M:%S')}"
-    stdin, stdout, stderr = client.exec_command(
-        f"sudo cp {path}{filename} {path}{new_backup_filename}"
+    _logger.info(f"Installing DHCP configuration on {client.get_transport().getpeername()}.")
+    conf = shlex.quote(f"{path}{filename}")
+    staged = shlex.quote(f"{path}.{filename}.orca-new")
+    tmp = shlex.quote(tmp_path)
+    backup = shlex.quote(
+        f"{path}{constants.dhcp_backup_prefix}{datetime.datetime.now().strftime('%Y-%m-%d_%H:%M:%S')}"
     )
-    _logger.debug(f"stdout: {stdout.read().decode()}")
-    _logger.debug(f"stderr: {stderr.read().decode()}")
-    _logger.info(f"Old DHCP configuration backed up on {client.get_transport().getpeername()}.")
+    # the trap keeps failed steps from leaving the uploaded file behind, it does not change the exit status
+    script = f"trap {shlex.quote(f'rm -f {tmp} {staged}')} EXIT; " + " && ".join([
+        f"echo {checksum}' '{tmp} | md5sum -c --status",
+        f"{{ [ ! -f {conf} ] || cp -p {conf} {backup}; }}",
+        f"install -m 644 {tmp} {staged}",
+        f"mv -f {staged} {conf}",
+        f"{{ ls -1 {shlex.quote(path)}{shlex.quote(constants.dhcp_backup_prefix)}* 2>/dev/null | sort -r "
+        f"| tail -n +{constants.dhcp_backup_count + 1} | xargs -r rm -f; }}",
+    ])
+    stdin, stdout, stderr = client.exec_command(f"sudo sh -c {shlex.quote(script)}")
+    output = stdout.read().decode()
+    error = stderr.read().decode()
+    if stdout.channel.recv_exit_status() != 0 and not error:
+        error = "Failed to install DHCP configuration."
+    _logger.debug(f"stdout: {output}")
+    _logger.debug(f"stderr: {error}")
+    return output, error
+
+
+def _remove_remote_file(sftp, remote_path):
+    try:
+        sftp.remove(remote_path)
+    except IOError:
+        pass
 
 
 def list_backup_files(sftp, path):
@@ -304,14 +423,14 @@ def list_backup_files(sftp, path):
         path (str): The path to the backup files.
 
     Returns:
-        list: A list of backup file names.
+        list: A list of paramiko.SFTPAttributes of the backup files, newest first.
     """
-    backup_files = [file for file in sftp.listdir(path) if file.startswith(constants.dhcp_backup_prefix)]
+    backup_files = [attr for attr in sftp.listdir_attr(path) if attr.filename.startswith(constants.dhcp_backup_prefix)]
 
     # Sort the backup files by date
     backup_files.sort(
         key=lambda x: datetime.datetime.strptime(
-            x.replace(constants.dhcp_backup_prefix, ""), "%Y-%m-%d_%H:%M:%S"
+            x.filename.replace(constants.dhcp_backup_prefix, ""), "%Y-%m-%d_%H:%M:%S"
         ),
         reverse=True,
     )
@@ -0,0 +1,415 @@
+import ipaddress
+import re
+
+_mac_address = re.compile(r"^([0-9a-fA-F]{1,2}:){5}[0-9a-fA-F]{1,2}$")
+_indent = "  "
+
+
+class DHCPConfigError(ValueError):
+    """
+    Raised when a dhcpd.conf is invalid or an edit can not be applied.
+
+    Attributes:
+        errors (list): The validation errors, prefixed with the line number where known.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors if isinstance(errors, list) else [errors]
+        super().__init__("; ".join(self.errors))
+
+
+class Comment:
+    def __init__(self, text, line=0):
+        self.text = text
+        self.line = line
+
+
+class Statement:
+    def __init__(self, text, line=0):
+        self.text = text
+        self.line = line
+
+    @property
+    def words(self):
+        return self.text.split()
+
+
+class Block:
+    def __init__(self, header, line=0, children=None):
+        self.header = header
+        self.line = line
+        self.children = children if children is not None else []
+
+    @property
+    def words(self):
+        return self.header.split()
+
+    @property
+    def kind(self):
+        return self.words[0] if self.words else ""
+
+
+class Subnet:
+    def __init__(self, network, block):
+        self.network = network
+        self.block = block
+        self.ranges = []
+
+
+class Host:
+    def __init__(self, name, block, mac=None, addresses=()):
+        self.name = name
+        self.block = block
+        self.mac = mac
+        self.addresses = list(addresses)
+
+
+def _unquote(word):
+    return word[1:-1] if len(word) > 1 and word[0] == word[-1] == '"' else word
+
+
+def _error(node, message):
+    return f"line {node.line}: {message}" if node.line else message
+
+
+class DHCPConfig:
+    """
+    Parsed dhcpd.conf with an index of its subnets, ranges and host entries.
+    Structured edits are applied to the parsed tree, which is rendered back to text by to_text.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.subnets = []
+        self.hosts = {}
+        self.hosts_by_mac = {}
+        self.hosts_by_ip = {}
+        self.errors = []
+        self._index()
+
+    def _index(self):
+        self.subnets = []
+        self.hosts = {}
+        self.hosts_by_mac = {}
+        self.hosts_by_ip = {}
+        self.errors = []
+        self._index_block(self.root, None)
+
+        ranges = sorted((r for s in self.subnets for r in s.ranges), key=lambda r: r[0])
+        for previous, current in zip(ranges, ranges[1:]):
+            if current[0] <= previous[1]:
+                self.errors.append(_error(current[2], f"range {current[0]} - {current[1]} overlaps another range."))
+
+    def _index_block(self, block, subnet):
+        for node in block.children:
+            if isinstance(node, Block):
+                if node.kind == "subnet":
+                    self._index_block(node, self._index_subnet(node) or subnet)
+                    continue
+                if node.kind == "host":
+                    self._index_host(node)
+                self._index_block(node, subnet)
+            elif isinstance(node, Statement) and node.words[:1] == ["range"]:
+                self._index_range(node, subnet)
+
+    def _index_subnet(self, block):
+        words = block.words
+        if len(words) != 4 or words[2] != "netmask":
+            self.errors.append(_error(block, f"invalid subnet declaration '{block.header}'."))
+            return None
+        try:
+            network = ipaddress.IPv4Network(f"{words[1]}/{words[3]}")
+        except ValueError as e:
+            self.errors.append(_error(block, f"invalid subnet {words[1]} netmask {words[3]}: {e}."))
+            return None
+        for other in self.subnets:
+            if network.overlaps(other.network):
+                self.errors.append(_error(block, f"subnet {network} overlaps subnet {other.network}."))
+        subnet = Subnet(network, block)
+        self.subnets.append(subnet)
+        return subnet
+
+    def _index_range(self, statement, subnet):
+        words = [w for w in statement.words[1:] if w != "dynamic-bootp"]
+        if subnet is None:
+            self.errors.append(_error(statement, "range declared outside of a subnet."))
+            return
+        if len(words) not in (1, 2):
+            self.errors.append(_error(statement, f"invalid range '{statement.text}'."))
+            return
+        try:
+            start = ipaddress.IPv4Address(words[0])
+            end = ipaddress.IPv4Address(words[-1])
+        except ValueError as e:
+            self.errors.append(_error(statement, f"invalid range address: {e}."))
+            return
+        if start > end:
+            self.errors.append(_error(statement, f"range start {start} is greater than range end {end}."))
+        elif start not in subnet.network or end not in subnet.network:
+            self.errors.append(_error(statement, f"range {start} - {end} is outside of subnet {subnet.network}."))
+        else:
+            subnet.ranges.append((start, end, statement))
+
+    def _index_host(self, block):
+        if len(block.words) != 2:
+            self.errors.append(_error(block, f"invalid host declaration '{block.header}'."))
+            return
+        host = Host(_unquote(block.words[1]), block)
+        if host.name in self.hosts:
+            self.errors.append(_error(block, f"duplicate host {host.name}."))
+        for node in block.children:
+            if not isinstance(node, Statement):
+                continue
+            words = node.words
+            if words[:2] == ["hardware", "ethernet"]:
+                mac = words[2].lower() if len(words) == 3 else ""
+                if not _mac_address.match(mac):
+                    self.errors.append(_error(node, f"invalid hardware ethernet address of host {host.name}."))
+                    continue
+                if mac in self.hosts_by_mac:
+                    self.errors.append(_error(
+                        node, f"hardware ethernet {mac} of host {host.name} is already used by host "
+                              f"{self.hosts_by_mac[mac].name}."
+                    ))
+                host.mac = mac
+                self.hosts_by_mac.setdefault(mac, host)
+            elif words[:1] == ["fixed-address"]:
+                for address in " ".join(words[1:]).split(","):
+                    address = address.strip()
+                    try:
+                        ipaddress.IPv4Address(address)
+                    except ValueError:
+                        # fixed-address may also be a hostname resolved by dhcpd
+                        continue
+                    if address in self.hosts_by_ip:
+                        self.errors.append(_error(
+                            node, f"fixed-address {address} of host {host.name} is already used by host "
+                                  f"{self.hosts_by_ip[address].name}."
+                        ))
+                    host.addresses.append(address)
+                    self.hosts_by_ip.setdefault(address, host)
+        self.hosts.setdefault(host.name, host)
+
+    def validate(self):
+        """
+        Raise the validation errors of the config.
+
+        Raises:
+            DHCPConfigError: If the config has errors.
+        """
+        if self.errors:
+            raise DHCPConfigError(list(self.errors))
+
+    def get_subnet(self, ip):
+        """
+        Get the subnet containing the given address.
+
+        Args:
+            ip (str): The IP address or network to look up.
+
+        Returns:
+            Subnet: The subnet, None if no subnet contains the address.
+        """
+        network = ipaddress.IPv4Network(ip, strict=False)
+        return next((s for s in self.subnets if network.subnet_of(s.network)), None)
+
+    def add_host(self, name, mac, ip=None, statements=()):
+        """
+        Add a host entry to the config.
+
+        Args:
+            name (str): The name of the host.
+            mac (str): The hardware ethernet address of the host.
+            ip (str, optional): The fixed address of the host.
+            statements (list, optional): Additional statements of the host, e.g. 'option host-name "sonic"'.
+
+        Raises:
+            DHCPConfigError: If the entry is invalid or conflicts with an existing host.
+        """
+        mac = (mac or "").lower()
+        if not name or not re.match(r"^[\w.-]+$", name):
+            raise DHCPConfigError(f"invalid host name '{name}'.")
+        if not _mac_address.match(mac):
+            raise DHCPConfigError(f"invalid hardware ethernet address '{mac}'.")
+        if name in self.hosts:
+            raise DHCPConfigError(f"host {name} already exists.")
+        if mac in self.hosts_by_mac:
+            raise DHCPConfigError(f"hardware ethernet {mac} is already used by host {self.hosts_by_mac[mac].name}.")
+        children = [Statement(f"hardware ethernet {mac}")]
+        if ip:
+            try:
+                ipaddress.IPv4Address(ip)
+            except ValueError as e:
+                raise DHCPConfigError(f"invalid fixed-address: {e}.")
+            if ip in self.hosts_by_ip:
+                raise DHCPConfigError(f"fixed-address {ip} is already used by host {self.hosts_by_ip[ip].name}.")
+            children.append(Statement(f"fixed-address {ip}"))
+        children.extend(Statement(s.strip().rstrip(";")) for s in statements)
+        self._append(Block(f"host {name}", children=children))
+
+    def add_range(self, start, end):
+        """
+        Add a dynamic range to the subnet containing it.
+
+        Args:
+            start (str): The first address of the range.
+            end (str): The last address of the range.
+
+        Raises:
+            DHCPConfigError: If the range is invalid, outside all subnets or overlaps another range.
+        """
+        try:
+            first = ipaddress.IPv4Address(start)
+            last = ipaddress.IPv4Address(end)
+        except ValueError as e:
+            raise DHCPConfigError(f"invalid range address: {e}.")
+        subnet = self.get_subnet(str(first))
+        if subnet is None or last not in subnet.network:
+            raise DHCPConfigError(f"range {first} - {last} is not inside a subnet.")
+        if first > last:
+            raise DHCPConfigError(f"range start {first} is greater than range end {last}.")
+        for other_start, other_end, _ in subnet.ranges:
+            if first <= other_end and other_start <= last:
+                raise DHCPConfigError(f"range {first} - {last} overlaps range {other_start} - {other_end}.")
+        self._append(Statement(f"range {first} {last}"), parent=subnet.block)
+
+    def _append(self, node, parent=None):
+        parent = parent or self.root
+        # keep new statements ahead of nested blocks, as dhcpd expects declarations after parameters
+        position = len(parent.children)
+        if isinstance(node, Statement):
+            position = next(
+                (i for i, n in enumerate(parent.children) if isinstance(n, Block)), len(parent.children)
+            )
+        parent.children.insert(position, node)
+        self._index()
+        self.validate()
+
+    def to_text(self):
+        """
+        Render the config as dhcpd.conf text.
+
+        Returns:
+            str: The config text.
+        """
+        lines = []
+        self._render(self.root, 0, lines)
+        return "\n".join(lines).strip() + "\n"
+
+    def _render(self, block, depth, lines):
+        prefix = _indent * depth
+        for node in block.children:
+            if isinstance(node, Comment):
+                if node.text or (lines and lines[-1]):
+                    lines.append(f"{prefix}{node.text}" if node.text else "")
+            elif isinstance(node, Statement):
+                lines.append(f"{prefix}{node.text};")
+            else:
+                if depth == 0 and lines and lines[-1]:
+                    lines.append("")
+                lines.append(f"{prefix}{node.header} {{")
+                self._render(node, depth + 1, lines)
+                lines.append(f"{prefix}}}")
+
+
+def parse_dhcp_config(text):
+    """
+    Parse the text of a dhcpd.conf into a DHCPConfig.
+
+    Args:
+        text (str): The dhcpd.conf content.
+
+    Returns:
+        DHCPConfig: The parsed config, semantic errors are collected in its errors attribute.
+
+    Raises:
+        DHCPConfigError: If the text has syntax errors.
+    """
+    root = Block("")
+    stack = [root]
+    errors = []
+    buffer = []
+    line = 1
+    line_start = 0
+    start_line = 0
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == '"':
+            end = i + 1
+            while end < len(text) and text[end] != '"':
+                end += 2 if text[end] == "\\" else 1
+            if end >= len(text):
+                errors.append(f"line {line}: unterminated string.")
+                break
+            start_line = start_line or line
+            buffer.append(text[i:end + 1])
+            line += text.count("\n", i, end + 1)
+            line_start = max(line_start, text.rfind("\n", i, end + 1) + 1)
+            i = end + 1
+            continue
+        if char == "#":
+            end = text.find("\n", i)
+            end = len(text) if end == -1 else end
+            if not "".join(buffer).strip():
+                stack[-1].children.append(Comment(text[i:end].rstrip(), line))
+            i = end
+            continue
+        if char in ";{}":
+            content = "".join(buffer).strip()
+            buffer = []
+            if char == ";":
+                if content:
+                    stack[-1].children.append(Statement(content, start_line))
+            elif char == "{":
+                block = Block(content, start_line or line)
+                stack[-1].children.append(block)
+                stack.append(block)
+            else:
+                if content:
+                    errors.append(f"line {start_line}: expected ';' after '{content}'.")
+                if len(stack) == 1:
+                    errors.append(f"line {line}: unexpected '}}'.")
+                else:
+                    stack.pop()
+            start_line = 0
+        elif char.isspace():
+            if buffer and buffer[-1] != " ":
+                buffer.append(" ")
+            if char == "\n":
+                # keep blank lines between declarations
+                if not buffer and not text[line_start:i].strip():
+                    stack[-1].children.append(Comment("", line))
+                line += 1
+                line_start = i + 1
+        else:
+            start_line = start_line or line
+            buffer.append(char)
+        i += 1
+
+    content = "".join(buffer).strip()
+    if content:
+        errors.append(f"line {start_line}: expected ';' after '{content}'.")
+    for block in stack[1:]:
+        errors.append(f"line {block.line}: block '{block.header}' is not closed.")
+    if errors:
+        raise DHCPConfigError(errors)
+    return DHCPConfig(root)
+
+
+def validate_dhcp_config(text):
+    """
+    Parse and validate the text of a dhcpd.conf.
+
+    Args:
+        text (str): The dhcpd.conf content.
+
+    Returns:
+        DHCPConfig: The parsed config.
+
+    Raises:
+        DHCPConfigError: If the config has syntax or semantic errors.
+    """
+    config = parse_dhcp_config(text)
+    config.validate()
+    return config
@@ -0,0 +1,239 @@
+import io
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from fileserver import constants
+from fileserver.blobstore import checksum_of
+from log_manager.logger import get_backend_logger
+
+_logger = get_backend_logger()
+
+_range_header = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# Number of running downloads per file path.
+_active_downloads = {}
+_active_downloads_lock = threading.Lock()
+
+
+class DownloadLimitExceeded(Exception):
+    """
+    Raised when a file already has the maximum number of concurrent downloads.
+    """
+
+
+@contextmanager
+def download_slot(path):
+    """
+    Context manager reserving one of the concurrent download slots of a file.
+
+    Args:
+        path (str): The path of the file.
+
+    Yields:
+        callable: Releases the slot, may be called more than once. The slot is kept on exit
+            if the release was handed over to the response.
+
+    Raises:
+        DownloadLimitExceeded: If the file has no free download slot.
+    """
+    with _active_downloads_lock:
+        if _active_downloads.get(path, 0) >= constants.download_max_concurrency_per_file:
+            raise DownloadLimitExceeded(f"Too many concurrent downloads of {os.path.basename(path)}.")
+        _active_downloads[path] = _active_downloads.get(path, 0) + 1
+    released = threading.Event()
+
+    def release():
+        if released.is_set():
+            return
+        released.set()
+        with _active_downloads_lock:
+            _active_downloads[path] -= 1
+            if not _active_downloads[path]:
+                del _active_downloads[path]
+
+    try:
+        yield release
+    except BaseException:
+        release()
+        raise
+
+
+class _SlotFile(io.FileIO):
+    """
+    File releasing its download slot when the response closes it.
+    Being a real file it can still be served zero-copy by the server's wsgi.file_wrapper.
+    """
+
+    def __init__(self, path, release):
+        super().__init__(path, "rb")
+        self._release = release
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._release()
+
+
+def file_etag(path, stat):
+    """
+    Get the entity tag of a file, its sha256 checksum if it is in the blob store,
+    otherwise derived from its modification time and size.
+
+    Args:
+        path (str): The path of the file.
+        stat (os.stat_result): The stat of the file.
+
+    Returns:
+        str: The quoted entity tag.
+    """
+    checksum = checksum_of(path)
+    if checksum:
+        return quote_etag(checksum)
+    return quote_etag(f"{stat.st_mtime_ns:x}-{stat.st_size:x}")
+
+
+def parse_range(header, size):
+    """
+    Parse a single byte range of a Range header.
+
+    Args:
+        header (str): The value of the Range header.
+        size (int): The size of the file.
+
+    Returns:
+        tuple: The first and last byte of the range, None if the header is not a single byte range
+            and the whole file should be sent.
+
+    Raises:
+        ValueError: If the range is not satisfiable.
+    """
+    match = _range_header.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    start, end = match.groups()
+    if not start:
+        # suffix range, the last n bytes
+        length = int(end)
+        if not length:
+            raise ValueError("Range not satisfiable.")
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable.")
+    return start, end
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+class _FileRange:
+    """
+    Iterable over a byte range of a file, closing the file when the response is closed.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.start = start
+        self.length = length
+
+    def __iter__(self):
+        self.file.seek(self.start)
+        remaining = self.length
+        while remaining > 0:
+            chunk = self.file.read(min(constants.download_chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+def serve_file(request, path, filename):
+    """
+    Build the response for downloading a file, with conditional GET, single byte ranges,
+    a cap on concurrent downloads per file and optional offloading to the web server.
+
+    Args:
+        request (HttpRequest): The download request.
+        path (str): The path of the file.
+        filename (str): The file name sent in the Content-Disposition header.
+
+    Returns:
+        HttpResponse: The file response, 304/412 for conditional requests, 416 for unsatisfiable ranges
+            or 503 if the file has too many concurrent downloads.
+    """
+    stat = os.stat(path)
+    etag = file_etag(path, stat)
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return response
+
+    sendfile_header = getattr(settings, "FILESERVER_SENDFILE_HEADER", "")
+    if sendfile_header:
+        # the web server serves the file, including ranges, e.g. nginx X-Accel-Redirect or X-Sendfile
+        response = HttpResponse()
+        if sendfile_header == "X-Accel-Redirect":
+            # nginx serves the media directory from an internal location
+            media_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), "media")
+            response[sendfile_header] = (
+                f"{settings.FILESERVER_SENDFILE_ROOT.rstrip('/')}/{os.path.relpath(path, media_root)}"
+            )
+        else:
+            response[sendfile_header] = path
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    try:
+        byte_range = parse_range(request.headers.get("Range"), stat.st_size) \
+            if _if_range_matches(request, etag, last_modified) else None
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+
+    try:
+        with download_slot(path) as release:
+            file = _SlotFile(path, release)
+            if byte_range is None:
+                response = FileResponse(file, as_attachment=True, filename=filename)
+            else:
+                start, end = byte_range
+                if end == stat.st_size - 1:
+                    # ranges up to the end of the file, e.g. resumed downloads, are still sent as a file
+                    file.seek(start)
+                    response = FileResponse(file, as_attachment=True, filename=filename, status=206)
+                else:
+                    response = StreamingHttpResponse(_FileRange(file, start, end - start + 1), status=206)
+                    response["Content-Type"] = "application/octet-stream"
+                    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+                response["Content-Length"] = str(end - start + 1)
+                response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+    except DownloadLimitExceeded as e:
+        _logger.warning(e)
+        response = HttpResponse(str(e), status=503)
+        response["Retry-After"] = str(constants.download_retry_after)
+        return response
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
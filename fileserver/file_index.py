@@ -0,0 +1,218 @@
+import datetime
+import hashlib
+import os
+import threading
+
+from fileserver import constants
+from fileserver.blobstore import checksum_of
+
+# File index per directory path.
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class FileEntry:
+    """
+    Metadata of an indexed file and its lazily loaded checksum and content.
+    """
+
+    def __init__(self, name, size, mtime_ns, inode=None):
+        self.name = name
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.checksum = None
+        self.content = None
+
+    def is_current(self, stat):
+        # files replaced by a link to an existing blob keep the blob's mtime, so the inode is compared too
+        return (self.size, self.mtime_ns, self.inode) == (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def to_dict(self):
+        return {
+            "filename": self.name,
+            "size": self.size,
+            "modified": datetime.datetime.fromtimestamp(self.mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M:%S"),
+            "checksum": self.checksum,
+        }
+
+
+class FileIndex:
+    """
+    Index of the files in a directory with their size, modification time and sha256 checksum.
+    Listings only stat the files, checksums and contents are computed once per file version
+    and invalidated when the size or modification time of a file changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def list(self):
+        """
+        List the files of the directory, sub directories are skipped.
+
+        Returns:
+            list: A list of FileEntry objects sorted by name, empty if the directory does not exist.
+        """
+        if not os.path.isdir(self.path):
+            with self._lock:
+                self._entries.clear()
+            return []
+        entries = {}
+        with os.scandir(self.path) as it:
+            for dir_entry in it:
+                if dir_entry.is_file():
+                    entries[dir_entry.name] = self._entry(dir_entry.name, dir_entry.stat())
+        with self._lock:
+            self._entries = entries
+        return [entries[name] for name in sorted(entries)]
+
+    def get(self, name):
+        """
+        Get the up to date entry of a file.
+
+        Args:
+            name (str): The name of the file.
+
+        Returns:
+            FileEntry: The entry of the file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        path = os.path.join(self.path, name)
+        stat = os.stat(path)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"No such file: '{path}'")
+        entry = self._entry(name, stat)
+        with self._lock:
+            self._entries[name] = entry
+        return entry
+
+    def read(self, name):
+        """
+        Get the text content of a file, cached until the file changes.
+
+        Args:
+            name (str): The name of the file.
+
+        Returns:
+            str: The content of the file.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+        """
+        entry = self.get(name)
+        content = entry.content
+        if content is None:
+            with open(os.path.join(self.path, name), "r") as f:
+                content = f.read()
+            if entry.size <= constants.file_index_max_cached_size:
+                entry.content = content
+        return content
+
+    def stored_checksum(self, entry):
+        """
+        Get the sha256 checksum of an indexed file if the blob store knows it, without reading the file.
+
+        Args:
+            entry (FileEntry): The entry of the file.
+
+        Returns:
+            str: The sha256 checksum as a hexadecimal string, None if the file is not stored as a blob.
+        """
+        if entry.checksum is None:
+            entry.checksum = checksum_of(os.path.join(self.path, entry.name))
+        return entry.checksum
+
+    def checksum(self, entry):
+        """
+        Get the sha256 checksum of an indexed file, computed once per file version.
+
+        Args:
+            entry (FileEntry): The entry of the file.
+
+        Returns:
+            str: The sha256 checksum as a hexadecimal string.
+        """
+        if self.stored_checksum(entry) is None:
+            digest = hashlib.sha256()
+            with open(os.path.join(self.path, entry.name), "rb") as f:
+                for chunk in iter(lambda: f.read(constants.download_chunk_size), b""):
+                    digest.update(chunk)
+            entry.checksum = digest.hexdigest()
+        return entry.checksum
+
+    def rename(self, old_name, new_name):
+        """
+        Move the index entry of a renamed file, keeping its checksum and cached content.
+
+        Args:
+            old_name (str): The old name of the file.
+            new_name (str): The new name of the file.
+        """
+        with self._lock:
+            entry = self._entries.pop(old_name, None)
+            if entry is not None:
+                entry.name = new_name
+                self._entries[new_name] = entry
+
+    def remove(self, name):
+        """
+        Drop the index entry of a deleted or rewritten file.
+
+        Args:
+            name (str): The name of the file.
+        """
+        with self._lock:
+            self._entries.pop(name, None)
+
+    def _entry(self, name, stat):
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None or not entry.is_current(stat):
+            entry = FileEntry(name, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        return entry
+
+
+def get_file_index(path) -> FileIndex:
+    """
+    Get the file index of a directory.
+
+    Args:
+        path (str): The path of the directory.
+
+    Returns:
+        FileIndex: The index of the directory.
+    """
+    path = os.path.abspath(path)
+    with _indexes_lock:
+        if path not in _indexes:
+            _indexes[path] = FileIndex(path)
+        return _indexes[path]
+
+
+def list_files(path, with_checksum=False):
+    """
+    List the metadata of the files in a directory.
+    Without with_checksum no file is read, only checksums already known to the blob store are listed.
+
+    Args:
+        path (str): The path of the directory.
+        with_checksum (bool, optional): Whether to compute the sha256 checksum of files not stored as blobs.
+            Defaults to False.
+
+    Returns:
+        list: A list of dictionaries with filename, size, modified and checksum of each file.
+    """
+    index = get_file_index(path)
+    files = []
+    for entry in index.list():
+        if with_checksum:
+            index.checksum(entry)
+        else:
+            index.stored_checksum(entry)
+        files.append(entry.to_dict())
+    return files
@@ -0,0 +1,228 @@
+import re
+import threading
+
+from isc_dhcp_leases import IscDhcpLeases, Lease
+from isc_dhcp_leases.iscdhcpleases import _extract_properties
+
+from fileserver.ssh import ssh_session
+from log_manager.logger import get_backend_logger
+
+_logger = get_backend_logger()
+
+# Number of already parsed bytes re-read before the tail to detect a rewritten leases file.
+_marker_size = 64
+
+# Hostnames and vendor classes of switches running or waiting for SONiC.
+_switch_hostname = re.compile(r"sonic|onie", re.IGNORECASE)
+_switch_vendor_class = re.compile(r"sonic|onie", re.IGNORECASE)
+
+# Leases file state per (server ip, leases path).
+_lease_files = {}
+_lease_files_lock = threading.Lock()
+
+
+class LeaseFileState:
+    """
+    Parsed state of a remote dhcpd.leases journal.
+
+    Attributes:
+        lock (threading.Lock): Serializes scans of the same file.
+        size (int): File size at the last scan.
+        mtime (int): File modification time at the last scan.
+        offset (int): Number of bytes parsed so far, always at the end of a complete lease block.
+        marker (bytes): The bytes just before the offset, used to detect a rewritten file.
+        leases (dict): The latest lease per ip address.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the parsed content, the file is parsed again from the beginning on the next scan.
+        """
+        self.size = -1
+        self.mtime = -1
+        self.offset = 0
+        self.marker = b""
+        self.leases = {}
+
+
+def parse_leases(data: str):
+    """
+    Parse the lease blocks in the given leases file content.
+    A lease that appears again later in the journal replaces the earlier one.
+
+    Args:
+        data (str): Content of a leases file, may end with an incomplete block.
+
+    Returns:
+        tuple: A dict of the latest lease per ip and the number of characters up to the end of the last complete block.
+    """
+    leases = {}
+    end = 0
+    for match in IscDhcpLeases.regex_leaseblock.finditer(data):
+        end = match.end()
+        block = match.groupdict()
+        properties, options, sets = _extract_properties(block["config"])
+        if "hardware" not in properties:
+            # E.g. rows like {'binding': 'state abandoned', ...}
+            continue
+        leases[block["ip"]] = Lease(block["ip"], properties=properties, options=options, sets=sets)
+    return leases, end
+
+
+def fetch_leases(ip, username, path):
+    """
+    Get the current leases of a DHCP server.
+    The leases file is only read when its size or modification time changed, and then only the appended
+    tail is transferred and parsed. A rewritten file is detected and parsed again from the beginning.
+
+    Args:
+        ip (str): The IP address of the DHCP server.
+        username (str): The username to use for authentication.
+        path (str): The path of the leases file on the DHCP server.
+
+    Returns:
+        tuple: A dict of the latest lease per ip and whether the leases file changed since the last scan.
+    """
+    with _lease_files_lock:
+        state = _lease_files.setdefault((ip, path), LeaseFileState())
+    with state.lock:
+        return _update_lease_file_state(ip, username, path, state)
+
+
+def _update_lease_file_state(ip, username, path, state):
+    """
+    Read the changes of a remote leases file into its state, see fetch_leases.
+    """
+    with ssh_session(ip, username) as session:
+        attr = session.sftp.stat(path)
+        if attr.st_size == state.size and attr.st_mtime == state.mtime:
+            _logger.debug(f"Leases file on {ip} is unchanged.")
+            return dict(state.leases), False
+        if attr.st_size < state.offset:
+            _logger.info(f"Leases file on {ip} was rewritten, parsing it again.")
+            state.reset()
+        start = state.offset - len(state.marker)
+        data = _read_remote_file(session.sftp, path, start, attr.st_size)
+        if data[:len(state.marker)] != state.marker:
+            _logger.info(f"Leases file on {ip} was rewritten, parsing it again.")
+            state.reset()
+            data = _read_remote_file(session.sftp, path, 0, attr.st_size)
+    data = data[len(state.marker):]
+
+    # surrogateescape keeps the character and byte offsets of undecodable bytes in sync
+    text = data.decode("utf-8", errors="surrogateescape")
+    leases, end = parse_leases(text)
+    parsed = text[:end].encode("utf-8", errors="surrogateescape")
+    state.leases.update(leases)
+    state.offset += len(parsed)
+    state.marker = (state.marker + parsed)[-_marker_size:]
+    state.size = attr.st_size
+    state.mtime = attr.st_mtime
+    _logger.debug(f"Parsed {len(leases)} leases from {len(data)} bytes of the leases file on {ip}.")
+    return dict(state.leases), True
+
+
+def get_cached_leases(ip, path):
+    """
+    Get the leases of the last successful scan of a DHCP server.
+
+    Args:
+        ip (str): The IP address of the DHCP server.
+        path (str): The path of the leases file on the DHCP server.
+
+    Returns:
+        dict: The latest lease per ip, empty if the server was never scanned.
+    """
+    state = _lease_files.get((ip, path))
+    if state is None:
+        return {}
+    with state.lock:
+        return dict(state.leases)
+
+
+def _read_remote_file(sftp, path, start, size):
+    """
+    Read a remote file from the given offset up to the given size.
+
+    Args:
+        sftp (paramiko.SFTPClient): An SFTP client object.
+        path (str): The path of the remote file.
+        start (int): The offset to start reading from.
+        size (int): The size of the remote file.
+
+    Returns:
+        bytes: The content of the file between start and size.
+    """
+    length = max(size - start, 0)
+    with sftp.open(path, "rb") as f:
+        f.seek(start)
+        if length:
+            f.prefetch(length)
+        return f.read(length)
+
+
+def forget_lease_files(servers):
+    """
+    Drop the cached leases file state of servers that are no longer configured.
+
+    Args:
+        servers (list): IP addresses of the configured DHCP servers.
+    """
+    with _lease_files_lock:
+        for key in [key for key in _lease_files if key[0] not in servers]:
+            del _lease_files[key]
+
+
+class DiscoveredDeviceIndex:
+    """
+    Hashed index of the management IPs and MACs of discovered devices, built once per scan.
+    """
+
+    def __init__(self, devices):
+        self.ips = set()
+        self.macs = set()
+        for device in devices or []:
+            if device.get("mgt_ip"):
+                self.ips.add(device["mgt_ip"])
+            if device.get("mac"):
+                self.macs.add(device["mac"].lower())
+
+    def __contains__(self, lease):
+        return lease.ip in self.ips or (lease.ethernet or "").lower() in self.macs
+
+
+def is_switch_candidate(lease):
+    """
+    Check if a lease belongs to a SONiC or ONIE switch, based on its hostname or vendor class.
+
+    Args:
+        lease (Lease): The lease to check.
+
+    Returns:
+        bool: True if the lease looks like a SONiC or ONIE switch.
+    """
+    if lease.hostname and _switch_hostname.search(lease.hostname):
+        return True
+    vendor_class = lease.sets.get("vendor-class-identifier") or lease.options.get("vendor-class-identifier")
+    return bool(vendor_class and _switch_vendor_class.search(vendor_class))
+
+
+def lease_from_event(event: dict):
+    """
+    Build a lease from a pushed lease event.
+
+    Args:
+        event (dict): The lease event with ip, mac, hostname and optionally vendor_class.
+
+    Returns:
+        Lease: The lease of the event.
+    """
+    properties = {"binding": "state active", "hardware": f"ethernet {event.get('mac', '')}"}
+    if event.get("hostname"):
+        properties["client-hostname"] = f"\"{event['hostname']}\""
+    sets = {"vendor-class-identifier": event["vendor_class"]} if event.get("vendor_class") else {}
+    return Lease(event["ip"], properties=properties, sets=sets)
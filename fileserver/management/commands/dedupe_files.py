@@ -0,0 +1,16 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from fileserver.blobstore import deduplicate, collect_garbage
+
+
+class Command(BaseCommand):
+    help = "Move hosted download files into the content addressed blob store and remove unreferenced blobs."
+
+    def handle(self, *args, **options):
+        app_directory = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        download_path = os.path.join(app_directory, "media/download")
+        files, saved = deduplicate(download_path)
+        deleted = collect_garbage()
+        self.stdout.write(f"Stored {files} files, saved {saved} bytes, deleted {deleted} unreferenced blobs.")
@@ -0,0 +1,169 @@
+import csv
+import io
+import json
+import os
+import threading
+
+from django.template import Context, Engine, TemplateSyntaxError
+
+from fileserver import constants
+from fileserver.dhcp_config import validate_dhcp_config, DHCPConfigError
+from fileserver.file_index import get_file_index
+
+# Template engine for ZTP and DHCP templates, these are not HTML so nothing is escaped.
+_engine = Engine(autoescape=False)
+
+# Compiled templates by name with the file version they were compiled from.
+_compiled = {}
+_compiled_lock = threading.Lock()
+
+
+class TemplateRenderError(ValueError):
+    """
+    Raised when a template can not be rendered for the inventory.
+
+    Attributes:
+        errors (list): The errors per device.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors if isinstance(errors, list) else [errors]
+        super().__init__("; ".join(self.errors))
+
+
+def get_render_templates_path():
+    """
+    Get the path to the renderable templates.
+    These are kept apart from the templates served by the templates api, which are sent as they are.
+
+    Returns:
+        str: The path to the renderable templates.
+    """
+    app_directory = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(app_directory, constants.render_templates_path)
+
+
+def get_template(name):
+    """
+    Get a compiled template, templates are compiled once and recompiled when the file changes.
+
+    Args:
+        name (str): The file name of the template.
+
+    Returns:
+        django.template.Template: The compiled template.
+
+    Raises:
+        FileNotFoundError: If the template does not exist.
+        TemplateRenderError: If the template has a syntax error.
+    """
+    name = os.path.basename(name)
+    index = get_file_index(get_render_templates_path())
+    entry = index.get(name)
+    version = (entry.size, entry.mtime_ns, entry.inode)
+    with _compiled_lock:
+        compiled = _compiled.get(name)
+    if compiled is None or compiled[0] != version:
+        try:
+            compiled = (version, _engine.from_string(index.read(name)))
+        except TemplateSyntaxError as e:
+            raise TemplateRenderError(f"{name}: {e}")
+        with _compiled_lock:
+            _compiled[name] = compiled
+    return compiled[1]
+
+
+def parse_inventory(inventory):
+    """
+    Parse an inventory of devices given as a list of dictionaries, JSON text or CSV text with a header row.
+
+    Args:
+        inventory (list | str | bytes): The inventory.
+
+    Returns:
+        list: A list of dictionaries, one per device.
+
+    Raises:
+        TemplateRenderError: If the inventory can not be parsed.
+    """
+    if isinstance(inventory, bytes):
+        inventory = inventory.decode("utf-8")
+    if isinstance(inventory, str):
+        text = inventory.strip()
+        if text.startswith(("[", "{")):
+            try:
+                inventory = json.loads(text)
+            except json.JSONDecodeError as e:
+                raise TemplateRenderError(f"Invalid inventory JSON: {e}")
+        else:
+            inventory = [
+                {key.strip(): (value or "").strip() for key, value in row.items() if key}
+                for row in csv.DictReader(io.StringIO(text))
+            ]
+    if isinstance(inventory, dict):
+        inventory = [inventory]
+    if not isinstance(inventory, list) or not all(isinstance(device, dict) for device in inventory):
+        raise TemplateRenderError("Inventory must be a list of devices.")
+    return inventory
+
+
+def render_inventory(inventory, ztp_template=None, dhcp_host_template=None, ztp_url=None, variables=None):
+    """
+    Render the ZTP file and DHCP host entry of every device in an inventory.
+    Each template is compiled once for the whole inventory.
+
+    Args:
+        inventory (list): The devices, each a dictionary of template variables,
+            hostname is required and filename defaults to <hostname>.json.
+        ztp_template (str, optional): The file name of the ZTP template.
+        dhcp_host_template (str, optional): The file name of the DHCP host entry template.
+        ztp_url (callable, optional): Returns the download URL of a ZTP file name, passed to the templates as ztp_url.
+        variables (dict, optional): Variables shared by all devices, overridden by the device's own variables.
+
+    Returns:
+        tuple: A list of rendered ZTP files as dictionaries with filename and content, and the DHCP host entries.
+
+    Raises:
+        TemplateRenderError: If a device can not be rendered or the result is invalid.
+    """
+    ztp = get_template(ztp_template) if ztp_template else None
+    dhcp_host = get_template(dhcp_host_template) if dhcp_host_template else None
+    errors = []
+    ztp_files = []
+    dhcp_hosts = []
+    filenames = set()
+    for position, device in enumerate(inventory, start=1):
+        hostname = device.get("hostname")
+        if not hostname:
+            errors.append(f"device {position}: required field hostname not found.")
+            continue
+        filename = os.path.basename(device.get("filename") or f"{hostname}.json")
+        if filename in filenames:
+            errors.append(f"{hostname}: duplicate ZTP file name {filename}.")
+            continue
+        filenames.add(filename)
+        context = {**(variables or {}), **device, "filename": filename}
+        if ztp_url:
+            context.setdefault("ztp_url", ztp_url(filename))
+        if ztp:
+            content = ztp.render(Context(context, autoescape=False))
+            if filename.endswith(".json"):
+                try:
+                    json.loads(content)
+                except json.JSONDecodeError as e:
+                    errors.append(f"{hostname}: rendered ZTP file is not valid JSON: {e}")
+                    continue
+            ztp_files.append({"filename": filename, "content": content})
+        if dhcp_host:
+            dhcp_hosts.append(dhcp_host.render(Context(context, autoescape=False)).strip())
+
+    dhcp_hosts = "\n\n".join(dhcp_hosts) + "\n" if dhcp_hosts else ""
+    if dhcp_hosts:
+        try:
+            # also detects duplicate host names, MACs and addresses across the inventory
+            validate_dhcp_config(dhcp_hosts)
+        except DHCPConfigError as e:
+            errors.extend(f"DHCP host entries: {error}" for error in e.errors)
+    if errors:
+        raise TemplateRenderError(errors)
+    return ztp_files, dhcp_hosts
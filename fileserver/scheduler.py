@@ -1,13 +1,14 @@
 import atexit
-import os
+from concurrent.futures import ThreadPoolExecutor
 
 from apscheduler.schedulers.background import BackgroundScheduler
+from django.db import transaction
 
 from fileserver import constants
-from fileserver.ssh import ssh_client_with_private_key
+from fileserver.leases import fetch_leases, forget_lease_files, get_cached_leases, DiscoveredDeviceIndex, \
+    is_switch_candidate, lease_from_event
 from fileserver.models import DHCPServerDetails, DHCPDevices
 from log_manager.logger import get_backend_logger
-from isc_dhcp_leases import IscDhcpLeases
 from orca_nw_lib.device import get_device_details
 
 _logger = get_backend_logger()
@@ -43,57 +44,116 @@ def add_dhcp_leases_scheduler(job_id="dhcp_list", trigger="interval", seconds=60
 def scan_dhcp_leases_file():
     """
     Scan the DHCP leases file and update the DHCPDevices table.
+    Leases files of all DHCP servers are fetched concurrently.
     """
     try:
         _logger.info("Scanning DHCP leases file.")
-        # delete all DHCP devices before scanning
-        DHCPDevices.objects.all().delete()
-
-        devices = DHCPServerDetails.objects.all()
-        discovered_devices = [device.get("mgt_ip") for device in get_device_details() or None]
-        app_directory = os.path.dirname(os.path.abspath(__file__))  # Get the path of the current app
-        destination_path = os.path.join(app_directory, 'media/dhcp/dhcpd.leases')
-        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
-        for device in devices:
-            copy_dhcp_file_to_local(
-                ip=device.device_ip,
-                username=device.username,
-                source_path=constants.dhcp_leases_path,
-                destination_path=destination_path
-            )
-            leases = IscDhcpLeases(destination_path)
-            for lease in leases.get():
-                _logger.debug("Lease: %s", lease)
-                if lease.ip not in discovered_devices and "sonic" in lease.hostname:
+        devices = list(DHCPServerDetails.objects.all())
+        forget_lease_files([device.device_ip for device in devices])
+        discovered_devices = DiscoveredDeviceIndex(get_device_details())
+        sonic_devices = {}
+        for leases in fetch_all_leases(devices, constants.dhcp_leases_path):
+            for lease in leases.values():
+                if lease not in discovered_devices and is_switch_candidate(lease):
                     _logger.debug(f"Discovered sonic device: {lease.ip} - {lease.hostname}")
-                    DHCPDevices.objects.update_or_create(
-                        device_ip=lease.ip,
-                        defaults={
-                            'hostname': lease.hostname,
-                            'mac_address': lease.ethernet,
-                        }
-                    )
-            _logger.info("Scanned DHCP leases file.")
-            # Delete the dhcpd.leases local file.
-            if os.path.isfile(destination_path):
-                os.remove(destination_path)
+                    sonic_devices[lease.ip] = {"hostname": lease.hostname, "mac_address": lease.ethernet}
+        sync_dhcp_devices(sonic_devices)
+        _logger.info("Scanned DHCP leases file.")
     except Exception as e:
         _logger.error(f"Error in scan_dhcp_leases_file: {e}")
 
 
-def copy_dhcp_file_to_local(ip, username, source_path: str, destination_path: str):
+def fetch_all_leases(devices, path):
     """
-    Copy the specified file from the specified source path to the specified destination path.
+    Fetch the leases of the given DHCP servers on a thread pool.
+    When a server cannot be reached the leases of its last successful scan are used,
+    so that its devices are not removed from the DHCPDevices table.
 
     Args:
-        ip (str): The IP address of the device.
-        username (str): The username to authenticate with the device.
-        source_path (str): The source path of the file to copy.
-        destination_path (str): The destination path to copy the file to.
+        devices (list): DHCPServerDetails objects of the servers to scan.
+        path (str): The path of the leases file on the DHCP servers.
+
+    Returns:
+        list: A dict of the latest lease per ip for every server.
+    """
+    if not devices:
+        return []
+    with ThreadPoolExecutor(
+            max_workers=min(constants.dhcp_scan_max_workers, len(devices)), thread_name_prefix="dhcp_scan"
+    ) as executor:
+        futures = {
+            executor.submit(fetch_leases, ip=device.device_ip, username=device.username, path=path): device
+            for device in devices
+        }
+        results = []
+        # results are merged in server order, so a lease handed out by several servers resolves deterministically
+        for future, device in futures.items():
+            try:
+                leases, _ = future.result()
+            except Exception as e:
+                _logger.error(f"Failed to fetch DHCP leases from {device.device_ip}: {e}")
+                leases = get_cached_leases(device.device_ip, path)
+            results.append(leases)
+    return results
+
+
+def apply_lease_events(events: list):
+    """
+    Update the DHCPDevices table incrementally from pushed lease events.
+    Committed leases of undiscovered SONiC/ONIE switches are added or updated,
+    released and expired leases are removed.
+
+    Args:
+        events (list): Lease events with action, ip, mac, hostname and optionally vendor_class.
+
+    Returns:
+        tuple: Number of added or updated devices and number of removed devices.
+    """
+    discovered_devices = DiscoveredDeviceIndex(get_device_details())
+    upserts = {}
+    deletes = set()
+    for event in events:
+        lease = lease_from_event(event)
+        if event.get("action", "commit") != "commit":
+            upserts.pop(lease.ip, None)
+            deletes.add(lease.ip)
+        elif lease not in discovered_devices and is_switch_candidate(lease):
+            deletes.discard(lease.ip)
+            upserts[lease.ip] = {"hostname": lease.hostname, "mac_address": lease.ethernet}
+    with transaction.atomic():
+        for device_ip, details in upserts.items():
+            DHCPDevices.objects.update_or_create(device_ip=device_ip, defaults=details)
+        if deletes:
+            DHCPDevices.objects.filter(device_ip__in=deletes).delete()
+    _logger.debug(f"DHCP lease events applied, updated: {len(upserts)}, removed: {len(deletes)}.")
+    return len(upserts), len(deletes)
+
+
+def sync_dhcp_devices(sonic_devices: dict):
+    """
+    Apply the difference between the given devices and the DHCPDevices table,
+    inside one transaction so that readers never see a partially updated table.
+
+    Args:
+        sonic_devices (dict): Device details with hostname and mac_address keyed by device ip.
     """
-    _logger.debug(f"copying file from {source_path} to {destination_path}")
-    client = ssh_client_with_private_key(ip, username)
-    with client.open_sftp() as sftp:
-        sftp.get(source_path, destination_path)
-        _logger.debug(f"file copied from {source_path} to {destination_path}")
-    client.close()
+    with transaction.atomic():
+        existing = {device.device_ip: device for device in DHCPDevices.objects.all()}
+        to_create = []
+        to_update = []
+        for device_ip, details in sonic_devices.items():
+            device = existing.get(device_ip)
+            if device is None:
+                to_create.append(DHCPDevices(device_ip=device_ip, **details))
+            elif device.hostname != details["hostname"] or device.mac_address != details["mac_address"]:
+                device.hostname = details["hostname"]
+                device.mac_address = details["mac_address"]
+                to_update.append(device)
+        to_delete = [device_ip for device_ip in existing if device_ip not in sonic_devices]
+        if to_create:
+            DHCPDevices.objects.bulk_create(to_create)
+        if to_update:
+            DHCPDevices.objects.bulk_update(to_update, ["hostname", "mac_address"])
+        if to_delete:
+            DHCPDevices.objects.filter(device_ip__in=to_delete).delete()
+    _logger.debug(f"DHCP devices added: {len(to_create)}, updated: {len(to_update)}, removed: {len(to_delete)}.")
@@ -1,4 +1,8 @@
+import atexit
 import os
+import threading
+import time
+from contextlib import contextmanager
 
 import paramiko
 
@@ -155,3 +159,187 @@ def is_ssh_key_based_authentication_enabled(ip, username):
     except Exception as e:
         _logger.error(f"Failed to enable SSH access on {ip}: {e}")
         return False
+
+
+class SSHSession:
+    """
+    A pooled, authenticated SSH connection and its lazily opened SFTP channel.
+    """
+
+    def __init__(self, key, client, generation=0):
+        self.key = key
+        self.client = client
+        self.generation = generation
+        self.last_used = time.monotonic()
+        self._sftp = None
+
+    @property
+    def sftp(self):
+        """
+        Get the SFTP client of this session, opening it on first use.
+
+        Returns:
+            paramiko.SFTPClient: An SFTP client object.
+        """
+        if self._sftp is None:
+            self._sftp = self.client.open_sftp()
+        return self._sftp
+
+    def is_healthy(self):
+        """
+        Check if the underlying SSH transport is still usable.
+
+        Returns:
+            bool: True if the transport is active and responds, False otherwise.
+        """
+        transport = self.client.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            transport.send_ignore()
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        """
+        Close the SFTP channel and the SSH connection.
+        """
+        try:
+            if self._sftp is not None:
+                self._sftp.close()
+        finally:
+            self._sftp = None
+            self.client.close()
+
+
+class SSHConnectionPool:
+    """
+    Keyed pool of authenticated SSH connections, keyed by server ip and username.
+    A session is handed out to one user at a time and returned to the pool afterwards,
+    connections that are idle for too long or fail the health check are closed.
+    Closing the sessions of a server starts a new generation of its sessions,
+    sessions of an older generation that are in use are closed when they are released.
+    """
+
+    def __init__(self, idle_timeout, max_connections, keepalive_interval):
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+        self.keepalive_interval = keepalive_interval
+        self._idle = {}
+        # generation of all sessions and of the sessions per server ip
+        self._epoch = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def _generation(self, ip):
+        return self._epoch, self._generations.get(ip, 0)
+
+    def acquire(self, ip, username):
+        """
+        Get a healthy session for the given server, creating a new connection if none is idle.
+
+        Args:
+            ip (str): The IP address of the server.
+            username (str): The username to use for SSH authentication.
+
+        Returns:
+            SSHSession: A session for exclusive use until it is released.
+        """
+        key = (ip, username)
+        self.evict_idle()
+        while True:
+            with self._lock:
+                sessions = self._idle.get(key, [])
+                session = sessions.pop() if sessions else None
+            if session is None:
+                break
+            if session.is_healthy():
+                _logger.debug(f"Reusing pooled ssh connection to {ip}.")
+                return session
+            session.close()
+        with self._lock:
+            generation = self._generation(ip)
+        client = ssh_client_with_private_key(ip, username)
+        client.get_transport().set_keepalive(self.keepalive_interval)
+        return SSHSession(key, client, generation)
+
+    def release(self, session, discard=False):
+        """
+        Return a session to the pool, unhealthy sessions, sessions of a closed generation
+        and sessions beyond the pool size are closed.
+
+        Args:
+            session (SSHSession): The session to return.
+            discard (bool, optional): Whether to close the session instead, e.g. after an operation on it failed.
+        """
+        session.last_used = time.monotonic()
+        if not discard and session.is_healthy():
+            with self._lock:
+                sessions = self._idle.setdefault(session.key, [])
+                current = session.generation == self._generation(session.key[0])
+                if current and len(sessions) < self.max_connections:
+                    sessions.append(session)
+                    return
+        session.close()
+
+    def evict_idle(self):
+        """
+        Close sessions that have not been used within the idle timeout.
+        """
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            for key, sessions in self._idle.items():
+                expired.extend(s for s in sessions if now - s.last_used > self.idle_timeout)
+                self._idle[key] = [s for s in sessions if now - s.last_used <= self.idle_timeout]
+        for session in expired:
+            session.close()
+
+    def close(self, ip=None):
+        """
+        Close idle sessions of the given server, or of all servers if no ip is given.
+        Sessions in use are closed when they are released, e.g. after the credentials of the server changed.
+
+        Args:
+            ip (str, optional): The IP address of the server.
+        """
+        with self._lock:
+            if ip is None:
+                self._epoch += 1
+            else:
+                self._generations[ip] = self._generations.get(ip, 0) + 1
+            keys = [key for key in self._idle if ip is None or key[0] == ip]
+            sessions = [s for key in keys for s in self._idle.pop(key)]
+        for session in sessions:
+            session.close()
+
+
+ssh_pool = SSHConnectionPool(
+    idle_timeout=constants.ssh_pool_idle_timeout,
+    max_connections=constants.ssh_pool_max_connections,
+    keepalive_interval=constants.ssh_keepalive_interval,
+)
+atexit.register(ssh_pool.close)
+
+
+@contextmanager
+def ssh_session(ip, username):
+    """
+    Context manager to borrow a pooled SSH session for the given server.
+
+    Args:
+        ip (str): The IP address of the server.
+        username (str): The username to use for SSH authentication.
+
+    Yields:
+        SSHSession: The session, returned to the pool on exit, or closed if the block raised
+            as the connection may be left in an unknown state.
+    """
+    session = ssh_pool.acquire(ip, username)
+    try:
+        yield session
+    except BaseException:
+        ssh_pool.release(session, discard=True)
+        raise
+    ssh_pool.release(session)
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import tempfile
+from unittest import mock
+
+from django.urls import reverse
+
+from fileserver import blobstore, file_index, ztp
+from fileserver.test.test_common import TestCommon
+
+
+class TestBlobStore(TestCommon):
+
+    def test_duplicate_ztp_files_share_one_blob(self):
+        """
+        Test that ztp files with the same content are stored once and the blob is removed with the last file.
+        """
+        content = "duplicate test content"
+        for filename in ["ztp_blob_test_1.json", "ztp_blob_test_2.json"]:
+            response = self.put_req("host_ztp_files", {"filename": filename, "content": content})
+            self.assertEqual(response.status_code, 200)
+
+        path_1 = os.path.join(ztp.get_ztp_path(), "ztp_blob_test_1.json")
+        path_2 = os.path.join(ztp.get_ztp_path(), "ztp_blob_test_2.json")
+        checksum = blobstore.checksum_of(path_1)
+        self.assertIsNotNone(checksum)
+        self.assertEqual(checksum, blobstore.checksum_of(path_2))
+        self.assertTrue(os.path.samefile(path_1, path_2))
+        self.assertTrue(os.path.samefile(path_1, blobstore.blob_path(checksum)))
+
+        # the checksum is served as etag
+        response = self.client.get(reverse("download_file", args=["ztp/ztp_blob_test_1.json"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], f'"{checksum}"')
+        response.close()
+        response = self.client.get(
+            reverse("download_file", args=["ztp/ztp_blob_test_2.json"]), HTTP_IF_NONE_MATCH=f'"{checksum}"'
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # blob is kept while a file references it
+        response = self.del_req("host_ztp_files", {"filename": "ztp_blob_test_1.json"})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(os.path.exists(blobstore.blob_path(checksum)))
+
+        response = self.del_req("host_ztp_files", {"filename": "ztp_blob_test_2.json"})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(os.path.exists(blobstore.blob_path(checksum)))
+
+    def test_updating_ztp_file_releases_old_blob(self):
+        """
+        Test that overwriting a ztp file removes the blob of its old content.
+        """
+        filename = "ztp_blob_update_test.json"
+        path = os.path.join(ztp.get_ztp_path(), filename)
+        response = self.put_req("host_ztp_files", {"filename": filename, "content": "old content"})
+        self.assertEqual(response.status_code, 200)
+        old_checksum = blobstore.checksum_of(path)
+
+        response = self.put_req("host_ztp_files", {"filename": filename, "content": "new content"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(blobstore.checksum_of(path), old_checksum)
+        self.assertFalse(os.path.exists(blobstore.blob_path(old_checksum)))
+
+        response = self.get_req("host_ztp_files", {"filename": filename})
+        self.assertEqual(response.json()["content"], "new content")
+
+        response = self.del_req("host_ztp_files", {"filename": filename})
+        self.assertEqual(response.status_code, 200)
+
+    def test_listing_does_not_read_files(self):
+        """
+        Test that listings only show checksums known to the blob store unless checksums are requested.
+        """
+        tmp = tempfile.TemporaryDirectory(dir=os.path.dirname(ztp.get_ztp_path()))
+        self.addCleanup(tmp.cleanup)
+        with open(os.path.join(tmp.name, "plain.bin"), "wb") as f:
+            f.write(b"plain content")
+        blobstore.store_file(os.path.join(tmp.name, "stored.bin"), [b"stored content"])
+        self.addCleanup(blobstore.remove_file, os.path.join(tmp.name, "stored.bin"))
+
+        with mock.patch("builtins.open", side_effect=AssertionError("file read")):
+            files = {f["filename"]: f["checksum"] for f in file_index.list_files(tmp.name)}
+        self.assertEqual(
+            files, {"plain.bin": None, "stored.bin": hashlib.sha256(b"stored content").hexdigest()}
+        )
+        files = {f["filename"]: f["checksum"] for f in file_index.list_files(tmp.name, with_checksum=True)}
+        self.assertEqual(files["plain.bin"], hashlib.sha256(b"plain content").hexdigest())
@@ -75,3 +75,20 @@ class TestCommon(APITransactionTestCase):
             req_json,
             format="json",
         )
+
+    def post_req(self, url_name: str, req_json):
+        """
+        Sends a POST request to the specified URL.
+
+        Args:
+            url_name (str): The name of the URL to request.
+            req_json: The JSON data to send with the request.
+
+        Returns:
+            The response from the request in JSON format.
+        """
+        return self.client.post(
+            reverse(url_name),
+            req_json,
+            format="json",
+        )
@@ -54,7 +54,7 @@ class TestDHCP(TestCommon):
 
         file_data = {
             "device_ip": device_ip,
-            "content": "test_dhcp_server_config"
+            "content": "# test_dhcp_server_config"
         }
 
         # change dhcp path for testing.
@@ -100,7 +100,7 @@ class TestDHCP(TestCommon):
 
         file_data = {
             "device_ip": device_ip,
-            "content": "test_dhcp_server_backups"
+            "content": "# test_dhcp_server_backups"
         }
 
         # change dhcp path for testing.
@@ -125,7 +125,7 @@ class TestDHCP(TestCommon):
         self.assertEqual(response.status_code, 200)
         self.assertTrue(file_data["content"] in response.json().get("content"))
 
-        file_data["content"] = "test_dhcp_server_backups 1"
+        file_data["content"] = "# test_dhcp_server_backups 1"
         # adding dhcp config
         response = self.put_req("dhcp_config", file_data)
         self.assertEqual(response.status_code, 200)
@@ -252,7 +252,7 @@ lease 192.168.1.{i} {{
 
         file_data = {
             "device_ip": device_ip,
-            "content": "file content"
+            "content": "# file content"
         }
 
         # change dhcp path for testing.
@@ -281,7 +281,7 @@ lease 192.168.1.{i} {{
         for i in range(10):
             response = self.put_req("dhcp_config", {
                 "device_ip": device_ip,
-                "content": f"file content {i}"
+                "content": f"# file content {i}"
             })
             self.assertEqual(response.status_code, 200)
 
@@ -294,7 +294,7 @@ lease 192.168.1.{i} {{
         # adding config again to check if oldest backup is deleted
         response = self.put_req("dhcp_config", {
             "device_ip": device_ip,
-            "content": "file content"
+            "content": "# file content"
         })
         self.assertEqual(response.status_code, 200)
 
@@ -324,7 +324,7 @@ lease 192.168.1.{i} {{
 
         file_data = {
             "device_ip": device_ip,
-            "content": "test_dhcp_check_sum"
+            "content": "# test_dhcp_check_sum"
         }
 
         # change dhcp path for testing.
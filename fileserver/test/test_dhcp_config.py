@@ -0,0 +1,76 @@
+from fileserver.test.test_common import TestCommon
+
+
+class TestDHCPConfig(TestCommon):
+    content = """
+option domain-name "demo.lab";
+default-lease-time 600;
+
+subnet 192.168.1.0 netmask 255.255.255.0 {
+  range 192.168.1.128 192.168.1.255;
+  option routers 192.168.1.1;
+}
+
+host demo {
+  hardware ethernet 00:00:00:00:00:02;
+  fixed-address 192.168.1.11;
+}
+"""
+
+    def test_validate_dhcp_config(self):
+        """
+        Test that a valid config is accepted and invalid configs are rejected with their errors.
+        """
+        response = self.post_req("dhcp_config_validate", {"content": self.content})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["subnets"], ["192.168.1.0/24"])
+        self.assertEqual(response.json()["hosts"], 1)
+
+        # missing semicolon
+        response = self.post_req("dhcp_config_validate", {"content": "default-lease-time 600"})
+        self.assertEqual(response.status_code, 400)
+
+        # duplicate mac address
+        content = self.content + "host demo2 { hardware ethernet 00:00:00:00:00:02; }\n"
+        response = self.post_req("dhcp_config_validate", {"content": content})
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(any("00:00:00:00:00:02" in error for error in response.json()["errors"]))
+
+        # range outside of the subnet
+        content = self.content.replace("192.168.1.255;", "192.168.2.10;")
+        response = self.post_req("dhcp_config_validate", {"content": content})
+        self.assertEqual(response.status_code, 400)
+
+    def test_edit_dhcp_config(self):
+        """
+        Test adding a host and a range to a config.
+        """
+        response = self.post_req("dhcp_config_edit", {
+            "content": self.content,
+            "edits": [
+                {"action": "add_host", "name": "sonic1", "mac": "AA:BB:CC:DD:EE:01", "ip": "192.168.1.20"},
+                {"action": "add_range", "start": "192.168.1.50", "end": "192.168.1.60"},
+            ]
+        })
+        self.assertEqual(response.status_code, 200)
+        content = response.json()["content"]
+        self.assertIn("host sonic1 {", content)
+        self.assertIn("hardware ethernet aa:bb:cc:dd:ee:01;", content)
+        self.assertIn("range 192.168.1.50 192.168.1.60;", content)
+        self.assertIn('option domain-name "demo.lab";', content)
+
+        # the edited config is valid
+        response = self.post_req("dhcp_config_validate", {"content": content})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["hosts"], 2)
+
+        # conflicting edits are rejected
+        for edit in [
+            {"action": "add_host", "name": "demo", "mac": "aa:bb:cc:dd:ee:02"},
+            {"action": "add_host", "name": "sonic2", "mac": "00:00:00:00:00:02"},
+            {"action": "add_host", "name": "sonic2", "mac": "aa:bb:cc:dd:ee:02", "ip": "192.168.1.11"},
+            {"action": "add_range", "start": "192.168.1.200", "end": "192.168.1.210"},
+            {"action": "add_range", "start": "10.0.0.1", "end": "10.0.0.10"},
+        ]:
+            response = self.post_req("dhcp_config_edit", {"content": self.content, "edits": [edit]})
+            self.assertEqual(response.status_code, 400)
@@ -0,0 +1,150 @@
+import contextlib
+import io
+import os
+import subprocess
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+from fileserver import constants
+from fileserver.dhcp import calculate_checksum, install_dhcp_config, put_dhcp_config
+from fileserver.test.test_common import TestCommon
+
+
+class Output:
+
+    def __init__(self, data, exit_status):
+        self.data = data
+        self.channel = SimpleNamespace(recv_exit_status=lambda: exit_status)
+
+    def read(self):
+        return self.data
+
+
+class LocalClient:
+    """
+    SSH client running commands in a local shell, without sudo.
+    """
+
+    def __init__(self):
+        self.commands = []
+
+    def get_transport(self):
+        return SimpleNamespace(getpeername=lambda: ("127.0.0.1", 22))
+
+    def exec_command(self, command):
+        self.commands.append(command)
+        result = subprocess.run(command.removeprefix("sudo "), shell=True, capture_output=True)
+        return None, Output(result.stdout, result.returncode), Output(result.stderr, result.returncode)
+
+
+class LocalFile(io.FileIO):
+
+    def set_pipelined(self, pipelined):
+        pass
+
+
+class LocalSFTP:
+
+    def open(self, path, mode):
+        return LocalFile(path, mode)
+
+    def remove(self, path):
+        os.remove(path)
+
+
+class TestDHCPInstall(TestCommon):
+    content = "default-lease-time 600;\n"
+
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "dhcp") + "/"
+        self.upload_path = os.path.join(tmp.name, "upload") + "/"
+        os.makedirs(self.path)
+        os.makedirs(self.upload_path)
+        self.conf = os.path.join(self.path, "dhcpd.conf")
+        with open(self.conf, "w") as f:
+            f.write("default-lease-time 300;\n")
+        self.client = LocalClient()
+
+        @contextlib.contextmanager
+        def ssh_session(ip, username):
+            yield SimpleNamespace(client=self.client, sftp=LocalSFTP(), key=(ip, username))
+
+        for patcher in (
+                mock.patch("fileserver.dhcp.ssh_session", ssh_session),
+                mock.patch("fileserver.dhcp.restart_dhcpd"),
+                mock.patch.object(constants, "dhcp_path", self.path),
+                mock.patch.object(constants, "dhcp_upload_tmp_path", self.upload_path),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def read_conf(self):
+        with open(self.conf) as f:
+            return f.read()
+
+    def backups(self):
+        return sorted(name for name in os.listdir(self.path) if name.startswith(constants.dhcp_backup_prefix))
+
+    def test_config_is_backed_up_and_replaced(self):
+        """ Test the old config is backed up, the new one installed and the uploaded temp file removed. """
+        put_dhcp_config("10.10.10.10", "admin", self.content)
+        self.assertEqual(self.read_conf(), self.content)
+        backups = self.backups()
+        self.assertEqual(len(backups), 1)
+        with open(os.path.join(self.path, backups[0])) as f:
+            self.assertEqual(f.read(), "default-lease-time 300;\n")
+        self.assertEqual(os.listdir(self.upload_path), [])
+        self.assertNotIn(".dhcpd.conf.orca-new", os.listdir(self.path))
+
+    def test_unchanged_config_is_not_uploaded(self):
+        """ Test a config with the checksum of the current file is not uploaded again. """
+        with open(self.conf, "w") as f:
+            f.write(self.content)
+        output, error = put_dhcp_config("10.10.10.10", "admin", " " + self.content + "\n")
+        self.assertEqual(error, "No changes detected in DHCP configuration.")
+        self.assertEqual(len(self.client.commands), 1)
+        self.assertEqual(self.backups(), [])
+
+    def test_checksum_mismatch_keeps_config(self):
+        """ Test an uploaded file not matching the expected checksum is not installed. """
+        tmp_path = os.path.join(self.upload_path, "dhcpd.conf.upload")
+        with open(tmp_path, "w") as f:
+            f.write("default-lease-time 900;\n")
+        output, error = install_dhcp_config(
+            self.client, tmp_path, calculate_checksum(self.content), self.path, "dhcpd.conf"
+        )
+        self.assertTrue(error)
+        self.assertEqual(self.read_conf(), "default-lease-time 300;\n")
+        self.assertEqual(self.backups(), [])
+        # the uploaded file is removed although the install failed
+        self.assertEqual(os.listdir(self.upload_path), [])
+        self.assertNotIn(".dhcpd.conf.orca-new", os.listdir(self.path))
+
+    def test_failed_install_removes_uploaded_file(self):
+        """ Test the uploaded file is removed when a later step of the install fails. """
+        tmp_path = os.path.join(self.upload_path, "dhcpd.conf.upload")
+        with open(tmp_path, "w") as f:
+            f.write(self.content)
+        # the checksum matches, installing into a missing directory fails
+        output, error = install_dhcp_config(
+            self.client, tmp_path, calculate_checksum(self.content), os.path.join(self.path, "missing") + "/",
+            "dhcpd.conf"
+        )
+        self.assertTrue(error)
+        self.assertEqual(os.listdir(self.upload_path), [])
+
+    def test_old_backups_are_rotated(self):
+        """ Test only the newest dhcp_backup_count backups are kept. """
+        for day in range(1, constants.dhcp_backup_count + 3):
+            with open(os.path.join(self.path, f"{constants.dhcp_backup_prefix}2024-01-{day:02d}_00:00:00"), "w"):
+                pass
+        put_dhcp_config("10.10.10.10", "admin", self.content)
+        backups = self.backups()
+        self.assertEqual(len(backups), constants.dhcp_backup_count)
+        self.assertNotIn(f"{constants.dhcp_backup_prefix}2024-01-01_00:00:00", backups)
+        self.assertNotIn(f"{constants.dhcp_backup_prefix}2024-01-02_00:00:00", backups)
+        self.assertNotIn(f"{constants.dhcp_backup_prefix}2024-01-03_00:00:00", backups)
@@ -0,0 +1,110 @@
+import os
+from unittest import mock
+
+from django.urls import reverse
+from django.utils.http import http_date
+
+from fileserver import constants, downloads
+from fileserver.test.test_common import TestCommon
+
+
+class TestDownloads(TestCommon):
+    test_file_name = "download_test.bin"
+    test_file_content = bytes(range(100))
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        app_directory = os.path.dirname(os.path.abspath(__file__))  # Get the path of the current app
+        cls.path = os.path.join(app_directory, '../media/download', cls.test_file_name)
+        with open(cls.path, "wb") as f:
+            f.write(cls.test_file_content)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.remove(cls.path)
+        super().tearDownClass()
+
+    def download(self, **headers):
+        response = self.client.get(reverse("download_file", args=[self.test_file_name]), **headers)
+        self.addCleanup(response.close)
+        return response
+
+    def content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_download(self):
+        """ Test the whole file is sent with its validators and range support. """
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.test_file_content)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertIn("Last-Modified", response)
+
+    def test_single_range(self):
+        """ Test single byte ranges, suffix ranges and open ranges are sent as 206 partial content. """
+        for header, start, end in (("bytes=10-19", 10, 19), ("bytes=-5", 95, 99), ("bytes=90-", 90, 99),
+                                   ("bytes=95-200", 95, 99)):
+            response = self.download(HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 206, header)
+            self.assertEqual(self.content(response), self.test_file_content[start:end + 1], header)
+            self.assertEqual(response["Content-Range"], f"bytes {start}-{end}/100", header)
+            self.assertEqual(response["Content-Length"], str(end - start + 1), header)
+
+    def test_multiple_ranges_send_whole_file(self):
+        """ Test headers with several ranges are ignored and the whole file is sent. """
+        response = self.download(HTTP_RANGE="bytes=0-9,20-29")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.test_file_content)
+
+    def test_unsatisfiable_range(self):
+        """ Test ranges outside of the file are rejected with 416. """
+        for header in ("bytes=100-", "bytes=50-40", "bytes=-0"):
+            response = self.download(HTTP_RANGE=header)
+            self.assertEqual(response.status_code, 416, header)
+            self.assertEqual(response["Content-Range"], "bytes */100", header)
+
+    def test_if_range(self):
+        """ Test the range is only sent while If-Range matches the current ETag or modification time. """
+        etag = self.download()["ETag"]
+        last_modified = http_date(int(os.stat(self.path).st_mtime))
+
+        response = self.download(HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+        response = self.download(HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE=last_modified)
+        self.assertEqual(response.status_code, 206)
+
+        response = self.download(HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.content(response), self.test_file_content)
+        response = self.download(HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE=http_date(0))
+        self.assertEqual(response.status_code, 200)
+
+    def test_conditional_requests(self):
+        """ Test If-None-Match and If-Modified-Since return 304 and a failing If-Match returns 412. """
+        etag = self.download()["ETag"]
+        last_modified = http_date(int(os.stat(self.path).st_mtime))
+
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.download(HTTP_IF_NONE_MATCH='"outdated"').status_code, 200)
+        self.assertEqual(self.download(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        self.assertEqual(self.download(HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code, 200)
+        self.assertEqual(self.download(HTTP_IF_MATCH=etag).status_code, 200)
+        self.assertEqual(self.download(HTTP_IF_MATCH='"outdated"').status_code, 412)
+
+    def test_concurrency_cap(self):
+        """ Test downloads beyond the per file cap get 503 and closed downloads release their slot. """
+        with mock.patch.object(constants, "download_max_concurrency_per_file", 2):
+            first = self.download()
+            second = self.download(HTTP_RANGE="bytes=10-19")
+            rejected = self.download()
+            self.assertEqual(rejected.status_code, 503)
+            self.assertEqual(rejected["Retry-After"], str(constants.download_retry_after))
+
+            first.close()
+            response = self.download()
+            self.assertEqual(response.status_code, 200)
+            response.close()
+            second.close()
+            self.assertEqual(downloads._active_downloads, {})
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from fileserver.models import DHCPDevices
+from fileserver.test.test_common import TestCommon
+from log_manager.models import Logs
+
+
+class TestLeaseIngest(TestCommon):
+
+    def test_commit_and_release_events(self):
+        """ Test committed switch leases are added and released or expired leases removed. """
+        DHCPDevices.objects.create(device_ip="10.10.10.103", hostname="sonic3", mac_address="0c:00:00:00:00:03")
+        response = self.post_req("dhcp_leases", {"leases": [
+            {"ip": "10.10.10.101", "mac": "0c:00:00:00:00:01", "hostname": "sonic1", "action": "commit"},
+            {"ip": "10.10.10.102", "mac": "0c:00:00:00:00:02", "hostname": "laptop", "action": "commit"},
+            {"ip": "10.10.10.103", "action": "expiry"},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        devices = {device.device_ip: device.hostname for device in DHCPDevices.objects.all()}
+        self.assertEqual(devices, {"10.10.10.101": "sonic1"})
+
+        response = self.post_req("dhcp_leases", [
+            {"ip": "10.10.10.101", "mac": "0c:00:00:00:00:01", "hostname": "sonic1-new"},
+            {"ip": "10.10.10.104", "mac": "0c:00:00:00:00:04", "vendor_class": "onie_vendor:x86_64"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        devices = {device.device_ip: device.hostname for device in DHCPDevices.objects.all()}
+        self.assertEqual(devices, {"10.10.10.101": "sonic1-new", "10.10.10.104": ""})
+
+    def test_discovered_devices_are_skipped(self):
+        """ Test leases of already discovered devices are not added. """
+        with mock.patch("fileserver.scheduler.get_device_details", return_value=[{"mgt_ip": "10.10.10.101"}]):
+            response = self.post_req(
+                "dhcp_leases", {"ip": "10.10.10.101", "mac": "0c:00:00:00:00:01", "hostname": "sonic1"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(DHCPDevices.objects.exists())
+
+    def test_invalid_events(self):
+        """ Test a batch with an invalid event is rejected as a whole. """
+        for event in ({"mac": "0c:00:00:00:00:01"}, {"ip": "10.10.10.300"}, {"ip": "10.10.10.101", "action": "renew"}):
+            response = self.post_req(
+                "dhcp_leases", {"leases": [{"ip": "10.10.10.102", "hostname": "sonic2"}, event]}
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["index"], 1)
+        self.assertFalse(DHCPDevices.objects.exists())
+
+    def test_events_must_be_objects(self):
+        """ Test events that are not objects are rejected with their index instead of failing. """
+        for data in ({"leases": [{"ip": "10.10.10.102"}, "10.10.10.101"]}, [{"ip": "10.10.10.102"}, None],
+                     {"leases": [{"ip": "10.10.10.102"}, ["10.10.10.101"]]}):
+            response = self.post_req("dhcp_leases", data)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()["index"], 1)
+        response = self.post_req("dhcp_leases", {"leases": "10.10.10.101"})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["index"], 0)
+        self.assertFalse(DHCPDevices.objects.exists())
+
+    def test_requests_are_not_logged(self):
+        """ Test pushed lease events do not add rows to the request log. """
+        self.post_req("dhcp_leases", {"ip": "10.10.10.101", "hostname": "sonic1"})
+        self.assertFalse(Logs.objects.exists())
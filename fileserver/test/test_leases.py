@@ -0,0 +1,249 @@
+import contextlib
+import io
+from types import SimpleNamespace
+from unittest import mock
+
+from fileserver import leases
+from fileserver.leases import DiscoveredDeviceIndex, fetch_leases, is_switch_candidate, lease_from_event, \
+    parse_leases
+from fileserver.models import DHCPDevices, DHCPServerDetails
+from fileserver.scheduler import fetch_all_leases, sync_dhcp_devices
+from fileserver.test.test_common import TestCommon
+
+
+def lease_block(ip, mac, hostname):
+    return (
+        f"lease {ip} {{\n"
+        f"  starts 4 2024/04/18 10:00:00;\n"
+        f"  ends 4 2024/04/18 22:00:00;\n"
+        f"  binding state active;\n"
+        f"  hardware ethernet {mac};\n"
+        f"  client-hostname \"{hostname}\";\n"
+        f"}}\n"
+    )
+
+
+class RemoteFile(io.BytesIO):
+
+    def prefetch(self, length):
+        pass
+
+
+class FakeSFTP:
+    """
+    SFTP client serving a single in-memory leases file and recording the offsets it is read from.
+    """
+
+    def __init__(self):
+        self.content = b""
+        self.mtime = 0
+        self.reads = []
+
+    def write(self, content, append=True):
+        self.content = self.content + content.encode() if append else content.encode()
+        self.mtime += 1
+
+    def stat(self, path):
+        return SimpleNamespace(st_size=len(self.content), st_mtime=self.mtime)
+
+    def open(self, path, mode):
+        f = RemoteFile(self.content)
+        seek = f.seek
+
+        def record_seek(offset, *args):
+            self.reads.append(offset)
+            return seek(offset, *args)
+
+        f.seek = record_seek
+        return f
+
+
+class TestLeases(TestCommon):
+    ip = "10.10.10.10"
+    path = "/var/lib/dhcp/dhcpd.leases"
+
+    def setUp(self):
+        super().setUp()
+        self.sftp = FakeSFTP()
+
+        @contextlib.contextmanager
+        def ssh_session(ip, username):
+            yield SimpleNamespace(sftp=self.sftp)
+
+        patcher = mock.patch("fileserver.leases.ssh_session", ssh_session)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(leases.forget_lease_files, [])
+
+    def fetch(self):
+        return fetch_leases(self.ip, "admin", self.path)
+
+    def test_parse_leases_stops_at_incomplete_block(self):
+        """ Test a trailing incomplete lease block is left for the next scan. """
+        complete = lease_block("10.10.10.101", "0c:00:00:00:00:01", "sonic1")
+        data = complete + "lease 10.10.10.102 {\n  binding state active;\n"
+        parsed, end = parse_leases(data)
+        self.assertEqual(list(parsed), ["10.10.10.101"])
+        self.assertEqual(data[:end].strip(), complete.strip())
+
+    def test_parse_leases_keeps_latest_lease(self):
+        """ Test a lease appearing again later in the journal replaces the earlier one. """
+        parsed, _ = parse_leases(
+            lease_block("10.10.10.101", "0c:00:00:00:00:01", "sonic1")
+            + lease_block("10.10.10.101", "0c:00:00:00:00:02", "sonic2")
+        )
+        self.assertEqual(parsed["10.10.10.101"].ethernet, "0c:00:00:00:00:02")
+
+    def test_only_appended_tail_is_read(self):
+        """ Test unchanged files are not read and appended leases are read from the last parsed offset. """
+        self.sftp.write(lease_block("10.10.10.101", "0c:00:00:00:00:01", "sonic1"))
+        parsed, changed = self.fetch()
+        self.assertTrue(changed)
+        self.assertEqual(list(parsed), ["10.10.10.101"])
+        self.assertEqual(self.sftp.reads, [0])
+
+        parsed, changed = self.fetch()
+        self.assertFalse(changed)
+        self.assertEqual(list(parsed), ["10.10.10.101"])
+        self.assertEqual(self.sftp.reads, [0])
+
+        size = len(self.sftp.content)
+        self.sftp.write(lease_block("10.10.10.102", "0c:00:00:00:00:02", "sonic2"))
+        parsed, changed = self.fetch()
+        self.assertTrue(changed)
+        self.assertEqual(sorted(parsed), ["10.10.10.101", "10.10.10.102"])
+        # only the tail and the marker before the parsed offset are read
+        self.assertEqual(len(self.sftp.reads), 2)
+        self.assertGreaterEqual(self.sftp.reads[1], size - leases._marker_size - 1)
+        self.assertLess(self.sftp.reads[1], size)
+
+    def test_incomplete_block_is_parsed_once_complete(self):
+        """ Test a lease block written in two parts is parsed when it is complete. """
+        block = lease_block("10.10.10.101", "0c:00:00:00:00:01", "sonic1")
+        self.sftp.write(block[:40])
+        parsed, _ = self.fetch()
+        self.assertEqual(parsed, {})
+        self.sftp.write(block[40:])
+        parsed, _ = self.fetch()
+        self.assertEqual(list(parsed), ["10.10.10.101"])
+
+    def test_rewritten_file_is_parsed_again(self):
+        """ Test a rewritten leases file is detected by the marker and parsed from the beginning. """
+        self.sftp.write(
+            lease_block("10.10.10.101", "0c:00:00:00:00:01", "sonic1")
+            + lease_block("10.10.10.102", "0c:00:00:00:00:02", "sonic2")
+        )
+        self.fetch()
+        # same size, but different content before the parsed offset
+        self.sftp.write(
+            lease_block("10.10.10.103", "0c:00:00:00:00:03", "sonic3")
+            + lease_block("10.10.10.104", "0c:00:00:00:00:04", "sonic4"),
+            append=False,
+        )
+        parsed, changed = self.fetch()
+        self.assertTrue(changed)
+        self.assertEqual(sorted(parsed), ["10.10.10.103", "10.10.10.104"])
+        self.assertEqual(self.sftp.reads[-1], 0)
+
+    def test_truncated_file_is_parsed_again(self):
+        """ Test a leases file shorter than the parsed offset is parsed from the beginning. """
+        self.sftp.write(
+            lease_block("10.10.10.101", "0c:00:00:00:00:01", "sonic1")
+            + lease_block("10.10.10.102", "0c:00:00:00:00:02", "sonic2")
+        )
+        self.fetch()
+        self.sftp.write(lease_block("10.10.10.103", "0c:00:00:00:00:03", "sonic3"), append=False)
+        parsed, _ = self.fetch()
+        self.assertEqual(list(parsed), ["10.10.10.103"])
+
+
+class TestSyncDHCPDevices(TestCommon):
+
+    def test_sync_applies_difference(self):
+        """ Test new devices are created, changed devices updated and missing devices removed. """
+        DHCPDevices.objects.create(device_ip="10.10.10.101", hostname="sonic1", mac_address="0c:00:00:00:00:01")
+        DHCPDevices.objects.create(device_ip="10.10.10.102", hostname="sonic2", mac_address="0c:00:00:00:00:02")
+        DHCPDevices.objects.create(device_ip="10.10.10.103", hostname="sonic3", mac_address="0c:00:00:00:00:03")
+        sync_dhcp_devices({
+            "10.10.10.101": {"hostname": "sonic1", "mac_address": "0c:00:00:00:00:01"},
+            "10.10.10.102": {"hostname": "sonic2-new", "mac_address": "0c:00:00:00:00:02"},
+            "10.10.10.104": {"hostname": "sonic4", "mac_address": "0c:00:00:00:00:04"},
+        })
+        devices = {device.device_ip: device.hostname for device in DHCPDevices.objects.all()}
+        self.assertEqual(
+            devices, {"10.10.10.101": "sonic1", "10.10.10.102": "sonic2-new", "10.10.10.104": "sonic4"}
+        )
+
+    def test_sync_without_changes_does_not_write(self):
+        """ Test an unchanged device list issues no writes. """
+        DHCPDevices.objects.create(device_ip="10.10.10.101", hostname="sonic1", mac_address="0c:00:00:00:00:01")
+        with mock.patch.object(DHCPDevices.objects, "bulk_create") as bulk_create, \
+                mock.patch.object(DHCPDevices.objects, "bulk_update") as bulk_update:
+            sync_dhcp_devices({"10.10.10.101": {"hostname": "sonic1", "mac_address": "0c:00:00:00:00:01"}})
+        bulk_create.assert_not_called()
+        bulk_update.assert_not_called()
+        self.assertEqual(DHCPDevices.objects.count(), 1)
+
+
+class TestFetchAllLeases(TestCommon):
+    path = "/var/lib/dhcp/dhcpd.leases"
+
+    def test_unreachable_server_uses_cached_leases(self):
+        """ Test a server that fails to respond contributes the leases of its last successful scan. """
+        servers = [DHCPServerDetails(device_ip="10.10.10.10", username="admin"),
+                   DHCPServerDetails(device_ip="10.10.10.11", username="admin")]
+        reachable = {"10.10.10.101": "lease"}
+        cached = {"10.10.10.102": "cached lease"}
+
+        def fetch(ip, username, path):
+            if ip == "10.10.10.11":
+                raise OSError("connection refused")
+            return reachable, True
+
+        with mock.patch("fileserver.scheduler.fetch_leases", side_effect=fetch), \
+                mock.patch("fileserver.scheduler.get_cached_leases", return_value=cached) as get_cached_leases:
+            results = fetch_all_leases(servers, self.path)
+        # results keep the order of the servers
+        self.assertEqual(results, [reachable, cached])
+        get_cached_leases.assert_called_once_with("10.10.10.11", self.path)
+
+    def test_no_servers(self):
+        """ Test no thread pool is needed without DHCP servers. """
+        self.assertEqual(fetch_all_leases([], self.path), [])
+
+
+class TestSwitchCandidates(TestCommon):
+
+    def test_is_switch_candidate(self):
+        """ Test switches are recognized by their hostname or vendor class, other clients are not. """
+        self.assertTrue(is_switch_candidate(lease_from_event({"ip": "10.10.10.101", "hostname": "SONiC-leaf1"})))
+        self.assertTrue(is_switch_candidate(lease_from_event({"ip": "10.10.10.102", "hostname": "onie-installer"})))
+        self.assertTrue(is_switch_candidate(
+            lease_from_event({"ip": "10.10.10.103", "hostname": "switch", "vendor_class": "onie_vendor:x86_64"})
+        ))
+        self.assertFalse(is_switch_candidate(lease_from_event({"ip": "10.10.10.104", "hostname": "laptop"})))
+        self.assertFalse(is_switch_candidate(lease_from_event({"ip": "10.10.10.105"})))
+
+    def test_is_switch_candidate_vendor_class_option(self):
+        """ Test the vendor class is also read from the lease options of a parsed leases file. """
+        parsed, _ = parse_leases(
+            "lease 10.10.10.101 {\n"
+            "  binding state active;\n"
+            "  hardware ethernet 0c:00:00:00:00:01;\n"
+            "  option vendor-class-identifier \"SONiC\";\n"
+            "}\n"
+        )
+        self.assertTrue(is_switch_candidate(parsed["10.10.10.101"]))
+
+    def test_discovered_device_index(self):
+        """ Test leases of discovered devices are matched by management ip or case insensitive mac. """
+        index = DiscoveredDeviceIndex([
+            {"mgt_ip": "10.10.10.101", "mac": "0C:00:00:00:00:01"},
+            {"mgt_ip": "10.10.10.102"},
+            {"mac": "0c:00:00:00:00:03"},
+        ])
+        self.assertIn(lease_from_event({"ip": "10.10.10.101", "mac": "0c:00:00:00:00:09"}), index)
+        self.assertIn(lease_from_event({"ip": "10.10.10.109", "mac": "0c:00:00:00:00:01"}), index)
+        self.assertIn(lease_from_event({"ip": "10.10.10.103", "mac": "0C:00:00:00:00:03"}), index)
+        self.assertNotIn(lease_from_event({"ip": "10.10.10.104", "mac": "0c:00:00:00:00:04"}), index)
+        self.assertNotIn(lease_from_event({"ip": "10.10.10.104"}), DiscoveredDeviceIndex(None))
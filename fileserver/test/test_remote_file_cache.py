@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from fileserver.dhcp import RemoteFileCache, get_sftp_file_content
+from fileserver.test.test_common import TestCommon
+
+
+def attr(size, mtime):
+    return SimpleNamespace(st_size=size, st_mtime=mtime)
+
+
+class TestRemoteFileCache(TestCommon):
+    ip = "10.10.10.10"
+
+    def setUp(self):
+        super().setUp()
+        self.cache = RemoteFileCache(max_entries=2)
+
+    def test_changed_file_is_not_served(self):
+        """ Test cached content is only returned while the size and modification time are unchanged. """
+        self.cache.put(self.ip, "/etc/dhcp/dhcpd.conf", attr(10, 100), b"content")
+        self.assertEqual(self.cache.get(self.ip, "/etc/dhcp/dhcpd.conf", attr(10, 100)), b"content")
+        self.assertIsNone(self.cache.get(self.ip, "/etc/dhcp/dhcpd.conf", attr(10, 101)))
+        self.assertIsNone(self.cache.get(self.ip, "/etc/dhcp/dhcpd.conf", attr(11, 100)))
+        self.assertIsNone(self.cache.get("10.10.10.11", "/etc/dhcp/dhcpd.conf", attr(10, 100)))
+
+    def test_least_recently_used_file_is_dropped(self):
+        """ Test the least recently used file is dropped beyond max_entries. """
+        self.cache.put(self.ip, "a", attr(1, 1), b"a")
+        self.cache.put(self.ip, "b", attr(1, 1), b"b")
+        self.cache.get(self.ip, "a", attr(1, 1))
+        self.cache.put(self.ip, "c", attr(1, 1), b"c")
+        self.assertEqual(self.cache.get(self.ip, "a", attr(1, 1)), b"a")
+        self.assertIsNone(self.cache.get(self.ip, "b", attr(1, 1)))
+        self.assertEqual(self.cache.get(self.ip, "c", attr(1, 1)), b"c")
+
+    def test_invalidate(self):
+        """ Test a single file or all files of a server are dropped, files of other servers are kept. """
+        self.cache.put(self.ip, "a", attr(1, 1), b"a")
+        self.cache.put("10.10.10.11", "a", attr(1, 1), b"other")
+        self.cache.invalidate(self.ip, "b")
+        self.assertEqual(self.cache.get(self.ip, "a", attr(1, 1)), b"a")
+        self.cache.invalidate(self.ip, "a")
+        self.assertIsNone(self.cache.get(self.ip, "a", attr(1, 1)))
+
+        self.cache.put(self.ip, "a", attr(1, 1), b"a")
+        self.cache.put(self.ip, "b", attr(1, 1), b"b")
+        self.cache.invalidate(self.ip)
+        self.assertIsNone(self.cache.get(self.ip, "a", attr(1, 1)))
+        self.assertIsNone(self.cache.get(self.ip, "b", attr(1, 1)))
+
+    def test_unchanged_file_is_not_transferred(self):
+        """ Test get_sftp_file_content only reads a remote file again after it changed. """
+        sftp = mock.MagicMock()
+        sftp.stat.return_value = attr(7, 100)
+        sftp.open.return_value.__enter__.return_value.read.return_value = b"content"
+        session = SimpleNamespace(key=(self.ip, "admin"), sftp=sftp)
+        with mock.patch("fileserver.dhcp.remote_file_cache", self.cache):
+            for _ in range(2):
+                self.assertEqual(
+                    get_sftp_file_content(session, "/etc/dhcp/", "dhcpd.conf"),
+                    {"content": b"content", "filename": "dhcpd.conf"},
+                )
+            self.assertEqual(sftp.open.call_count, 1)
+
+            sftp.stat.return_value = attr(7, 101)
+            get_sftp_file_content(session, "/etc/dhcp/", "dhcpd.conf")
+            self.assertEqual(sftp.open.call_count, 2)
+
+            self.cache.invalidate(self.ip)
+            get_sftp_file_content(session, "/etc/dhcp/", "dhcpd.conf")
+            self.assertEqual(sftp.open.call_count, 3)
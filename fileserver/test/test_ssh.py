@@ -0,0 +1,89 @@
+from unittest import mock
+
+from fileserver.ssh import SSHConnectionPool, ssh_session
+from fileserver.test.test_common import TestCommon
+
+
+def connect(ip, username):
+    client = mock.Mock()
+    client.get_transport.return_value.is_active.return_value = True
+    return client
+
+
+@mock.patch("fileserver.ssh.ssh_client_with_private_key", side_effect=connect)
+class TestSSHConnectionPool(TestCommon):
+    ip = "10.10.10.10"
+    username = "admin"
+
+    def setUp(self):
+        super().setUp()
+        self.pool = SSHConnectionPool(idle_timeout=60, max_connections=2, keepalive_interval=30)
+
+    def test_released_session_is_reused(self, ssh_client):
+        """ Test a released session is handed out again without a new connection. """
+        session = self.pool.acquire(self.ip, self.username)
+        self.pool.release(session)
+        self.assertIs(self.pool.acquire(self.ip, self.username), session)
+        self.assertEqual(ssh_client.call_count, 1)
+        # other users and servers get their own connection
+        self.assertIsNot(self.pool.acquire(self.ip, "other"), session)
+        self.assertEqual(ssh_client.call_count, 2)
+
+    def test_unhealthy_session_is_replaced(self, ssh_client):
+        """ Test a pooled session whose transport died is closed instead of reused. """
+        session = self.pool.acquire(self.ip, self.username)
+        self.pool.release(session)
+        session.client.get_transport.return_value.is_active.return_value = False
+        self.assertIsNot(self.pool.acquire(self.ip, self.username), session)
+        session.client.close.assert_called_once()
+
+    def test_idle_sessions_are_evicted(self, ssh_client):
+        """ Test sessions idle beyond the timeout and beyond the pool size are closed. """
+        sessions = [self.pool.acquire(self.ip, self.username) for _ in range(3)]
+        for session in sessions:
+            self.pool.release(session)
+        # the pool keeps max_connections sessions per server
+        sessions[2].client.close.assert_called_once()
+        self.pool.idle_timeout = 0
+        self.pool.evict_idle()
+        sessions[0].client.close.assert_called_once()
+        sessions[1].client.close.assert_called_once()
+        self.assertIsNot(self.pool.acquire(self.ip, self.username), sessions[0])
+
+    def test_discarded_session_is_closed(self, ssh_client):
+        """ Test a session released after a failed operation is not returned to the pool. """
+        session = self.pool.acquire(self.ip, self.username)
+        self.pool.release(session, discard=True)
+        session.client.close.assert_called_once()
+        self.assertIsNot(self.pool.acquire(self.ip, self.username), session)
+
+    def test_ssh_session_discards_on_error(self, ssh_client):
+        """ Test the ssh_session context manager closes the session when the block raises. """
+        with mock.patch("fileserver.ssh.ssh_pool", self.pool):
+            with self.assertRaises(OSError):
+                with ssh_session(self.ip, self.username) as session:
+                    raise OSError("sftp failed")
+            session.client.close.assert_called_once()
+            with ssh_session(self.ip, self.username) as healthy:
+                pass
+            self.assertIsNot(healthy, session)
+            healthy.client.close.assert_not_called()
+
+    def test_close_discards_sessions_in_use(self, ssh_client):
+        """ Test sessions checked out before the server's sessions were closed are not pooled again. """
+        in_use = self.pool.acquire(self.ip, self.username)
+        other_server = self.pool.acquire("10.10.10.11", self.username)
+        self.pool.close(self.ip)
+        self.pool.release(in_use)
+        self.pool.release(other_server)
+        in_use.client.close.assert_called_once()
+        other_server.client.close.assert_not_called()
+        # sessions opened after the close are pooled again
+        session = self.pool.acquire(self.ip, self.username)
+        self.pool.release(session)
+        self.assertIs(self.pool.acquire(self.ip, self.username), session)
+
+        all_servers = self.pool.acquire(self.ip, self.username)
+        self.pool.close()
+        self.pool.release(all_servers)
+        all_servers.client.close.assert_called_once()
@@ -0,0 +1,77 @@
+import json
+
+from django.test import override_settings
+from django.urls import reverse
+
+from fileserver.test.test_common import TestCommon
+
+
+class TestTemplates(TestCommon):
+    inventory_csv = "hostname,mac,ip\nsonic-leaf-1,00:11:22:33:44:01,10.10.10.1\nsonic-leaf-2,00:11:22:33:44:02,10.10.10.2\n"
+
+    @override_settings(ORCA_IMAGE_BASE_URL="http://10.10.10.100:8000/")
+    def test_render_templates_from_csv_inventory(self):
+        """
+        Test rendering ZTP files and DHCP host entries for a CSV inventory.
+        """
+        response = self.post_req("render_templates", {
+            "inventory": self.inventory_csv,
+            "ztp_template": "ztp_template.json",
+            "dhcp_host_template": "dhcpd_host_template.conf",
+        })
+        self.assertEqual(response.status_code, 200)
+        ztp_files = response.json()["ztp_files"]
+        self.assertEqual([f["filename"] for f in ztp_files], ["sonic-leaf-1.json", "sonic-leaf-2.json"])
+        metadata = json.loads(ztp_files[0]["content"])["DEVICE_METADATA"]["localhost"]
+        self.assertEqual(metadata["hostname"], "sonic-leaf-1")
+        self.assertEqual(metadata["mac"], "00:11:22:33:44:01")
+
+        dhcp_hosts = response.json()["dhcp_hosts"]
+        self.assertIn("host sonic-leaf-2 {", dhcp_hosts)
+        self.assertIn("fixed-address 10.10.10.2;", dhcp_hosts)
+        self.assertIn('"http://10.10.10.100:8000/files/download/ztp/sonic-leaf-1.json/"', dhcp_hosts)
+
+    @override_settings(ORCA_IMAGE_BASE_URL="")
+    def test_ztp_url_not_taken_from_request(self):
+        """
+        Test that the ztp_url is not built from the Host header of the request.
+        """
+        response = self.client.post(
+            reverse("render_templates"), {
+                "inventory": self.inventory_csv,
+                "ztp_template": "ztp_template.json",
+                "dhcp_host_template": "dhcpd_host_template.conf",
+            }, format="json", HTTP_HOST="attacker.example.com",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("attacker.example.com", response.json()["dhcp_hosts"])
+        self.assertNotIn("bootfile-name", response.json()["dhcp_hosts"])
+
+    def test_render_templates_rejects_duplicates(self):
+        """
+        Test that devices with the same MAC address are rejected.
+        """
+        response = self.post_req("render_templates", {
+            "inventory": [
+                {"hostname": "sonic-leaf-1", "mac": "00:11:22:33:44:01"},
+                {"hostname": "sonic-leaf-2", "mac": "00:11:22:33:44:01"},
+            ],
+            "dhcp_host_template": "dhcpd_host_template.conf",
+        })
+        self.assertEqual(response.status_code, 400)
+
+        response = self.post_req("render_templates", {
+            "inventory": [{"mac": "00:11:22:33:44:01"}],
+            "ztp_template": "ztp_template.json",
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_listed_templates_are_plain_files(self):
+        """
+        Test that the templates api serves ztp_template.json without template markup.
+        """
+        response = self.get_req("templates", {"filename": "ztp_template.json"})
+        self.assertEqual(response.status_code, 200)
+        metadata = json.loads(response.json()["content"])["DEVICE_METADATA"]["localhost"]
+        self.assertEqual(metadata["hostname"], "sonic")
+        self.assertEqual(metadata["mac"], "00:00:00:00:00:00")
@@ -1,3 +1,4 @@
+import hashlib
 import os
 
 from fileserver import constants
@@ -74,6 +75,43 @@ class TestZTP(TestCommon):
         response = self.get_req("host_ztp_files", {"filename": "ztp_test_renamed.json"})
         self.assertEqual(response.status_code, 404)
 
+    def test_ztp_file_list_metadata(self):
+        """
+        Test that ztp file listing returns metadata and checksum changes with the content.
+        """
+        data = {
+            "filename": "ztp_test_metadata.json",
+            "content": "test content"
+        }
+
+        # add ztp file
+        response = self.put_req("host_ztp_files", data)
+        self.assertEqual(response.status_code, 200)
+
+        # list ztp files
+        response = self.get_req("host_ztp_files")
+        self.assertEqual(response.status_code, 200)
+        file = next(i for i in response.json() if i["filename"] == data["filename"])
+        self.assertNotIn("content", file)
+        self.assertEqual(file["size"], len(data["content"]))
+        self.assertEqual(file["checksum"], hashlib.sha256(data["content"].encode()).hexdigest())
+
+        # update ztp file
+        data["content"] = "updated test content"
+        response = self.put_req("host_ztp_files", data)
+        self.assertEqual(response.status_code, 200)
+
+        # validate listing and content are updated
+        response = self.get_req("host_ztp_files")
+        file = next(i for i in response.json() if i["filename"] == data["filename"])
+        self.assertEqual(file["checksum"], hashlib.sha256(data["content"].encode()).hexdigest())
+        response = self.get_req("host_ztp_files", {"filename": data["filename"]})
+        self.assertEqual(response.json()["content"], data["content"])
+
+        # delete ztp file
+        response = self.del_req("host_ztp_files", {"filename": data["filename"]})
+        self.assertEqual(response.status_code, 200)
+
     @classmethod
     def setUpClass(cls):
         app_directory = os.path.dirname(os.path.abspath(__file__))  # Get the path of the current app
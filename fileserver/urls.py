@@ -7,7 +7,11 @@ urlpatterns = [
     path("ztp/rename", views.rename_ztp_file, name="rename_ztp_file"),
     path("dhcp/credentials", views.dhcp_auth, name="dhcp_credentials"),
     path("dhcp/config", views.dhcp_config, name="dhcp_config"),
+    path("dhcp/config/validate", views.dhcp_config_validate, name="dhcp_config_validate"),
+    path("dhcp/config/edit", views.dhcp_config_edit, name="dhcp_config_edit"),
     path("dhcp/backups", views.dhcp_backup, name="dhcp_backups"),
     path("dhcp/list", views.get_dhcp_device, name="dhcp_list"),
+    path("dhcp/leases", views.ingest_dhcp_leases, name="dhcp_leases"),
     path("templates", views.get_templates, name="templates"),
+    path("templates/render", views.render_templates, name="render_templates"),
 ]
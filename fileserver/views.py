@@ -1,8 +1,9 @@
 import ipaddress
+import json
 import os
 
+from django.conf import settings
 from django.forms import model_to_dict
-from django.http import FileResponse
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
@@ -10,7 +11,13 @@ from rest_framework.response import Response
 
 from fileserver.dhcp import get_dhcp_config, put_dhcp_config, get_dhcp_backup_file, get_dhcp_backup_files_list, \
     update_dhcp_access, delete_dhcp_backup_file
+from fileserver.downloads import serve_file
+from fileserver.file_index import get_file_index, list_files
+from fileserver.rendering import render_inventory, parse_inventory, TemplateRenderError
+from fileserver.dhcp_config import validate_dhcp_config, DHCPConfigError
 from fileserver.models import DHCPServerDetails, DHCPDevices
+from fileserver.scheduler import apply_lease_events
+from fileserver.ssh import ssh_pool
 from fileserver import ztp, constants
 from log_manager.decorators import log_request
 from log_manager.logger import get_backend_logger
@@ -26,13 +33,12 @@ def download_file(request, filepath=None):
         app_directory = os.path.dirname(os.path.abspath(__file__))  # Get the path of the current app
         path = os.path.join(app_directory, 'media/download', filepath)
         if os.path.isfile(path):
-            return FileResponse(open(path, 'rb'), as_attachment=True, filename=filepath)
+            return serve_file(request, path, filename=os.path.basename(filepath))
         elif os.path.isdir(path):
             return Response(
                 [{
-                    "filename": f, "path": f"files/download/{filepath}/{f}"
-                } for f in os.listdir(path)
-                    if os.path.isfile(os.path.join(path, f))],
+                    **f, "path": f"files/download/{filepath}/{f['filename']}"
+                } for f in list_files(path)],
                 status=status.HTTP_200_OK
             )
         else:
@@ -123,6 +129,13 @@ def dhcp_config(request):
             return Response({"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
     if request.method == "PUT":
         req_list = request.data if isinstance(request.data, list) else [request.data]
+        # reject invalid configs before any of them is pushed
+        for req_data in req_list:
+            try:
+                validate_dhcp_config(req_data.get("content", ""))
+            except DHCPConfigError as e:
+                _logger.error("Invalid DHCP config %s", e)
+                return Response({"message": str(e), "errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
         for req_data in req_list:
             dhcp_creds = DHCPServerDetails.objects.filter(device_ip=req_data.get("device_ip")).first()
             if not dhcp_creds:
@@ -214,6 +227,7 @@ def dhcp_auth(request):
             dhcp_obj = DHCPServerDetails.objects.filter(device_ip=device_ip).first()
             if dhcp_obj:
                 dhcp_obj.delete()
+            ssh_pool.close(device_ip)
             result.append({"message": f"{request.method} request successful", "status": "success"})
     return Response(
         {"result": result},
@@ -223,6 +237,96 @@ def dhcp_auth(request):
     )
 
 
+@api_view(["POST"])
+def dhcp_config_validate(request):
+    """
+    Validates a dhcpd.conf locally, without connecting to the DHCP server.
+    """
+    if request.method == "POST":
+        try:
+            config = validate_dhcp_config(request.data.get("content", ""))
+        except DHCPConfigError as e:
+            return Response({"message": str(e), "errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            {
+                "message": "DHCP configuration is valid.",
+                "subnets": [str(subnet.network) for subnet in config.subnets],
+                "hosts": len(config.hosts),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+@api_view(["POST"])
+@log_request
+def dhcp_config_edit(request):
+    """
+    Applies structured edits to a dhcpd.conf and returns the resulting config.
+    The config is taken from the request content or, if not given, from the DHCP server of device_ip.
+    Supported edits are {"action": "add_host", "name", "mac", "ip", "statements"} and
+    {"action": "add_range", "start", "end"}. With apply set the result is pushed to the DHCP server.
+    """
+    if request.method == "POST":
+        req_data = request.data
+        device_ip = req_data.get("device_ip")
+        dhcp_creds = DHCPServerDetails.objects.filter(device_ip=device_ip).first() if device_ip else None
+        if "content" not in req_data and not dhcp_creds:
+            _logger.error("Required field content or device_ip with DHCP credentials not found.")
+            return Response(
+                {"message": "Required field content or device_ip with DHCP credentials not found."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            content = req_data.get("content")
+            if content is None:
+                content = get_dhcp_config(ip=device_ip, username=dhcp_creds.username)["content"]
+                content = content.decode("utf-8") if isinstance(content, bytes) else content
+            config = validate_dhcp_config(content)
+            for edit in req_data.get("edits", []):
+                if edit.get("action") == "add_host":
+                    config.add_host(
+                        name=edit.get("name"), mac=edit.get("mac"), ip=edit.get("ip"),
+                        statements=edit.get("statements", []),
+                    )
+                elif edit.get("action") == "add_range":
+                    config.add_range(start=edit.get("start"), end=edit.get("end"))
+                else:
+                    raise DHCPConfigError(f"Invalid edit action {edit.get('action')}.")
+            content = config.to_text()
+        except DHCPConfigError as e:
+            _logger.error("Invalid DHCP config edit %s", e)
+            return Response({"message": str(e), "errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            _logger.error("Internal server error %s", e)
+            return Response({"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if not req_data.get("apply"):
+            return Response({"content": content}, status=status.HTTP_200_OK)
+        if not dhcp_creds:
+            return Response(
+                {"message": "No credentials found for this device"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        try:
+            output, error = put_dhcp_config(ip=device_ip, username=dhcp_creds.username, content=content)
+            if error:
+                _logger.error(error)
+                return Response(
+                    {"content": content, "result": [{"message": error, "status": "failed"}]},
+                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                )
+            _logger.info(output)
+            return Response(
+                {
+                    "content": content,
+                    "result": [{"message": f"{request.method} request successful", "status": "success"}],
+                },
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            _logger.error("Internal server error %s", e)
+            return Response({"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @api_view(["GET", "DELETE"])
 @log_request
 def dhcp_backup(request):
@@ -310,6 +414,71 @@ def get_dhcp_device(request):
             return Response({"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _lease_event_error(event):
+    """
+    Validate a pushed lease event.
+
+    Args:
+        event: The lease event.
+
+    Returns:
+        str: The validation error, None if the event is valid.
+    """
+    if not isinstance(event, dict):
+        return "Lease event must be an object."
+    if not event.get("ip"):
+        return "Required field ip not found."
+    try:
+        ipaddress.ip_address(event["ip"])
+    except ValueError as e:
+        return str(e)
+    if event.get("action", "commit") not in constants.dhcp_lease_actions:
+        return f"Invalid lease action {event.get('action')}."
+    return None
+
+
+@api_view(["POST"])
+def ingest_dhcp_leases(request):
+    """
+    Accepts batches of lease events pushed from the DHCP server, e.g. by an `on commit` hook or a leases file
+    tail agent, and updates the DHCP devices list incrementally. The leases file scan stays as reconciliation.
+
+    Each event requires ip and action (commit, release or expiry), mac, hostname and vendor_class are optional.
+    A batch with an invalid event is rejected with 400 and the index of the event in the batch.
+    Requests are not recorded in the request log, the DHCP server pushes events too often for that.
+    """
+    if request.method == "POST":
+        req_data_list = request.data if isinstance(request.data, list) else [request.data]
+        events = []
+        for req_data in req_data_list:
+            leases = req_data.get("leases", [req_data]) if isinstance(req_data, dict) else [req_data]
+            events.extend(leases if isinstance(leases, list) else [leases])
+        for index, event in enumerate(events):
+            error = _lease_event_error(event)
+            if error:
+                _logger.error("Invalid lease event %s: %s", index, error)
+                return Response(
+                    {"message": f"Invalid lease event {index}: {error}", "index": index},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        try:
+            updated, removed = apply_lease_events(events)
+            _logger.info("Applied %s DHCP lease events.", len(events))
+            return Response(
+                {"result": [{
+                    "message": f"{request.method} request successful, updated: {updated}, removed: {removed}",
+                    "status": "success"
+                }]},
+                status=status.HTTP_200_OK,
+            )
+        except Exception as e:
+            _logger.error("Failed to apply DHCP lease events. Error: %s", e)
+            return Response(
+                {"result": [{"message": str(e), "status": "failed"}]},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            )
+
+
 @api_view(["GET"])
 def get_templates(request):
     if request.method == "GET":
@@ -317,10 +486,13 @@ def get_templates(request):
             _logger.info("Getting templates")
             app_directory = os.path.dirname(os.path.abspath(__file__))
             template_directory = os.path.join(app_directory, constants.templates_path)
-            files = []
-            for file in os.listdir(template_directory):
-                with open(os.path.join(template_directory, file), "r") as f:
-                    files.append({"filename": file, "content": f.read()})
+            filename = request.GET.get("filename", "")
+            if filename:
+                content = get_file_index(template_directory).read(os.path.basename(filename))
+                return Response({"filename": filename, "content": content}, status=status.HTTP_200_OK)
+            if not os.path.isdir(template_directory):
+                raise FileNotFoundError(f"No such directory: '{template_directory}'")
+            files = list_files(template_directory)
             return Response(files, status=status.HTTP_200_OK) if files else Response(status=status.HTTP_204_NO_CONTENT)
         except FileNotFoundError as e:
             _logger.error(e)
@@ -330,6 +502,62 @@ def get_templates(request):
             return Response({"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(["POST"])
+@log_request
+def render_templates(request):
+    """
+    Renders ZTP files and DHCP host entries for an inventory of devices in one request.
+    The inventory is a list of devices, JSON or CSV text, or an uploaded CSV/JSON file, every device needs a hostname.
+    The templates are read from media/render_templates, not from the templates listed by get_templates.
+    The ztp_url of every device is built from ORCA_IMAGE_BASE_URL, the URL of the backend as seen by the devices,
+    it is not set while ORCA_IMAGE_BASE_URL is unset unless given in the variables.
+    With save set the rendered ZTP files are hosted as ZTP files.
+    """
+    if request.method == "POST":
+        req_data = request.data
+        inventory = request.FILES["inventory"].read() if "inventory" in request.FILES else req_data.get("inventory")
+        ztp_template = req_data.get("ztp_template", "")
+        dhcp_host_template = req_data.get("dhcp_host_template", "")
+        if not inventory or not (ztp_template or dhcp_host_template):
+            _logger.error("Required fields inventory and ztp_template or dhcp_host_template not found.")
+            return Response(
+                {"message": "Required fields inventory and ztp_template or dhcp_host_template not found."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        variables = req_data.get("variables") or {}
+        try:
+            if isinstance(variables, str):
+                variables = json.loads(variables)
+        except json.JSONDecodeError as e:
+            _logger.error("Invalid variables %s", e)
+            return Response({"message": f"Invalid variables: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+        base_url = settings.ORCA_IMAGE_BASE_URL
+        if ztp_template and not base_url:
+            _logger.warning("ORCA_IMAGE_BASE_URL is not set, rendering without ztp_url.")
+        try:
+            ztp_files, dhcp_hosts = render_inventory(
+                parse_inventory(inventory),
+                ztp_template=ztp_template,
+                dhcp_host_template=dhcp_host_template,
+                ztp_url=(
+                    (lambda f: f"{base_url.rstrip('/')}/files/download/ztp/{f}/") if ztp_template and base_url else None
+                ),
+                variables=variables,
+            )
+        except FileNotFoundError as e:
+            _logger.error("Template not found %s", e)
+            return Response({"message": str(e)}, status=status.HTTP_404_NOT_FOUND)
+        except TemplateRenderError as e:
+            _logger.error("Failed to render templates %s", e)
+            return Response({"message": str(e), "errors": e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        if str(req_data.get("save", "")).lower() in ("true", "1"):
+            for file in ztp_files:
+                ztp.add_ztp_file(file["filename"], file["content"])
+                file["path"] = f"files/download/ztp/{file['filename']}"
+            _logger.info("Saved %s rendered ZTP files.", len(ztp_files))
+        return Response({"ztp_files": ztp_files, "dhcp_hosts": dhcp_hosts}, status=status.HTTP_200_OK)
+
+
 @api_view(["PUT"])
 @log_request
 def rename_ztp_file(request):
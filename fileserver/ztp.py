@@ -1,6 +1,8 @@
 import os
 
 from fileserver import constants
+from fileserver.blobstore import store_file, remove_file
+from fileserver.file_index import get_file_index, list_files
 
 
 def get_ztp_path():
@@ -17,22 +19,22 @@ def get_ztp_path():
 
 def get_ztp_files(filename=None) -> list | dict:
     """
-    Get ztp files if filename is not None, else get all ztp files.
+    Get ztp file if filename is not None, else list all ztp files.
 
     Args:
         filename (str, optional): The name of the file to retrieve. Defaults to None.
 
     Returns:
-        list | dict: A list of dictionaries, each containing the content of a ztp file and its name.
+        list | dict: The content and name of the ztp file, or a list of dictionaries with the
+            name, size, modification time and checksum of each ztp file.
     """
     ztp_path = get_ztp_path()
     if filename:
         return _get_ztp_file_content(ztp_path, filename)
     else:
         return [
-            _get_ztp_file_content(ztp_path, f)
-            for f in os.listdir(ztp_path)
-            if os.path.isfile(os.path.join(ztp_path, f))
+            {**f, "path": f"files/download/ztp/{f['filename']}"}
+            for f in list_files(ztp_path)
         ]
 
 
@@ -47,8 +49,8 @@ def _get_ztp_file_content(path, filename) -> dict:
     Returns:
         dict: A dictionary containing the content of the specified file and its name.
     """
-    with open(os.path.join(path, filename), 'r') as f:
-        return {"content": f.read(), "filename": filename, "path": f"files/download/ztp/{filename}"}
+    content = get_file_index(path).read(filename)
+    return {"content": content, "filename": filename, "path": f"files/download/ztp/{filename}"}
 
 
 def add_ztp_file(filename, content):
@@ -61,8 +63,8 @@ def add_ztp_file(filename, content):
     """
     ztp_path = get_ztp_path()
     os.makedirs(ztp_path, exist_ok=True)
-    with open(os.path.join(ztp_path, filename), 'w') as f:
-        f.write(content)
+    store_file(os.path.join(ztp_path, filename), content)
+    get_file_index(ztp_path).remove(filename)
 
 
 def delete_ztp_file(filename):
@@ -74,7 +76,8 @@ def delete_ztp_file(filename):
     """
     ztp_path = get_ztp_path()
     if os.path.exists(os.path.join(ztp_path, filename)):
-        os.remove(os.path.join(ztp_path, filename))
+        remove_file(os.path.join(ztp_path, filename))
+    get_file_index(ztp_path).remove(filename)
 
 
 def rename_ztp_file(old_filename, new_filename):
@@ -90,3 +93,4 @@ def rename_ztp_file(old_filename, new_filename):
         os.rename(
             os.path.join(ztp_path, old_filename), os.path.join(ztp_path, new_filename)
         )
+        get_file_index(ztp_path).rename(old_filename, new_filename)
@@ -1,6 +1,13 @@
+import sys
+
 from django.apps import AppConfig
 
 
 class LogManagerConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "log_manager"
+
+    def ready(self):
+        if 'runserver' in sys.argv:
+            from log_manager.retention import add_retention_scheduler
+            add_retention_scheduler()
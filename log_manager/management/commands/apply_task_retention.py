@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from log_manager.retention import expire_task_results, compress_task_results
+
+
+class Command(BaseCommand):
+    help = "Delete expired celery task results, keeping a summary of each, and compress large task results."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None, help="Retention period in days.")
+        parser.add_argument("--min-size", type=int, default=None, help="Minimum size of compressed results.")
+
+    def handle(self, *args, **options):
+        expired = expire_task_results(days=options["days"])
+        compressed = compress_task_results(min_size=options["min_size"])
+        self.stdout.write(f"Expired {expired} task results, compressed {compressed} task results.")
@@ -15,3 +15,24 @@ class Logs(models.Model):
     http_path = models.CharField(max_length=64)
 
     objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-timestamp"]),
+            models.Index(fields=["http_path"]),
+        ]
+
+
+class TaskSummary(models.Model):
+    """
+    Summary of an expired celery task result, kept after the full result is deleted.
+    """
+    task_id = models.CharField(max_length=255, unique=True)
+    task_name = models.CharField(max_length=255, blank=True, default="")
+    status = models.CharField(max_length=50, db_index=True)
+    http_path = models.CharField(max_length=255, blank=True, default="")
+    date_created = models.DateTimeField(db_index=True)
+    date_done = models.DateTimeField(null=True)
+    processing_time = models.FloatField(default=0)
+
+    objects = models.Manager()
@@ -0,0 +1,13 @@
+from django_celery_results.backends import database
+
+from log_manager.retention import decompress_result
+
+
+class DatabaseBackend(database.DatabaseBackend):
+    """
+    django-db result backend reading task results compressed by the task result retention,
+    so AsyncResult.result returns the original result.
+    """
+
+    def decode_content(self, obj, content):
+        return super().decode_content(obj, decompress_result(content))
@@ -0,0 +1,198 @@
+import ast
+import atexit
+import base64
+import datetime
+import json
+import zlib
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from celery import states
+from django.conf import settings
+from django.db.models.functions import Length
+from django_celery_results.models import TaskResult
+
+from log_manager.logger import get_backend_logger
+from log_manager.models import TaskSummary
+
+_logger = get_backend_logger()
+scheduler = BackgroundScheduler()
+
+# Number of task results expired or compressed per database round trip.
+batch_size = 500
+# Hours between two runs of the retention job.
+retention_interval = 1
+# Compressed results are stored as JSON objects starting with this prefix.
+compressed_prefix = '{"__compressed__": '
+
+
+def shutdown_scheduler():
+    if scheduler.running:
+        scheduler.shutdown()
+        _logger.info("Task retention scheduler stopped")
+
+
+atexit.register(shutdown_scheduler)
+
+
+def add_retention_scheduler(job_id="task_retention", hours=retention_interval):
+    if not scheduler.get_job(job_id):
+        scheduler.add_job(
+            func=apply_task_retention,
+            trigger="interval",
+            hours=hours,
+            id=job_id,
+            replace_existing=True,
+            max_instances=1,
+        )
+        _logger.info("Task retention scheduler job added")
+    if not scheduler.running:
+        scheduler.start()
+        _logger.info("Task retention scheduler started")
+
+
+def compress_result(result):
+    """
+    Compress a serialized task result, the compressed result is still valid JSON.
+
+    Args:
+        result (str): The JSON task result.
+
+    Returns:
+        str: The compressed result.
+    """
+    data = base64.b64encode(zlib.compress(result.encode("utf-8"), 6)).decode("ascii")
+    return json.dumps({"__compressed__": "zlib", "data": data})
+
+
+def decompress_result(result):
+    """
+    Decompress a stored task result, results which are not compressed are returned unchanged.
+
+    Args:
+        result (str): The stored task result.
+
+    Returns:
+        str: The JSON task result.
+    """
+    if isinstance(result, str) and result.startswith(compressed_prefix):
+        return zlib.decompress(base64.b64decode(json.loads(result)["data"])).decode("utf-8")
+    return result
+
+
+def load_task_result(result):
+    """
+    Load a stored task result, compressed or not.
+
+    Args:
+        result (str): The stored task result.
+
+    Returns:
+        The deserialized task result.
+    """
+    if not result:
+        return {}
+    return json.loads(decompress_result(result))
+
+
+def _summary(task):
+    try:
+        task_kwargs = ast.literal_eval(task.task_kwargs.strip('\"')) if task.task_kwargs else {}
+    except (ValueError, SyntaxError):
+        task_kwargs = {}
+    date_done = task.date_done or task.date_created
+    return TaskSummary(
+        task_id=task.task_id,
+        task_name=task.task_name or "",
+        status=task.status,
+        http_path=str(task_kwargs.get("http_path", "")) if isinstance(task_kwargs, dict) else "",
+        date_created=task.date_created,
+        date_done=task.date_done,
+        processing_time=(date_done - task.date_created).total_seconds(),
+    )
+
+
+def expire_task_results(days=None):
+    """
+    Delete finished task results older than the retention period in batches, keeping a summary of each task.
+    Only the newest TASK_SUMMARY_MAX_COUNT summaries are kept.
+
+    Args:
+        days (int, optional): The retention period in days, defaults to TASK_RESULT_RETENTION_DAYS.
+
+    Returns:
+        int: The number of expired task results.
+    """
+    days = settings.TASK_RESULT_RETENTION_DAYS if days is None else days
+    cutoff = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(days=days)
+    expired = 0
+    while True:
+        tasks = list(
+            TaskResult.objects.filter(date_done__lt=cutoff, status__in=states.READY_STATES)
+            .defer("result", "traceback", "meta", "task_args")
+            .order_by("id")[:batch_size]
+        )
+        if not tasks:
+            break
+        TaskSummary.objects.bulk_create([_summary(task) for task in tasks], ignore_conflicts=True)
+        TaskResult.objects.filter(id__in=[task.id for task in tasks]).delete()
+        expired += len(tasks)
+    if expired:
+        _logger.info("Expired %s task results older than %s days.", expired, days)
+    _prune_summaries()
+    return expired
+
+
+def _prune_summaries():
+    max_count = settings.TASK_SUMMARY_MAX_COUNT
+    while True:
+        stale_ids = list(
+            TaskSummary.objects.order_by("-date_created", "-id")
+            .values_list("id", flat=True)[max_count:max_count + batch_size]
+        )
+        if not stale_ids:
+            break
+        TaskSummary.objects.filter(id__in=stale_ids).delete()
+
+
+def compress_task_results(min_size=None):
+    """
+    Compress the results of finished tasks larger than min_size in batches.
+
+    Args:
+        min_size (int, optional): The minimum result size in characters, defaults to TASK_RESULT_COMPRESS_MIN_SIZE.
+
+    Returns:
+        int: The number of compressed task results.
+    """
+    min_size = settings.TASK_RESULT_COMPRESS_MIN_SIZE if min_size is None else min_size
+    compressed = 0
+    last_id = 0
+    while True:
+        tasks = list(
+            TaskResult.objects.annotate(result_size=Length("result"))
+            .filter(id__gt=last_id, status__in=states.READY_STATES, result_size__gt=min_size)
+            .exclude(result__startswith=compressed_prefix)
+            .only("id", "result")
+            .order_by("id")[:batch_size]
+        )
+        if not tasks:
+            break
+        last_id = tasks[-1].id
+        for task in tasks:
+            task.result = compress_result(task.result)
+        TaskResult.objects.bulk_update(tasks, ["result"])
+        compressed += len(tasks)
+    if compressed:
+        _logger.info("Compressed %s task results.", compressed)
+    return compressed
+
+
+def apply_task_retention():
+    """
+    Expire old task results and compress large ones.
+    """
+    try:
+        expire_task_results()
+        compress_task_results()
+    except Exception as e:
+        _logger.error(f"Failed to apply task result retention, Reason: {e}")
@@ -1,3 +1,6 @@
+from celery import states
+from django_celery_results.models import TaskResult
+
 from log_manager.serializers import LogSerializer
 from log_manager.test.test_common import TestCommon
 
@@ -56,3 +59,32 @@ class TestGetLogs(TestCommon):
 
 
 
+
+    def test_get_logs_merged_with_tasks(self):
+        for i in range(3):
+            serializer = LogSerializer(
+                data={
+                    "timestamp": f"2024-01-0{i + 1} 00:00:00",
+                    "request_json": {},
+                    "processing_time": 0,
+                    "status": "success",
+                    "response": {},
+                    "http_method": "POST",
+                    "http_path": "/test",
+                    "status_code": 200
+                }
+            )
+            if serializer.is_valid():
+                serializer.save()
+        for i in range(3):
+            TaskResult.objects.store_result(
+                "application/json", "utf-8", f"task_{i}", "{}", states.SUCCESS, task_kwargs="{}"
+            )
+        response = self.client.get("/logs/all/1?size=4", HTTP_AUTHORIZATION=self.tkn)
+        assert response.status_code == 200
+        assert [i.get("task_id") for i in response.json()][:3] == ["task_2", "task_1", "task_0"]
+        assert len(response.json()) == 4
+        response = self.client.get("/logs/all/2?size=4", HTTP_AUTHORIZATION=self.tkn)
+        assert [i["timestamp"] for i in response.json()] == ["2024-01-02 00:00:00", "2024-01-01 00:00:00"]
+        response = self.client.get("/logs/all/3?size=4", HTTP_AUTHORIZATION=self.tkn)
+        assert response.status_code == 204
@@ -0,0 +1,63 @@
+import datetime
+import json
+
+from celery import states
+from celery.result import AsyncResult
+from django.test import TestCase, override_settings
+from django_celery_results.models import TaskResult
+
+from log_manager.models import TaskSummary
+from log_manager.retention import expire_task_results, compress_task_results, load_task_result, compressed_prefix
+from log_manager.views import get_celery_tasks_data
+from orca_backend.celery import app
+
+
+class TestTaskRetention(TestCase):
+
+    def add_task(self, task_id, status, age_days, result="{}"):
+        TaskResult.objects.store_result(
+            "application/json", "utf-8", task_id, result, status,
+            task_name="orca_setup.tasks.install_task", task_kwargs="{'http_path': '/install_image'}",
+        )
+        date = datetime.datetime.now(tz=datetime.timezone.utc) - datetime.timedelta(days=age_days)
+        TaskResult.objects.filter(task_id=task_id).update(date_created=date, date_done=date)
+
+    def test_expire_task_results(self):
+        self.add_task("old-success", states.SUCCESS, 40)
+        self.add_task("old-pending", states.PENDING, 40)
+        self.add_task("new-success", states.SUCCESS, 1)
+        self.assertEqual(expire_task_results(days=30), 1)
+        self.assertEqual(
+            sorted(TaskResult.objects.values_list("task_id", flat=True)), ["new-success", "old-pending"]
+        )
+        summary = TaskSummary.objects.get(task_id="old-success")
+        self.assertEqual(summary.status, states.SUCCESS)
+        self.assertEqual(summary.http_path, "/install_image")
+        # expired tasks are still listed in the logs
+        listed = {task["task_id"]: task for task in get_celery_tasks_data()}
+        self.assertEqual(sorted(listed), ["new-success", "old-pending", "old-success"])
+        self.assertEqual(listed["old-success"]["http_path"], "/install_image")
+        self.assertEqual(listed["old-success"]["response"], {})
+
+    @override_settings(TASK_SUMMARY_MAX_COUNT=2)
+    def test_summaries_are_bounded(self):
+        for age in range(40, 45):
+            self.add_task(f"old-{age}", states.SUCCESS, age)
+        self.assertEqual(expire_task_results(days=30), 5)
+        self.assertEqual(sorted(TaskSummary.objects.values_list("task_id", flat=True)), ["old-40", "old-41"])
+
+    def test_compress_task_results(self):
+        result = json.dumps({f"10.10.10.{i}": {"status": "success", "details": "installed"} for i in range(200)})
+        self.add_task("large", states.SUCCESS, 1, result=result)
+        self.add_task("small", states.SUCCESS, 1)
+        self.add_task("running", states.STARTED, 1, result=result)
+        self.assertEqual(compress_task_results(min_size=1024), 1)
+        self.assertEqual(compress_task_results(min_size=1024), 0)
+
+        stored = TaskResult.objects.get(task_id="large").result
+        self.assertTrue(stored.startswith(compressed_prefix))
+        self.assertLess(len(stored), len(result) / 4)
+        self.assertEqual(load_task_result(stored), json.loads(result))
+        self.assertEqual(load_task_result(TaskResult.objects.get(task_id="small").result), {})
+        # celery consumers still read the original result
+        self.assertEqual(AsyncResult("large", app=app).result, json.loads(result))
@@ -1,9 +1,8 @@
 import ast
 import datetime
-import json
 
 from celery import states
-from django.core.paginator import Paginator, EmptyPage
+from django.core.paginator import EmptyPage
 from django_celery_results.models import TaskResult
 from rest_framework import status
 from rest_framework.decorators import api_view
@@ -11,7 +10,8 @@ from rest_framework.request import Request
 from rest_framework.response import Response
 
 from log_manager.logger import get_backend_logger
-from log_manager.models import Logs
+from log_manager.models import Logs, TaskSummary
+from log_manager.retention import load_task_result
 from orca_backend.celery import cancel_task
 
 _logger = get_backend_logger()
@@ -33,10 +33,11 @@ def get_logs(request: Request, **kwargs):
         final_result = []
         query_params = request.query_params
         items = Logs.objects.all().order_by("-timestamp")
-        paginator = Paginator(items, query_params.get("size", 10))  # sizeof return list
-        logs_result = paginator.page(kwargs["page"])  # page no
-        final_result.extend(logs_result.object_list.values())  # add logs
-        final_result.extend(get_celery_tasks_data())  # add celery task data
+        size = int(query_params.get("size", 10))  # sizeof return list
+        # logs and celery tasks are merged by timestamp, only the newest page * size entries of each can be on the page
+        end = kwargs["page"] * size  # page no
+        final_result.extend(items[:end].values())  # add logs
+        final_result.extend(get_celery_tasks_data(limit=end))  # add celery task data
 
         # sort by timestamp
         final_result.sort(
@@ -45,12 +46,15 @@ def get_logs(request: Request, **kwargs):
             ),
             reverse=True
         )
+        final_result = final_result[end - size:end]
+        if not final_result and kwargs["page"] > 1:
+            raise EmptyPage("That page contains no results")
         return Response(final_result, status=status.HTTP_200_OK)
     except EmptyPage as e:
-        _logger.error("EmptyPage Error: ", e)
+        _logger.error("EmptyPage Error: %s", e)
         return Response({"message": str(e)}, status=status.HTTP_204_NO_CONTENT)
     except Exception as e:
-        _logger.error("Error: ", e)
+        _logger.error("Error: %s", e)
         return Response({"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
@@ -84,18 +88,22 @@ def delete_logs(request: Request, **kwargs):
             delete_celery_tasks_data()
         return Response({"message": "deleted successfully."}, status=status.HTTP_200_OK)
     except Exception as e:
-        _logger.error("Error: ", e)
+        _logger.error("Error: %s", e)
         return Response({"message": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-def get_celery_tasks_data() -> list:
+def get_celery_tasks_data(limit: int = None) -> list:
     """
-    function to get celery tasks data from database
+    function to get celery tasks data from database, expired tasks are listed from their summaries
 
+    Parameters:
+        - limit: maximum number of tasks and of expired tasks, newest first
     Returns:
         - list: celery tasks data
     """
-    task_results = TaskResult.objects.all()
+    task_results = TaskResult.objects.order_by("-date_created")
+    if limit is not None:
+        task_results = task_results[:limit]
     result_data = []
     for result in task_results:
         try:
@@ -110,12 +118,29 @@ def get_celery_tasks_data() -> list:
                 "status_code": 200,
                 "http_method": "PUT",
                 "processing_time": (result.date_done - result.date_created).total_seconds(),
-                "response": json.loads(result.result),
+                "response": load_task_result(result.result),
                 "request_json": task_kwargs,
                 "http_path": http_path,
                 "task_id": result.task_id,
             }
         )
+    summaries = TaskSummary.objects.order_by("-date_created")
+    if limit is not None:
+        summaries = summaries[:limit]
+    for summary in summaries:
+        result_data.append(
+            {
+                "status": summary.status,
+                "timestamp": summary.date_created.strftime("%Y-%m-%d %H:%M:%S"),
+                "status_code": 200,
+                "http_method": "PUT",
+                "processing_time": summary.processing_time,
+                "response": {},
+                "request_json": {},
+                "http_path": summary.http_path,
+                "task_id": summary.task_id,
+            }
+        )
     return result_data
 
 
@@ -129,8 +154,10 @@ def delete_celery_tasks_data(task_ids: list = None) -> None:
         - None
     """
     tasks = TaskResult.objects.exclude(status=states.STARTED)
+    summaries = TaskSummary.objects.all()
     if task_ids:
         tasks = tasks.filter(task_id__in=task_ids)
+        summaries = summaries.filter(task_id__in=task_ids)
     for i in tasks:
         # cancel task if not started
         if i.status == states.PENDING:
@@ -138,3 +165,4 @@ def delete_celery_tasks_data(task_ids: list = None) -> None:
 
     # delete all task
     tasks.delete()
+    summaries.delete()
@@ -0,0 +1,113 @@
+""" Timing instrumentation for discovery. """
+import math
+import time
+from contextlib import contextmanager
+
+from network.models import DiscoveryStats
+from log_manager.logger import get_backend_logger
+
+_logger = get_backend_logger()
+
+# Number of samples kept per device and feature.
+max_samples = 100
+# Feature name used for a full device discovery.
+all_features = "all"
+
+
+@contextmanager
+def discovery_timer(device_ip: str, feature: str = all_features):
+    """
+    Context manager recording the duration of a discovery run.
+    The sample is stored as failed when the wrapped block raises.
+
+    Args:
+        device_ip (str): The IP address of the device being discovered.
+        feature (str, optional): The discovered feature. Defaults to all features.
+    """
+    start = time.perf_counter()
+    success = False
+    try:
+        yield
+        success = True
+    finally:
+        duration = time.perf_counter() - start
+        try:
+            record_discovery_time(device_ip, feature, duration, success)
+        except Exception as e:
+            _logger.error("Failed to record discovery time for %s. Error: %s", device_ip, e)
+
+
+def record_discovery_time(device_ip: str, feature: str, duration: float, success: bool = True):
+    """
+    Store a discovery duration sample and drop samples beyond the rolling window.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        feature (str): The discovered feature.
+        duration (float): Duration of the discovery in seconds.
+        success (bool, optional): Whether the discovery succeeded.
+    """
+    feature = str(feature)
+    DiscoveryStats.objects.create(device_ip=device_ip, feature=feature, duration=duration, success=success)
+    stale_ids = DiscoveryStats.objects.filter(
+        device_ip=device_ip, feature=feature
+    ).order_by("-timestamp", "-id").values_list("id", flat=True)[max_samples:]
+    if stale_ids:
+        DiscoveryStats.objects.filter(id__in=list(stale_ids)).delete()
+
+
+def percentile(sorted_values: list, pct: float):
+    """
+    Nearest-rank percentile of an ascending sorted list.
+
+    Args:
+        sorted_values (list): Values sorted in ascending order.
+        pct (float): The percentile between 0 and 100.
+
+    Returns:
+        float: The percentile value, None for an empty list.
+    """
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def get_discovery_stats(device_ip: str = None, feature: str = None) -> list:
+    """
+    Aggregate the stored discovery durations per device and feature.
+
+    Args:
+        device_ip (str, optional): Only return stats of this device.
+        feature (str, optional): Only return stats of this feature.
+
+    Returns:
+        list: Stats per device and feature, slowest p95 first.
+    """
+    samples = DiscoveryStats.objects.all()
+    if device_ip:
+        samples = samples.filter(device_ip=device_ip)
+    if feature:
+        samples = samples.filter(feature=feature)
+    grouped = {}
+    for sample in samples.order_by("timestamp").values("device_ip", "feature", "duration", "success", "timestamp"):
+        grouped.setdefault((sample["device_ip"], sample["feature"]), []).append(sample)
+    result = []
+    for (ip, feat), items in grouped.items():
+        durations = sorted(i["duration"] for i in items)
+        result.append(
+            {
+                "device_ip": ip,
+                "feature": feat,
+                "count": len(items),
+                "failures": len([i for i in items if not i["success"]]),
+                "p50": percentile(durations, 50),
+                "p95": percentile(durations, 95),
+                "p99": percentile(durations, 99),
+                "max": durations[-1],
+                "last": items[-1]["duration"],
+                "last_discovered": items[-1]["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
+            }
+        )
+    result.sort(key=lambda x: x["p95"], reverse=True)
+    return result
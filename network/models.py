@@ -8,3 +8,22 @@ class ReDiscoveryConfig(models.Model):
     last_discovered = models.DateTimeField(null=True)
 
     objects = models.Manager()
+
+
+class DiscoveryStats(models.Model):
+    """
+    Duration of a single discovery run of a device feature.
+    Only the latest samples per device and feature are kept.
+    """
+    device_ip = models.CharField(max_length=64)
+    feature = models.CharField(max_length=64)
+    duration = models.FloatField()
+    success = models.BooleanField(default=True)
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["device_ip", "feature", "-timestamp"]),
+        ]
@@ -2,7 +2,9 @@ import datetime
 from apscheduler.schedulers.background import BackgroundScheduler
 from log_manager.logger import get_backend_logger
 from orca_nw_lib.discovery import trigger_discovery
+from network.discovery_stats import discovery_timer
 from network.models import ReDiscoveryConfig
+from orca_setup.progress import publish_discovery_event, DiscoveryStatus
 from state_manager.models import ORCABusyState, State
 
 _logger = get_backend_logger()
@@ -62,9 +64,16 @@ def scheduled_discovery(device_ip: str):
         state_obj = ORCABusyState.objects.filter(device_ip=device_ip).first()
         if state_obj is None:
             ORCABusyState.update_state(device_ip, State.SCHEDULED_DISCOVERY_IN_PROGRESS)
-            trigger_discovery(device_ips=[device_ip])
+            publish_discovery_event(DiscoveryStatus.STARTED, device_ip=device_ip)
+            with discovery_timer(device_ip):
+                trigger_discovery(device_ips=[device_ip])
+            publish_discovery_event(DiscoveryStatus.SUCCESS, device_ip=device_ip)
     except Exception as e:
         _logger.error(f"Failed to schedule discovery on device {device_ip}, Reason: {e}")
+        try:
+            publish_discovery_event(DiscoveryStatus.FAILED, device_ip=device_ip, message=e)
+        except Exception as err:
+            _logger.error("Failed to publish discovery event. Error: %s", err)
     finally:
         ORCABusyState.objects.filter(device_ip=device_ip).delete()
         rediscovery_obj = ReDiscoveryConfig.objects.filter(device_ip=device_ip).first()
@@ -0,0 +1,72 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from rest_framework import status
+from rest_framework.test import APITestCase
+from django.urls import reverse
+
+from network import discovery_stats
+from network.discovery_stats import discovery_timer, record_discovery_time, percentile
+from network.models import DiscoveryStats
+from network.scheduler import scheduled_discovery
+
+
+class TestDiscoveryStats(APITestCase):
+    """
+    Tests for discovery timing instrumentation.
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.force_authenticate(user)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3], 99), 3)
+        self.assertIsNone(percentile([], 50))
+
+    def test_discovery_timer_records_failure(self):
+        with self.assertRaises(ValueError):
+            with discovery_timer("10.10.10.1", "bgp"):
+                raise ValueError("discovery failed")
+        sample = DiscoveryStats.objects.get(device_ip="10.10.10.1", feature="bgp")
+        self.assertFalse(sample.success)
+
+    def test_rolling_window(self):
+        for i in range(discovery_stats.max_samples + 5):
+            record_discovery_time("10.10.10.2", "interface", float(i))
+        self.assertEqual(
+            DiscoveryStats.objects.filter(device_ip="10.10.10.2", feature="interface").count(),
+            discovery_stats.max_samples,
+        )
+
+    def test_discovery_stats_api(self):
+        for i in range(1, 11):
+            record_discovery_time("10.10.10.3", "all", float(i))
+        record_discovery_time("10.10.10.4", "all", 100.0)
+
+        response = self.client.get(reverse("discovery_stats"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()[0]["device_ip"], "10.10.10.4")
+
+        response = self.client.get(reverse("discovery_stats"), {"mgt_ip": "10.10.10.3"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        stats = response.json()[0]
+        self.assertEqual(stats["count"], 10)
+        self.assertEqual(stats["p50"], 5.0)
+        self.assertEqual(stats["p95"], 10.0)
+        self.assertEqual(stats["max"], 10.0)
+
+        response = self.client.get(reverse("discovery_stats"), {"mgt_ip": "10.10.10.5"})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    @mock.patch("network.scheduler.trigger_discovery")
+    def test_scheduled_discovery_is_timed(self, trigger):
+        scheduled_discovery("10.10.10.6")
+        trigger.assert_called_once_with(device_ips=["10.10.10.6"])
+        sample = DiscoveryStats.objects.get(device_ip="10.10.10.6")
+        self.assertEqual(sample.feature, discovery_stats.all_features)
+        self.assertTrue(sample.success)
@@ -15,6 +15,7 @@ urlpatterns = [
     # path("discover", views.discover, name="discover"),
     path("discover/feature", views.discover_by_feature, name="discover_by_feature"),
     path("discover/schedule", views.discover_scheduler, name="discover_scheduler"),
+    path("discover/stats", views.discovery_stats, name="discovery_stats"),
     re_path("devices", views.device_list, name="device"),
     path("subinterface", interface.interface_subinterface_config, name="subinterface"),
     re_path("interface_pg", interface.interface_pg, name="interface_pg"),
@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import api_view
 
+from network.discovery_stats import discovery_timer, get_discovery_stats
 from network.models import ReDiscoveryConfig
 from network.scheduler import add_scheduler, remove_scheduler
 from orca_nw_lib.common import DiscoveryFeature
@@ -13,6 +14,7 @@ from orca_nw_lib.discovery import trigger_discovery, discover_nw_features
 from log_manager.decorators import log_request
 from log_manager.logger import get_backend_logger
 from network.util import add_msg_to_list, get_failure_msg, get_success_msg
+from orca_setup.progress import publish_discovery_event, DiscoveryStatus
 from state_manager.models import ORCABusyState
 
 _logger = get_backend_logger()
@@ -156,15 +158,37 @@ def discover_by_feature(request):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
             try:
-                discover_nw_features(device_ip, DiscoveryFeature.get_enum_from_str(feature))
+                publish_discovery_event(DiscoveryStatus.STARTED, device_ip=device_ip, feature=feature)
+                with discovery_timer(device_ip, feature):
+                    discover_nw_features(device_ip, DiscoveryFeature.get_enum_from_str(feature))
                 add_msg_to_list(result, get_success_msg(request))
+                publish_discovery_event(DiscoveryStatus.SUCCESS, device_ip=device_ip, feature=feature)
                 _logger.info("Rediscovered device: %s", device_ip)
             except Exception as e:
                 add_msg_to_list(result, get_failure_msg(e, request))
+                publish_discovery_event(DiscoveryStatus.FAILED, device_ip=device_ip, feature=feature, message=e)
                 _logger.error("Failed to rediscover device: %s", device_ip)
         return Response({"result": result}, status=status.HTTP_200_OK)
 
 
+@api_view(["GET"])
+def discovery_stats(request):
+    """
+    This function is an API view that handles the HTTP GET request for the 'discovery_stats' endpoint.
+    Returns p50/p95/p99 discovery durations per device and feature, slowest first.
+    """
+    if request.method == "GET":
+        data = get_discovery_stats(
+            device_ip=request.GET.get("mgt_ip", None),
+            feature=request.GET.get("feature", None),
+        )
+        return (
+            Response(data, status=status.HTTP_200_OK)
+            if data
+            else Response({}, status=status.HTTP_204_NO_CONTENT)
+        )
+
+
 @api_view(["GET", "PUT", "DELETE"])
 @log_request
 def discover_scheduler(request):
@@ -1,3 +1,4 @@
 from .celery import app as celery_app
+from . import sqlite  # noqa: F401, configures new SQLite connections
 
 __all__ = ('celery_app',)
\ No newline at end of file
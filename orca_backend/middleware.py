@@ -0,0 +1,102 @@
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+_compressible_types = re.compile(r"^(text/|application/(json|javascript|xml)|[^;]*\+(json|xml))")
+
+
+def accepted_encodings(header):
+    """
+    Parse an Accept-Encoding header.
+
+    Args:
+        header (str): The value of the Accept-Encoding header.
+
+    Returns:
+        dict: The quality value of each accepted encoding, encodings with quality 0 are not accepted.
+    """
+    encodings = {}
+    for item in header.split(","):
+        encoding, _, params = item.strip().partition(";")
+        if not encoding:
+            continue
+        quality = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        encodings[encoding.strip().lower()] = quality
+    return encodings
+
+
+def choose_encoding(header):
+    """
+    Choose the content encoding of a response, brotli if the client accepts it and it is installed, otherwise gzip.
+
+    Args:
+        header (str): The value of the Accept-Encoding header.
+
+    Returns:
+        str: "br", "gzip" or None if the response should not be compressed.
+    """
+    encodings = accepted_encodings(header)
+    wildcard = encodings.get("*", 0)
+    candidates = [encoding for encoding in (("br",) if brotli else ()) + ("gzip",)
+                  if encodings.get(encoding, wildcard) > 0]
+    if not candidates:
+        return None
+    # the client's preference wins, the server's order breaks ties
+    return max(candidates, key=lambda encoding: encodings.get(encoding, wildcard))
+
+
+class CompressionMiddleware:
+    """
+    Middleware compressing large JSON and text responses with brotli or gzip, as negotiated with the client.
+    Responses smaller than RESPONSE_COMPRESSION_MIN_SIZE bytes, streaming responses, e.g. file downloads,
+    and already encoded responses are sent as they are.
+    """
+
+    # random bytes added to gzip responses against BREACH, as django's GZipMiddleware does
+    max_random_bytes = 100
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if not _compressible_types.match(response.get("Content-Type", "")):
+            return response
+        if len(response.content) < getattr(settings, "RESPONSE_COMPRESSION_MIN_SIZE", 2048):
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if encoding is None:
+            return response
+
+        if encoding == "br":
+            compressed = brotli.compress(
+                response.content, quality=getattr(settings, "RESPONSE_COMPRESSION_BROTLI_QUALITY", 4)
+            )
+        else:
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers["Content-Length"] = str(len(compressed))
+        response.headers["Content-Encoding"] = encoding
+        # the compressed content is not byte for byte the same, so a strong ETag becomes weak
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        return response
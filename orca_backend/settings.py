@@ -57,6 +57,8 @@ if os.path.isdir(os.path.join(BASE_DIR, 'orcask')):
     INSTALLED_APPS.append('orcask')
 
 MIDDLEWARE = [
+    # first, so it compresses the final response
+    "orca_backend.middleware.CompressionMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -105,6 +107,35 @@ DATABASES = {
     }
 }
 
+# SQLite profile, applied to every new connection by orca_backend.sqlite. WAL lets readers run while a write
+# is in progress, synchronous=NORMAL is safe with WAL and skips an fsync per commit.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 20000)),  # milliseconds
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),  # bytes
+    "cache_size": -int(os.environ.get("SQLITE_CACHE_SIZE_KB", 64 * 1024)),  # negative values are in KiB
+    "temp_store": "MEMORY",
+}
+# Opt-in, IMMEDIATE or EXCLUSIVE makes transactions of atomic blocks take the write lock when they begin.
+# Django 4.2 has no option for it, so orca_backend.sqlite overrides how the connection begins transactions,
+# with Django 5.1 or later use OPTIONS["transaction_mode"] of the database instead.
+SQLITE_TRANSACTION_MODE = os.environ.get("SQLITE_TRANSACTION_MODE", "")
+
+# Production profile, ORCA_DB_ENGINE=postgres needs the postgres extra (psycopg) installed.
+if os.environ.get("ORCA_DB_ENGINE", "sqlite").lower() in ("postgres", "postgresql"):
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": os.environ.get("ORCA_DB_NAME", "orca"),
+        "USER": os.environ.get("ORCA_DB_USER", "orca"),
+        "PASSWORD": os.environ.get("ORCA_DB_PASSWORD", ""),
+        "HOST": os.environ.get("ORCA_DB_HOST", "localhost"),
+        "PORT": os.environ.get("ORCA_DB_PORT", "5432"),
+        # connections are kept open between requests and checked before they are reused
+        "CONN_MAX_AGE": int(os.environ.get("ORCA_DB_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -142,6 +173,11 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Offload file downloads to the web server, e.g. "X-Accel-Redirect" for nginx or "X-Sendfile" for apache.
+# For nginx, FILESERVER_SENDFILE_ROOT is the internal location serving the fileserver/media directory.
+FILESERVER_SENDFILE_HEADER = os.environ.get("FILESERVER_SENDFILE_HEADER", "")
+FILESERVER_SENDFILE_ROOT = os.environ.get("FILESERVER_SENDFILE_ROOT", "/protected/media/")
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -149,15 +185,25 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
+        'authentication.backends.CachedTokenAuthentication'
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'orca_backend.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# JSON and text responses of at least this many bytes are compressed with brotli or gzip.
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.environ.get("RESPONSE_COMPRESSION_MIN_SIZE", 2048))
+# Brotli quality 0-11, higher compresses better but slower.
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.environ.get("RESPONSE_COMPRESSION_BROTLI_QUALITY", 4))
+
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'django-db'
+# django-db backend which also reads task results compressed by the task result retention.
+CELERY_RESULT_BACKEND = 'log_manager.result_backend:DatabaseBackend'
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
@@ -168,3 +214,29 @@ CELERY_TASK_STORE_EAGER_RESULT = False
 CELERY_TASK_EAGER_PROPAGATES_EXCEPTIONS = False
 CELERY_BROKER_CONNECTION_RETRY_ON_STARTUP = True
 CELERY_BROKER_CONNECTION_RETRY = True
+# Finished task results older than this are deleted, only a summary is kept.
+TASK_RESULT_RETENTION_DAYS = int(os.environ.get("TASK_RESULT_RETENTION_DAYS", 30))
+# Maximum number of summaries of expired task results, the oldest summaries are deleted beyond it.
+TASK_SUMMARY_MAX_COUNT = int(os.environ.get("TASK_SUMMARY_MAX_COUNT", 10000))
+# Finished task results larger than this (in characters) are stored compressed.
+TASK_RESULT_COMPRESS_MIN_SIZE = int(os.environ.get("TASK_RESULT_COMPRESS_MIN_SIZE", 16 * 1024))
+
+# Seconds an authenticated token is cached and the maximum number of cached tokens per process.
+AUTH_TOKEN_CACHE_TTL = int(os.environ.get("AUTH_TOKEN_CACHE_TTL", 60))
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", 1024))
+# Seconds a token is valid after login (0 for tokens that never expire) and the interval at which
+# workers apply the token revocations, e.g. logouts, of other workers to their token cache.
+AUTH_TOKEN_TTL = int(os.environ.get("AUTH_TOKEN_TTL", 24 * 60 * 60))
+AUTH_REVOCATION_SYNC_INTERVAL = float(os.environ.get("AUTH_REVOCATION_SYNC_INTERVAL", 5))
+
+# Number of devices an install task installs images on in parallel.
+ORCA_INSTALL_PARALLELISM = int(os.environ.get("ORCA_INSTALL_PARALLELISM", 8))
+# Number of hosts probed at once and probes started per second (0 for unlimited) by network scans.
+ORCA_SCAN_PARALLELISM = int(os.environ.get("ORCA_SCAN_PARALLELISM", 32))
+ORCA_SCAN_RATE = float(os.environ.get("ORCA_SCAN_RATE", 100))
+# Installer images are downloaded once and served to the devices by the fileserver, disabled by default.
+ORCA_IMAGE_CACHE = os.environ.get("ORCA_IMAGE_CACHE", "false").lower() in ("1", "true", "yes")
+# URL of the backend as reachable from the devices, e.g. http://10.10.10.100:8000/.
+# Required for the image cache, images are installed from their origin URL while it is unset.
+# Also the base of the ztp_url of rendered templates, which is not set while it is unset.
+ORCA_IMAGE_BASE_URL = os.environ.get("ORCA_IMAGE_BASE_URL", "")
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_transaction_modes = ("DEFERRED", "IMMEDIATE", "EXCLUSIVE")
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Apply SQLITE_PRAGMAS to every new SQLite connection, e.g. WAL journaling so writers do not block readers,
+    and SQLITE_TRANSACTION_MODE to its transactions if it is set.
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for pragma, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+    transaction_mode = getattr(settings, "SQLITE_TRANSACTION_MODE", "").upper()
+    if transaction_mode:
+        if transaction_mode not in _transaction_modes:
+            raise ImproperlyConfigured(
+                f"SQLITE_TRANSACTION_MODE must be one of {', '.join(_transaction_modes)}, not {transaction_mode}."
+            )
+        # a transaction that reads before it writes, e.g. update_or_create, can not wait for the write lock
+        # and fails with "database is locked", taking the lock at BEGIN makes it wait for busy_timeout instead
+        connection._start_transaction_under_autocommit = (
+            lambda: connection.cursor().execute(f"BEGIN {transaction_mode}")
+        )
@@ -0,0 +1,111 @@
+import gzip
+import json
+import os
+from unittest import mock
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from orca_backend import middleware
+from orca_backend.middleware import CompressionMiddleware, accepted_encodings, choose_encoding
+
+CONTENT = json.dumps([{"name": f"Ethernet{i * 4}", "mtu": 9100, "enabled": True} for i in range(200)]).encode()
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=2048)
+class TestCompressionMiddleware(SimpleTestCase):
+
+    def respond(self, response, accept_encoding="gzip, br"):
+        request = RequestFactory().get("/interfaces", HTTP_ACCEPT_ENCODING=accept_encoding)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def json_response(self, content=CONTENT, **headers):
+        response = HttpResponse(content, content_type="application/json")
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings("gzip;q=0.5, BR; q=1.0, identity, *;q=0, deflate;q=0.5.1"),
+            {"gzip": 0.5, "br": 1.0, "identity": 1.0, "*": 0.0, "deflate": 0.0},
+        )
+        self.assertEqual(accepted_encodings(""), {})
+
+    def test_choose_encoding(self):
+        self.assertEqual(choose_encoding("gzip, br"), "br")
+        self.assertEqual(choose_encoding("gzip;q=1.0, br;q=0.5"), "gzip")
+        self.assertEqual(choose_encoding("br;q=0, gzip"), "gzip")
+        self.assertEqual(choose_encoding("*"), "br")
+        self.assertEqual(choose_encoding("br;q=0, *"), "gzip")
+        self.assertEqual(choose_encoding("gzip;q=0, *;q=0.5"), "br")
+        self.assertIsNone(choose_encoding("gzip;q=0, br;q=0"))
+        self.assertIsNone(choose_encoding("*;q=0"))
+        self.assertIsNone(choose_encoding("identity"))
+        self.assertIsNone(choose_encoding(""))
+        with mock.patch.object(middleware, "brotli", None):
+            self.assertEqual(choose_encoding("br, gzip;q=0.5"), "gzip")
+            self.assertIsNone(choose_encoding("br"))
+
+    def test_gzip(self):
+        response = self.respond(self.json_response(), "gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(gzip.decompress(response.content), CONTENT)
+
+    def test_brotli(self):
+        if middleware.brotli is None:
+            self.skipTest("brotli is not installed")
+        response = self.respond(self.json_response(), "gzip;q=0.8, br")
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(middleware.brotli.decompress(response.content), CONTENT)
+
+    def test_not_accepted(self):
+        response = self.respond(self.json_response(), "identity")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, CONTENT)
+        # the response still depends on the Accept-Encoding of the request
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_min_size(self):
+        small = CONTENT[:2047]
+        response = self.respond(self.json_response(small))
+        self.assertEqual(response.content, small)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertFalse(response.has_header("Vary"))
+        with override_settings(RESPONSE_COMPRESSION_MIN_SIZE=1024):
+            self.assertTrue(self.respond(self.json_response(small)).has_header("Content-Encoding"))
+
+    def test_skipped_responses(self):
+        response = self.respond(StreamingHttpResponse(iter([CONTENT]), content_type="application/json"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+
+        response = self.respond(self.json_response(**{"Content-Encoding": "identity"}))
+        self.assertEqual(response["Content-Encoding"], "identity")
+        self.assertEqual(response.content, CONTENT)
+
+        response = self.respond(HttpResponse(CONTENT, content_type="application/octet-stream"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    def test_incompressible_content(self):
+        content = os.urandom(4096)
+        response = self.respond(HttpResponse(content, content_type="text/plain"), "gzip")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, content)
+
+    def test_vary(self):
+        response = self.respond(self.json_response(Vary="Cookie"), "gzip")
+        self.assertEqual(response["Vary"], "Cookie, Accept-Encoding")
+        response = self.respond(self.json_response(Vary="Accept-Encoding"), "gzip")
+        self.assertEqual(response["Vary"], "Accept-Encoding")
+
+    def test_etag(self):
+        response = self.respond(self.json_response(ETag='"abc"'), "gzip")
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        response = self.respond(self.json_response(ETag='W/"abc"'), "gzip")
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        # uncompressed responses keep their strong ETag
+        response = self.respond(self.json_response(ETag='"abc"'), "identity")
+        self.assertEqual(response["ETag"], '"abc"')
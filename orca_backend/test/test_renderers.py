@@ -0,0 +1,72 @@
+import datetime
+import decimal
+import json
+import uuid
+from unittest import mock
+
+from django.test import SimpleTestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from orca_backend import renderers
+from orca_backend.renderers import ORJSONRenderer
+
+
+class TestORJSONRenderer(SimpleTestCase):
+
+    def assertRenderedAlike(self, data, accepted_media_type="application/json", renderer_context=None):
+        self.assertEqual(
+            ORJSONRenderer().render(data, accepted_media_type, renderer_context),
+            JSONRenderer().render(data, accepted_media_type, renderer_context),
+        )
+
+    def test_same_output_as_json_renderer(self):
+        utc = datetime.timezone.utc
+        self.assertRenderedAlike({
+            "aware": datetime.datetime(2024, 4, 16, 8, 30, 15, 123456, tzinfo=utc),
+            "offset": datetime.datetime(2024, 4, 16, 8, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+            "naive": datetime.datetime(2024, 4, 16, 8, 30, 15),
+            "date": datetime.date(2024, 4, 16),
+            "time": datetime.time(8, 30, 15, 500),
+            "duration": datetime.timedelta(minutes=5),
+            "decimal": decimal.Decimal("12.50"),
+            "uuid": uuid.UUID("4c1b1a8e-0000-4000-8000-000000000001"),
+            "lazy": gettext_lazy("Discovery successful."),
+            "float": 1.0,
+            "unicode": "Ethernet0 → spine1 é",
+            "separators": "line\u2028paragraph\u2029",
+            "nested": [{"mtu": 9100, "enabled": True, "fec": None}],
+            1: "integer key",
+        })
+
+    def test_large_integers(self):
+        self.assertRenderedAlike({"counter": 2 ** 64, "negative": -(2 ** 63) - 1, "max": 2 ** 64 - 1})
+        self.assertRenderedAlike([2 ** 70])
+
+    def test_float_formatting(self):
+        if renderers.orjson is None:
+            self.skipTest("orjson is not installed")
+        # floats with an exponent are formatted differently but have the same value
+        data = {"large": 1e16, "small": 1e-7, "huge": 1.5e300}
+        rendered = ORJSONRenderer().render(data)
+        self.assertEqual(rendered, b'{"large":1e16,"small":1e-7,"huge":1.5e300}')
+        self.assertEqual(json.loads(rendered), json.loads(JSONRenderer().render(data)))
+
+    def test_non_finite_floats(self):
+        if renderers.orjson is None:
+            self.skipTest("orjson is not installed")
+        for value in (float("nan"), float("inf"), float("-inf")):
+            # rendered as null, JSONRenderer refuses values that are not valid JSON
+            self.assertEqual(ORJSONRenderer().render({"value": value}), b'{"value":null}')
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({"value": value})
+
+    def test_empty_data(self):
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_indented_output(self):
+        self.assertRenderedAlike({"result": [1, 2]}, "application/json; indent=4")
+
+    def test_without_orjson(self):
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertRenderedAlike({"result": decimal.Decimal("1.5")})
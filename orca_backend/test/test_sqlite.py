@@ -0,0 +1,38 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from orca_backend.sqlite import configure_sqlite
+
+
+class TestSQLiteTransactionMode(TransactionTestCase):
+
+    def setUp(self):
+        self.connection = connections[DEFAULT_DB_ALIAS]
+
+    def tearDown(self):
+        # back to the backend's own way of beginning transactions
+        self.connection.__dict__.pop("_start_transaction_under_autocommit", None)
+
+    def atomic_queries(self):
+        with CaptureQueriesContext(self.connection) as queries:
+            with transaction.atomic():
+                self.connection.cursor().execute("SELECT 1")
+        return [query["sql"] for query in queries.captured_queries]
+
+    @override_settings(SQLITE_TRANSACTION_MODE="IMMEDIATE")
+    def test_atomic_begins_immediate(self):
+        configure_sqlite(sender=None, connection=self.connection)
+        self.assertEqual(self.atomic_queries()[0], "BEGIN IMMEDIATE")
+
+    @override_settings(SQLITE_TRANSACTION_MODE="")
+    def test_transaction_mode_is_opt_in(self):
+        configure_sqlite(sender=None, connection=self.connection)
+        self.assertNotIn("_start_transaction_under_autocommit", self.connection.__dict__)
+        self.assertNotIn("BEGIN IMMEDIATE", self.atomic_queries())
+
+    @override_settings(SQLITE_TRANSACTION_MODE="IMMEDIATE; DROP TABLE auth_user")
+    def test_invalid_transaction_mode(self):
+        with self.assertRaises(ImproperlyConfigured):
+            configure_sqlite(sender=None, connection=self.connection)
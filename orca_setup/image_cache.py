@@ -0,0 +1,313 @@
+import fcntl
+import hashlib
+import json
+import os
+import posixpath
+import urllib.error
+import urllib.parse
+import urllib.request
+
+from fileserver import constants
+from fileserver.blobstore import store_path, link_blob, checksum_of
+from log_manager.logger import get_backend_logger
+from orca_setup.models import CachedImage
+
+_logger = get_backend_logger()
+
+# Attempts to download an image, later attempts resume the partial download.
+_download_attempts = 3
+_download_timeout = 60
+# Images are only downloaded over http(s), other schemes, e.g. file://, could expose local files.
+_allowed_schemes = ("http", "https")
+
+
+class ImageChecksumMismatch(ValueError):
+    """
+    Raised when a downloaded image does not match its expected checksum.
+    """
+
+
+class _HTTPRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """
+    Redirect handler refusing redirects to schemes other than http(s).
+    """
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_scheme(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_opener = urllib.request.build_opener(_HTTPRedirectHandler)
+
+
+def _check_scheme(image_url):
+    """
+    Check that an image URL uses an allowed scheme.
+
+    Raises:
+        ValueError: If the scheme of the URL is not http or https.
+    """
+    scheme = urllib.parse.urlparse(image_url).scheme.lower()
+    if scheme not in _allowed_schemes:
+        raise ValueError(f"Unsupported image URL scheme {scheme or 'none'}, only http and https are allowed.")
+
+
+def _fileserver_path(relative_path):
+    app_directory = os.path.dirname(os.path.abspath(constants.__file__))
+    return os.path.join(app_directory, relative_path)
+
+
+def get_images_path():
+    """
+    Get the path of the cached images, below the fileserver download directory.
+
+    Returns:
+        str: The path of the cached images.
+    """
+    return _fileserver_path(constants.images_path)
+
+
+def image_download_path(image):
+    """
+    Get the path of a cached image relative to the fileserver download directory.
+
+    Args:
+        image (CachedImage): The cached image.
+
+    Returns:
+        str: The relative path, images/<checksum>/<file name>.
+    """
+    return posixpath.join(os.path.basename(constants.images_path), image.checksum, image.filename)
+
+
+def local_image_url(base_url, image):
+    """
+    Get the URL devices download a cached image from.
+
+    Args:
+        base_url (str): The URL of the backend as seen by the devices, e.g. http://10.10.10.100:8000/.
+        image (CachedImage): The cached image.
+
+    Returns:
+        str: The download URL of the image.
+    """
+    return f"{base_url.rstrip('/')}/files/download/{image_download_path(image)}/"
+
+
+def _image_filename(image_url):
+    return os.path.basename(urllib.parse.urlparse(image_url).path) or "sonic.bin"
+
+
+def _validators(headers):
+    return {"etag": headers.get("ETag", ""), "last_modified": headers.get("Last-Modified", "")}
+
+
+def _read_partial_validators(partial_path):
+    """
+    Read the validators the origin sent when the partial download was started.
+
+    Returns:
+        dict: The ETag and Last-Modified of the partial download, empty if they were not saved.
+    """
+    try:
+        with open(f"{partial_path}.json") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_partial_validators(partial_path, validators):
+    with open(f"{partial_path}.json", "w") as f:
+        json.dump(validators, f)
+
+
+def _remove_partial(partial_path):
+    """
+    Remove a partial download and its validators.
+
+    Args:
+        partial_path (str): The path of the partial download.
+    """
+    for path in (partial_path, f"{partial_path}.json"):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _if_range(validators):
+    """
+    Get the If-Range value resuming a partial download, a strong ETag or else the Last-Modified date.
+    Weak ETags can not be used with ranges.
+    """
+    etag = validators.get("etag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return validators.get("last_modified")
+
+
+def _confirms_complete(headers, validators, size):
+    """
+    Check that a 416 response confirms a partial download of the given size is the complete image.
+    The origin has to report the same size and at least one of the validators of the partial download.
+    """
+    if headers.get("Content-Range") != f"bytes */{size}":
+        return False
+    compared = False
+    for key, current in _validators(headers).items():
+        if validators.get(key) and current:
+            if validators[key] != current:
+                return False
+            compared = True
+    return compared
+
+
+def _download(image_url, partial_path):
+    """
+    Download an image, resuming from the partial file of an earlier attempt if the origin supports ranges.
+    A partial download is only resumed with the If-Range validators the origin sent when it was started,
+    an image changed at the origin is downloaded from the start instead of being appended to the old bytes.
+
+    Returns:
+        tuple: The sha256 checksum of the downloaded image and the ETag and Last-Modified validators of the origin.
+    """
+    attempt = 1
+    while True:
+        digest = hashlib.sha256()
+        offset = 0
+        partial_validators = _read_partial_validators(partial_path)
+        if_range = _if_range(partial_validators)
+        if os.path.exists(partial_path) and not if_range:
+            _logger.info("Partial download of %s has no validators, restarting download.", image_url)
+            _remove_partial(partial_path)
+        if os.path.exists(partial_path):
+            with open(partial_path, "rb") as f:
+                for chunk in iter(lambda: f.read(constants.download_chunk_size), b""):
+                    digest.update(chunk)
+                    offset += len(chunk)
+        request = urllib.request.Request(image_url)
+        if offset:
+            request.add_header("Range", f"bytes={offset}-")
+            request.add_header("If-Range", if_range)
+        try:
+            with _opener.open(request, timeout=_download_timeout) as response:
+                validators = _validators(response.headers)
+                if offset and (response.status != 206
+                               or not response.headers.get("Content-Range", "").startswith(f"bytes {offset}-")):
+                    # the origin sent the whole image, it changed or does not support ranges
+                    _logger.info("Origin of %s sent the whole image, restarting download.", image_url)
+                    digest = hashlib.sha256()
+                    offset = 0
+                elif offset:
+                    _logger.info("Resuming download of %s at %s bytes.", image_url, offset)
+                if not offset:
+                    _write_partial_validators(partial_path, validators)
+                with open(partial_path, "ab" if offset else "wb") as f:
+                    for chunk in iter(lambda: response.read(constants.download_chunk_size), b""):
+                        digest.update(chunk)
+                        f.write(chunk)
+            return digest.hexdigest(), validators
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset:
+                if _confirms_complete(e.headers, partial_validators, offset):
+                    # the partial file is already complete
+                    return digest.hexdigest(), partial_validators
+                _logger.info("Origin of %s does not confirm the partial download, restarting download.", image_url)
+                _remove_partial(partial_path)
+                continue
+            if attempt == _download_attempts or e.code < 500:
+                raise
+            _logger.warning("Download of %s failed (attempt %s): %s", image_url, attempt, e)
+        except (urllib.error.URLError, OSError) as e:
+            if attempt == _download_attempts:
+                raise
+            _logger.warning("Download of %s failed (attempt %s): %s", image_url, attempt, e)
+        attempt += 1
+
+
+def _is_cached(image):
+    path = os.path.join(get_images_path(), image.checksum, image.filename)
+    return os.path.isfile(path) and checksum_of(path) == image.checksum
+
+
+def _is_current(image):
+    """
+    Revalidate a cached image against its origin with a HEAD request.
+    The ETag, Last-Modified and Content-Length of the origin are compared with those of the cached image.
+
+    Returns:
+        bool: True if the origin still serves the cached image, False if it changed, can not be reached
+            or sends none of the validators.
+    """
+    try:
+        with _opener.open(urllib.request.Request(image.url, method="HEAD"), timeout=_download_timeout) as response:
+            headers = response.headers
+    except (urllib.error.URLError, OSError) as e:
+        _logger.warning("Failed to revalidate cached image %s: %s", image.url, e)
+        return False
+    compared = False
+    for cached, current in ((image.etag, headers.get("ETag")), (image.last_modified, headers.get("Last-Modified")),
+                            (str(image.size), headers.get("Content-Length"))):
+        if cached and current:
+            if cached != current:
+                _logger.info("Image %s changed at its origin.", image.url)
+                return False
+            compared = True
+    return compared
+
+
+def cache_image(image_url, checksum=None):
+    """
+    Download an image once into the fileserver's blob store and host it for devices.
+    Images are looked up by URL and by checksum, an image already stored from another URL is not downloaded again.
+    Without a checksum an image cached by URL is revalidated against the origin and downloaded again if it changed.
+    Interrupted downloads are resumed, concurrent callers for the same URL wait for one download.
+
+    Args:
+        image_url (str): The origin URL of the image.
+        checksum (str, optional): The expected sha256 checksum of the image.
+
+    Returns:
+        CachedImage: The cached image.
+
+    Raises:
+        ValueError: If the URL is not an http or https URL.
+        ImageChecksumMismatch: If the downloaded image does not match the checksum.
+        urllib.error.URLError: If the image can not be downloaded.
+    """
+    _check_scheme(image_url)
+    checksum = checksum.lower() if checksum else None
+    filename = _image_filename(image_url)
+    partial_dir = _fileserver_path(constants.image_partial_path)
+    os.makedirs(partial_dir, exist_ok=True)
+    partial_path = os.path.join(partial_dir, hashlib.sha256(image_url.encode("utf-8")).hexdigest())
+    with open(f"{partial_path}.lock", "w") as lock:
+        # serializes downloads of the same image across worker processes
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        image = CachedImage.objects.filter(url=image_url).first()
+        if image and _is_cached(image) and (image.checksum == checksum if checksum else _is_current(image)):
+            image.save(update_fields=["last_used"])
+            return image
+        image_checksum = checksum
+        validators = {}
+        if not checksum or not link_blob(os.path.join(get_images_path(), checksum, filename), checksum):
+            _logger.info("Downloading image %s.", image_url)
+            image_checksum, validators = _download(image_url, partial_path)
+            if checksum and image_checksum != checksum:
+                _remove_partial(partial_path)
+                raise ImageChecksumMismatch(
+                    f"Checksum of {image_url} is {image_checksum}, expected {checksum}."
+                )
+            store_path(os.path.join(get_images_path(), image_checksum, filename), partial_path, image_checksum)
+            _remove_partial(partial_path)
+        else:
+            _logger.info("Image %s is already cached as %s.", image_url, checksum)
+        image, _ = CachedImage.objects.update_or_create(
+            url=image_url,
+            defaults={
+                "checksum": image_checksum,
+                "filename": filename,
+                "size": os.path.getsize(os.path.join(get_images_path(), image_checksum, filename)),
+                "etag": validators.get("etag", ""),
+                "last_modified": validators.get("last_modified", ""),
+            },
+        )
+    return image
@@ -0,0 +1,88 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction
+
+# Rows created by migrate on the target, their ids differ between databases,
+# models referencing them are skipped as well.
+excluded_models = {"contenttypes.contenttype", "auth.permission", "admin.logentry"}
+source_alias = "sqlite_source"
+
+
+class Command(BaseCommand):
+    help = "Copy the data of an existing SQLite database into the configured database, e.g. PostgreSQL."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--source", default=str(settings.BASE_DIR / "db.sqlite3"), help="Path of the SQLite database."
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows read and inserted per batch.")
+
+    def handle(self, *args, **options):
+        if connections["default"].vendor == "sqlite":
+            raise CommandError("The configured database is SQLite, select the target with ORCA_DB_ENGINE.")
+        connections.databases[source_alias] = {
+            **connections["default"].settings_dict,
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": options["source"],
+            "CONN_MAX_AGE": 0,
+        }
+        batch_size = options["batch_size"]
+        copied_models = []
+        try:
+            source_tables = set(connections[source_alias].introspection.table_names())
+            # one transaction, foreign keys are checked on commit so tables can be copied in any order
+            with transaction.atomic(using="default"):
+                for model in self.get_models():
+                    if model._meta.db_table not in source_tables:
+                        self.stderr.write(f"{model._meta.label}: skipped, no table in the source database.")
+                        continue
+                    copied = self.copy_model(model, batch_size)
+                    copied_models.append(model)
+                    self.stdout.write(f"{model._meta.label}: {copied} rows")
+                # continue the primary key sequences after the copied ids
+                with connections["default"].cursor() as cursor:
+                    for sql in connections["default"].ops.sequence_reset_sql(no_style(), copied_models):
+                        cursor.execute(sql)
+        finally:
+            connections[source_alias].close()
+        self.stdout.write(self.style.SUCCESS(f"Copied {len(copied_models)} tables from {options['source']}."))
+
+    @staticmethod
+    def get_models():
+        return [
+            model
+            for app_config in apps.get_app_configs()
+            for model in app_config.get_models(include_auto_created=True)
+            if model._meta.managed and not model._meta.proxy
+            and model._meta.label_lower not in excluded_models
+            and not any(
+                field.related_model._meta.label_lower in excluded_models
+                for field in model._meta.concrete_fields
+                if field.is_relation
+            )
+        ]
+
+    def copy_model(self, model, batch_size):
+        """
+        Copy the rows of a model in primary key order, rows already in the target are skipped.
+
+        Returns:
+            int: The number of rows read.
+        """
+        queryset = model._base_manager.using(source_alias).order_by("pk")
+        copied = 0
+        batch = []
+        for obj in queryset.iterator(chunk_size=batch_size):
+            batch.append(obj)
+            if len(batch) >= batch_size:
+                copied += self.insert(model, batch)
+                batch = []
+        return copied + self.insert(model, batch)
+
+    @staticmethod
+    def insert(model, batch):
+        if batch:
+            model._base_manager.using("default").bulk_create(batch, ignore_conflicts=True)
+        return len(batch)
@@ -1,3 +1,49 @@
 from django.db import models
 
-# Create your models here.
+
+class DiscoveryEvent(models.Model):
+    """
+    Progress event emitted while a discovery is running.
+    Events are streamed to clients by the discovery progress endpoint.
+    """
+    task_id = models.CharField(max_length=255, db_index=True, blank=True, default="")
+    device_ip = models.CharField(max_length=64, blank=True, default="")
+    feature = models.CharField(max_length=64, blank=True, default="")
+    status = models.CharField(max_length=32)
+    message = models.TextField(blank=True, default="")
+    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    objects = models.Manager()
+
+
+class CachedImage(models.Model):
+    """
+    Installer image downloaded once from its origin URL and hosted by the fileserver,
+    so devices install it from the backend instead of the origin.
+    """
+    url = models.CharField(max_length=2048, unique=True)
+    checksum = models.CharField(max_length=64, db_index=True)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(default=0)
+    # validators of the origin response, to revalidate the cached image against the origin
+    etag = models.CharField(max_length=255, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="")
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(auto_now=True)
+
+    objects = models.Manager()
+
+
+class TaskDevice(models.Model):
+    """
+    Device and request path of a dispatched celery task, to look up tasks by device or path
+    without parsing the stored task kwargs.
+    """
+    task = models.ForeignKey(
+        "django_celery_results.TaskResult", to_field="task_id", db_column="task_id",
+        on_delete=models.CASCADE, related_name="devices", db_constraint=False,
+    )
+    device_ip = models.CharField(max_length=64, blank=True, default="", db_index=True)
+    http_path = models.CharField(max_length=255, blank=True, default="", db_index=True)
+
+    objects = models.Manager()
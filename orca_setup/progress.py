@@ -0,0 +1,186 @@
+import datetime
+import json
+import threading
+import time
+from enum import Enum
+
+from django.db.models import Q
+
+from log_manager.logger import get_backend_logger
+from orca_setup.models import DiscoveryEvent
+
+_logger = get_backend_logger()
+
+# Seconds between two database reads of the progress stream.
+stream_poll_interval = 1
+# Seconds after which an idle stream sends a keep-alive comment.
+stream_keepalive_interval = 15
+# Maximum lifetime of a single progress stream in seconds, clients reconnect with Last-Event-ID.
+stream_max_duration = 10 * 60
+# Maximum number of progress streams open at once, every open stream holds a server thread.
+stream_max_clients = 8
+# Events older than this are removed, checked at most once per event_prune_interval seconds while publishing.
+event_retention = datetime.timedelta(days=1)
+event_prune_interval = 60
+# Maximum number of stored events, older events are removed on every publish.
+max_events = 10000
+
+
+_open_streams = 0
+_open_streams_lock = threading.Lock()
+_last_prune = 0.0
+
+
+class StreamLimitExceeded(Exception):
+    """
+    Raised when the maximum number of progress streams is already open.
+    """
+
+
+class DiscoveryStatus(str, Enum):
+    STARTED = "started"
+    SUCCESS = "success"
+    FAILED = "failed"
+    FINISHED = "finished"
+
+    def __str__(self) -> str:
+        return self.value
+
+
+def publish_discovery_event(status, device_ip="", feature="", task_id="", message=""):
+    """
+    Store a discovery progress event and remove expired events beyond the retention period or max_events.
+
+    Args:
+        status (DiscoveryStatus | str): The status of the discovery step.
+        device_ip (str, optional): The IP address of the device being discovered.
+        feature (str, optional): The feature being discovered, empty for a full device discovery.
+        task_id (str, optional): The celery task id running the discovery.
+        message (str, optional): Additional details, e.g. the error message.
+
+    Returns:
+        DiscoveryEvent: The stored event.
+    """
+    global _last_prune
+    event = DiscoveryEvent.objects.create(
+        task_id=task_id or "",
+        device_ip=device_ip or "",
+        feature=feature or "",
+        status=str(status),
+        message=str(message or ""),
+    )
+    try:
+        # ids increase with every event, so this keeps the newest max_events events
+        DiscoveryEvent.objects.filter(id__lte=event.id - max_events).delete()
+        if time.monotonic() - _last_prune >= event_prune_interval:
+            _last_prune = time.monotonic()
+            delete_old_discovery_events()
+    except Exception as err:
+        _logger.error("Failed to delete old discovery events. Error: %s", err)
+    return event
+
+
+def delete_old_discovery_events():
+    """
+    Delete discovery events older than the retention period.
+    """
+    DiscoveryEvent.objects.filter(
+        timestamp__lt=datetime.datetime.now(tz=datetime.timezone.utc) - event_retention
+    ).delete()
+
+
+def get_discovery_events(last_event_id=0, task_id=None, device_ip=None):
+    """
+    Get discovery events newer than the given event id.
+
+    Args:
+        last_event_id (int): Only events with a greater id are returned.
+        task_id (str, optional): Only return events of this task.
+        device_ip (str, optional): Only return events of this device and task level events.
+
+    Returns:
+        list: A list of event dictionaries ordered by id.
+    """
+    events = DiscoveryEvent.objects.filter(id__gt=last_event_id)
+    if task_id:
+        events = events.filter(task_id=task_id)
+    if device_ip:
+        events = events.filter(Q(device_ip=device_ip) | Q(device_ip=""))
+    return [
+        {
+            "id": event.id,
+            "task_id": event.task_id,
+            "device_ip": event.device_ip,
+            "feature": event.feature,
+            "status": event.status,
+            "message": event.message,
+            "timestamp": event.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        for event in events.order_by("id")
+    ]
+
+
+def stream_discovery_events(last_event_id=0, task_id=None, device_ip=None):
+    """
+    Generator yielding discovery events in server-sent events format.
+    When a task id is given the stream ends once the task has finished.
+
+    Args:
+        last_event_id (int): Events up to this id are skipped.
+        task_id (str, optional): Only stream events of this task.
+        device_ip (str, optional): Only stream events of this device.
+
+    Yields:
+        str: Server-sent event messages.
+    """
+    started = time.monotonic()
+    last_sent = started
+    yield "retry: 3000\n\n"
+    while time.monotonic() - started < stream_max_duration:
+        events = get_discovery_events(last_event_id, task_id=task_id, device_ip=device_ip)
+        for event in events:
+            last_event_id = event["id"]
+            yield f"id: {event['id']}\nevent: discovery\ndata: {json.dumps(event)}\n\n"
+        if events:
+            last_sent = time.monotonic()
+            if task_id and any(e["status"] == str(DiscoveryStatus.FINISHED) and not e["device_ip"] for e in events):
+                yield "event: end\ndata: {}\n\n"
+                return
+        elif time.monotonic() - last_sent >= stream_keepalive_interval:
+            last_sent = time.monotonic()
+            yield ": keep-alive\n\n"
+        time.sleep(stream_poll_interval)
+
+
+class DiscoveryEventStream:
+    """
+    Server-sent event stream of discovery events, holding one of the stream_max_clients slots until it is closed.
+    Django closes the stream when the response is closed, also when the client disconnects before it started.
+
+    Args:
+        **filters: The arguments of stream_discovery_events.
+
+    Raises:
+        StreamLimitExceeded: If stream_max_clients streams are already open.
+    """
+
+    def __init__(self, **filters):
+        global _open_streams
+        with _open_streams_lock:
+            if _open_streams >= stream_max_clients:
+                raise StreamLimitExceeded(f"Too many open progress streams, the limit is {stream_max_clients}.")
+            _open_streams += 1
+        self._closed = False
+        self._events = stream_discovery_events(**filters)
+
+    def __iter__(self):
+        return self._events
+
+    def close(self):
+        global _open_streams
+        with _open_streams_lock:
+            if self._closed:
+                return
+            self._closed = True
+            _open_streams -= 1
+        self._events.close()
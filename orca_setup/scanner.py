@@ -0,0 +1,115 @@
+import ipaddress
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from orca_nw_lib.setup import scan_networks
+
+from log_manager.logger import get_backend_logger
+
+_logger = get_backend_logger()
+
+
+class RateLimiter:
+    """
+    Limits the number of probes started per second across all scanning threads.
+    """
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(self._next, now)
+            self._next = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def split_prefix(prefix):
+    """
+    Splits a prefix into the host addresses to probe.
+    Args:
+        prefix (str): An IP address or network in CIDR notation.
+    Returns:
+        Iterator[str]: The hosts as /32 networks, network and broadcast addresses are skipped.
+    """
+    network = ipaddress.ip_network(prefix, strict=False)
+    for host in network.hosts() if network.num_addresses > 1 else [network.network_address]:
+        yield f"{host}/{host.max_prefixlen}"
+
+
+def _found(result):
+    if isinstance(result, dict):
+        return list(result.values())
+    return list(result or [])
+
+
+def scan_prefixes(prefixes, parallelism=32, rate=0, on_found=None, on_progress=None):
+    """
+    Scans networks for ONIE and SONiC devices, probing their hosts concurrently.
+    Args:
+        prefixes (list): IP addresses or networks in CIDR notation.
+        parallelism (int): Number of hosts probed at once.
+        rate (float): Maximum number of probes started per second, unlimited if 0.
+        on_found (callable): Called with the prefix, the host and the ONIE and SONiC devices found on it,
+            as soon as a host is found.
+        on_progress (callable): Called with the number of probed and total hosts after each probe.
+    Returns:
+        tuple: The ONIE devices and SONiC devices found, each a dictionary of lists by prefix.
+            A prefix maps to a dictionary with the error if none of its hosts could be probed.
+    """
+    limiter = RateLimiter(rate)
+    hosts = [(prefix, host) for prefix in prefixes for host in split_prefix(prefix)]
+    onie_devices = {prefix: [] for prefix in prefixes}
+    sonic_devices = {prefix: [] for prefix in prefixes}
+    errors = {}
+    probed = {prefix: 0 for prefix in prefixes}
+
+    def probe(host):
+        limiter.wait()
+        return scan_networks(host)
+
+    workers = max(int(parallelism), 1)
+    pending = iter(hosts)
+    done_count = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as executor:
+        running = {}
+        while True:
+            # only a bounded number of probes is queued at a time
+            while len(running) < workers * 2:
+                item = next(pending, None)
+                if item is None:
+                    break
+                running[executor.submit(probe, item[1])] = item
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                prefix, host = running.pop(future)
+                done_count += 1
+                try:
+                    onie, sonic = future.result()
+                    probed[prefix] += 1
+                except Exception as err:
+                    errors.setdefault(prefix, str(err))
+                    _logger.debug("Failed to scan %s. Error: %s", host, err)
+                    onie, sonic = [], []
+                onie, sonic = _found(onie), _found(sonic)
+                onie_devices[prefix].extend(onie)
+                sonic_devices[prefix].extend(sonic)
+                if (onie or sonic) and on_found:
+                    on_found(prefix, host.split("/")[0], onie, sonic)
+                if on_progress:
+                    on_progress(done_count, len(hosts))
+    for prefix, error in errors.items():
+        if not probed[prefix]:
+            onie_devices[prefix] = {"error": error}
+            sonic_devices[prefix] = {"error": error}
+            _logger.error("Failed to scan network %s. Error: %s", prefix, error)
+    return onie_devices, sonic_devices
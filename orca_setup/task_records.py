@@ -0,0 +1,97 @@
+import atexit
+import threading
+
+from celery import states
+from django.db import connections
+from django_celery_results.models import TaskResult
+
+from log_manager.logger import get_backend_logger
+from orca_setup.models import TaskDevice
+
+_logger = get_backend_logger()
+
+# Seconds a dispatched task waits in the buffer before it is written.
+flush_interval = 1
+# Number of buffered tasks that are written right away.
+flush_batch_size = 100
+
+_pending = []
+_pending_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_timer = None
+
+
+def _task_devices(task_id, task_kwargs):
+    device_ips = task_kwargs.get("device_ips") or task_kwargs.get("device_ip") or [""]
+    device_ips = device_ips if isinstance(device_ips, list) else [device_ips]
+    http_path = str(task_kwargs.get("http_path", ""))
+    return [
+        TaskDevice(task_id=task_id, device_ip=str(device_ip), http_path=http_path)
+        for device_ip in device_ips
+    ]
+
+
+def record_task_sent(task_id, task_name, task_kwargs):
+    """
+    Buffer the PENDING record of a dispatched task, records are written in batches.
+    A task that already started before its record is written keeps the state stored by the worker.
+
+    Args:
+        task_id (str): The id of the task.
+        task_name (str): The name of the task.
+        task_kwargs (dict): The keyword arguments of the task.
+    """
+    global _timer
+    record = (
+        TaskResult(
+            task_id=task_id,
+            task_name=task_name,
+            status=states.PENDING,
+            content_type="application/json",
+            content_encoding="utf-8",
+            result="{}",
+            task_kwargs=str(task_kwargs or {}),
+        ),
+        _task_devices(task_id, task_kwargs or {}),
+    )
+    with _pending_lock:
+        _pending.append(record)
+        flush_now = len(_pending) >= flush_batch_size
+        if not flush_now and _timer is None:
+            _timer = threading.Timer(flush_interval, _flush_in_background)
+            _timer.daemon = True
+            _timer.start()
+    if flush_now:
+        flush_task_records()
+
+
+def flush_task_records():
+    """
+    Write the buffered task records, e.g. before tasks are looked up.
+    """
+    global _timer
+    with _flush_lock:
+        with _pending_lock:
+            records = _pending[:]
+            _pending.clear()
+            if _timer is not None:
+                _timer.cancel()
+                _timer = None
+        if not records:
+            return
+        try:
+            TaskResult.objects.bulk_create([result for result, _ in records], ignore_conflicts=True)
+            TaskDevice.objects.bulk_create([device for _, devices in records for device in devices])
+        except Exception as err:
+            _logger.error("Failed to store %s dispatched tasks. Error: %s", len(records), err)
+
+
+def _flush_in_background():
+    try:
+        flush_task_records()
+    finally:
+        # the timer thread's database connection is not reused
+        connections.close_all()
+
+
+atexit.register(flush_task_records)
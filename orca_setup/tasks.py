@@ -1,11 +1,18 @@
 import ipaddress
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from celery import signals, shared_task, states, chain
-from django_celery_results.models import TaskResult
+from celery import group, signals, shared_task
+from django.conf import settings
 from orca_nw_lib.discovery import trigger_discovery
 
 from log_manager.logger import get_backend_logger
-from orca_nw_lib.setup import switch_image_on_device, install_image_on_device, scan_networks
+from network.discovery_stats import discovery_timer
+from orca_setup import image_cache
+from orca_setup.scanner import scan_prefixes
+from orca_setup.task_records import record_task_sent
+from orca_setup.progress import publish_discovery_event, DiscoveryStatus
+from orca_nw_lib.setup import switch_image_on_device, install_image_on_device
 import multiprocessing
 
 _logger = get_backend_logger()
@@ -14,32 +21,143 @@ _logger = get_backend_logger()
 multiprocessing.set_start_method('spawn', force=True)
 
 
-@shared_task(track_started=True, trail=True, acks_late=True)
-def install_task(device_ips, image_url, **kwargs):
+@shared_task(bind=True, track_started=True, trail=True, acks_late=True)
+def install_task(self, device_ips, image_url, **kwargs):
     """
     Installs an image on a list of devices.
+    Devices are installed in parallel, in waves: an optional canary wave followed by batches.
+    The rollout halts when the canary wave fails or the failures exceed max_failures,
+    devices of the remaining waves are skipped. Per-device status is reported as task progress.
+    With discover_also, each device is discovered as soon as its installation succeeds.
     Args:
         device_ips (list): A list of device IPs.
         image_url (str): The URL of the image to install.
+        kwargs (dict): username and password of the devices, and optionally parallelism (devices
+            installed at once), canary (devices in the first wave), batch_size (devices per following
+            wave, all remaining devices if not given), max_failures (failures tolerated before halting),
+            image_checksum (expected sha256 of the image) and cache_image (False to install from the origin URL).
     Returns:
         dict: A dictionary containing the results of the installation.
     """
+    try:
+        image_url = get_install_image_url(image_url, **kwargs)
+    except image_cache.ImageChecksumMismatch as err:
+        _logger.error("Image not installed. Error: %s", err)
+        return {device_ip: {"error": str(err)} for device_ip in device_ips}
+    parallelism = max(int(kwargs.get("parallelism") or settings.ORCA_INSTALL_PARALLELISM), 1)
+    max_failures = kwargs.get("max_failures")
+    waves = plan_install_waves(
+        device_ips, canary=int(kwargs.get("canary") or 0), batch_size=int(kwargs.get("batch_size") or 0)
+    )
     install_responses = {}
-    for device_ip in device_ips:
-        try:
-            response = install_image_on_device(
-                device_ip=device_ip,
-                image_url=image_url,
-                username=kwargs.get("username", None),
-                password=kwargs.get("password", None),
-            )
-            install_responses[device_ip] = response
-        except Exception as err:
-            install_responses[device_ip] = {"error": err}
-            _logger.error("Failed to install image on device %s. Error: %s", device_ip, err)
+    device_status = {device_ip: "pending" for device_ip in device_ips}
+    next_task_ids = {}
+    halted = ""
+    for wave_number, wave in enumerate(waves, start=1):
+        if halted:
+            for device_ip in wave:
+                install_responses[device_ip] = {"error": halted}
+                device_status[device_ip] = "skipped"
+            continue
+        for device_ip in wave:
+            device_status[device_ip] = "installing"
+        _report_install_progress(self, wave_number, len(waves), device_status, next_task_ids)
+        with ThreadPoolExecutor(max_workers=min(parallelism, len(wave)), thread_name_prefix="install") as executor:
+            futures = {
+                executor.submit(
+                    install_image_on_device,
+                    device_ip=device_ip,
+                    image_url=image_url,
+                    username=kwargs.get("username", None),
+                    password=kwargs.get("password", None),
+                ): device_ip
+                for device_ip in wave
+            }
+            for future in as_completed(futures):
+                device_ip = futures[future]
+                try:
+                    install_responses[device_ip] = future.result()
+                    device_status[device_ip] = "success"
+                    next_task_id = start_next_stage(device_ip, "install", **kwargs)
+                    if next_task_id:
+                        next_task_ids[device_ip] = next_task_id
+                except Exception as err:
+                    install_responses[device_ip] = {"error": str(err)}
+                    device_status[device_ip] = "failed"
+                    _logger.error("Failed to install image on device %s. Error: %s", device_ip, err)
+                _report_install_progress(self, wave_number, len(waves), device_status, next_task_ids)
+        failures = list(device_status.values()).count("failed")
+        if wave_number == 1 and kwargs.get("canary") and failures:
+            halted = "Installation skipped, rollout halted after canary failure."
+        elif max_failures is not None and failures > int(max_failures):
+            halted = f"Installation skipped, rollout halted after {failures} failures."
+        if halted:
+            _logger.error(halted)
     return install_responses
 
 
+def get_install_image_url(image_url, image_checksum=None, cache_image=True, **kwargs):
+    """
+    Caches an image on the fileserver and returns the URL devices install it from.
+    Caching is enabled by ORCA_IMAGE_CACHE and requires ORCA_IMAGE_BASE_URL, the URL of the backend
+    as seen by the devices. The origin URL is used if caching is disabled or fails.
+    Args:
+        image_url (str): The origin URL of the image.
+        image_checksum (str): The expected sha256 checksum of the image.
+        cache_image (bool): Whether to cache the image.
+    Returns:
+        str: The URL of the image to install.
+    Raises:
+        ImageChecksumMismatch: If the image does not match the expected checksum.
+    """
+    if not (settings.ORCA_IMAGE_CACHE and cache_image):
+        return image_url
+    if not settings.ORCA_IMAGE_BASE_URL:
+        _logger.warning("ORCA_IMAGE_BASE_URL is not set, installing image %s from origin.", image_url)
+        return image_url
+    try:
+        image = image_cache.cache_image(image_url, checksum=image_checksum)
+    except image_cache.ImageChecksumMismatch:
+        raise
+    except Exception as err:
+        _logger.error("Failed to cache image %s, installing from origin. Error: %s", image_url, err)
+        return image_url
+    local_url = image_cache.local_image_url(settings.ORCA_IMAGE_BASE_URL, image)
+    _logger.info("Installing cached image %s from %s.", image_url, local_url)
+    return local_url
+
+
+def plan_install_waves(device_ips, canary=0, batch_size=0):
+    """
+    Splits devices into installation waves.
+    Args:
+        device_ips (list): A list of device IPs.
+        canary (int): Number of devices in the first wave, no canary wave if 0.
+        batch_size (int): Number of devices per following wave, all remaining devices in one wave if 0.
+    Returns:
+        list: A list of waves, each a list of device IPs.
+    """
+    waves = [device_ips[:canary]] if canary else []
+    remaining = device_ips[canary:]
+    batch_size = batch_size or len(remaining) or 1
+    waves.extend(remaining[i:i + batch_size] for i in range(0, len(remaining), batch_size))
+    return [wave for wave in waves if wave]
+
+
+def _report_install_progress(task, wave, waves, device_status, next_task_ids):
+    """
+    Stores the per-device installation status and the ids of the tasks started for the next stage as progress of the task.
+    """
+    if not task.request.id:
+        return
+    try:
+        task.update_state(state="PROGRESS", meta={
+            "wave": wave, "waves": waves, "devices": dict(device_status), "next_task_ids": dict(next_task_ids),
+        })
+    except Exception as err:
+        _logger.error("Failed to report installation progress. Error: %s", err)
+
+
 @shared_task(track_started=True, trail=True, acks_late=True)
 def switch_image_task(device_ip, image_name, **kwargs):
     """
@@ -62,14 +180,16 @@ def switch_image_task(device_ip, image_name, **kwargs):
     return result
 
 
-@shared_task(track_started=True, trail=True, acks_late=True)
-def discovery_task(device_ips, **kwargs):
+@shared_task(bind=True, track_started=True, trail=True, acks_late=True)
+def discovery_task(self, device_ips, **kwargs):
     """
     Performs discovery on a device.
+    Progress of every device is published as a discovery event.
     Args:
-        device_ips (list): A list of device IPs.
+        device_ips (list): A list of device IPs, None or empty to discover all devices.
     """
     result = []
+    task_id = self.request.id
     _logger.info("Staring discovery task.")
     if kwargs.get("discover_from_config", False):
         from orca_nw_lib.discovery import discover_device_from_config
@@ -79,34 +199,78 @@ def discovery_task(device_ips, **kwargs):
         except Exception as err:
             result.append({"message": "failed", "details": f"Failed to discover devices from config. Error: {err}"})
             _logger.error("Failed to discover devices from config. Error: %s", err)
-    try:
-        trigger_discovery(device_ips=device_ips)
-        result.append({"message": "success", "details": "Discovery successful."})
-    except Exception as err:
-        result.append({"message": "failed", "details": str(err)})
-        _logger.error("Failed to discover devices. Error: %s", err)
+    if not device_ips:
+        try:
+            trigger_discovery(device_ips=device_ips)
+            result.append({"message": "success", "details": "Discovery successful."})
+        except Exception as err:
+            result.append({"message": "failed", "details": str(err)})
+            _logger.error("Failed to discover devices. Error: %s", err)
+    # no device_ips, None or empty, discovers all devices above
+    for device_ip in device_ips or []:
+        publish_discovery_event(DiscoveryStatus.STARTED, device_ip=device_ip, task_id=task_id)
+        try:
+            with discovery_timer(device_ip):
+                trigger_discovery(device_ips=[device_ip])
+            result.append({"message": "success", "details": f"Discovery successful for {device_ip}."})
+            publish_discovery_event(DiscoveryStatus.SUCCESS, device_ip=device_ip, task_id=task_id)
+        except Exception as err:
+            result.append({"message": "failed", "details": str(err)})
+            publish_discovery_event(DiscoveryStatus.FAILED, device_ip=device_ip, task_id=task_id, message=err)
+            _logger.error("Failed to discover device %s. Error: %s", device_ip, err)
     return result
 
 
-@shared_task(track_started=True, trail=True, acks_late=True)
-def scan_network_task(device_ips: list, **kwargs):
+@shared_task(bind=True, track_started=True, trail=True, acks_late=True)
+def scan_network_task(self, device_ips: list, **kwargs):
     """
     Scans the network of a device.
+    Hosts are probed concurrently, devices found so far are reported as task progress.
+    With install_also or discover_also, every device found moves on to the next stage right away.
     Args:
         device_ips (list): A list of device IPs.
-        kwargs (dict): The keyword arguments passed to the task.
+        kwargs (dict): The keyword arguments passed to the task, optionally scan_parallelism
+            (hosts probed at once) and scan_rate (probes started per second).
     """
-    onie_devices = {}
-    sonic_devices = {}
-    for device_ip in device_ips:
+    onie_devices = {device_ip: [] for device_ip in device_ips}
+    sonic_devices = {device_ip: [] for device_ip in device_ips}
+    next_task_ids = {}
+    progress = {"scanned": 0, "total": 0, "reported": 0.0}
+
+    def report(force=False):
+        if not self.request.id or not (force or time.monotonic() - progress["reported"] >= 1):
+            return
+        progress["reported"] = time.monotonic()
         try:
-            onie, sonic = scan_networks(device_ip)
-            onie_devices[device_ip] = onie
-            sonic_devices[device_ip] = sonic
+            self.update_state(state="PROGRESS", meta={
+                "scanned": progress["scanned"], "total": progress["total"],
+                "onie_devices": onie_devices, "sonic_devices": sonic_devices, "next_task_ids": next_task_ids,
+            })
         except Exception as err:
-            onie_devices[device_ip] = {"error": err}
-            sonic_devices[device_ip] = {"error": err}
-    return {"onie_devices": onie_devices, "sonic_devices": sonic_devices}
+            _logger.error("Failed to report scan progress. Error: %s", err)
+
+    def on_found(prefix, host, onie, sonic):
+        onie_devices[prefix].extend(onie)
+        sonic_devices[prefix].extend(sonic)
+        _logger.info("Found %s ONIE and %s SONiC devices on %s.", len(onie), len(sonic), host)
+        if host not in next_task_ids:
+            next_task_id = start_next_stage(host, "scan", **kwargs)
+            if next_task_id:
+                next_task_ids[host] = next_task_id
+        report(force=True)
+
+    def on_progress(scanned, total):
+        progress.update(scanned=scanned, total=total)
+        report()
+
+    onie_devices, sonic_devices = scan_prefixes(
+        device_ips,
+        parallelism=kwargs.get("scan_parallelism") or settings.ORCA_SCAN_PARALLELISM,
+        rate=kwargs.get("scan_rate") or settings.ORCA_SCAN_RATE,
+        on_found=on_found,
+        on_progress=on_progress,
+    )
+    return {"onie_devices": onie_devices, "sonic_devices": sonic_devices, "next_task_ids": next_task_ids}
 
 
 @signals.task_sent.connect
@@ -121,29 +285,76 @@ def task_sent(**kwargs):
     dispatch. Celery's task state transitions are typically tracked only after
     task execution begins, so this manual entry of `PENDING` allows the system
     to recognize that the task is awaiting processing right from dispatch.
+    Entries are buffered and written in batches, see `record_task_sent`.
 
     Args:
         kwargs (dict): The keyword arguments passed to the signal handler,
                        containing details about the dispatched task, such as
                        task_id and task arguments.
     """
-    task_kwargs = kwargs["kwargs"]
-    TaskResult.objects.store_result(
-        task_id=kwargs["task_id"],
-        status=states.PENDING,
-        content_type="application/json",
-        content_encoding="utf-8",
-        result={},
-        task_kwargs=task_kwargs,
-    )
+    record_task_sent(task_id=kwargs["task_id"], task_name=kwargs.get("sender"), task_kwargs=kwargs["kwargs"])
+
+
+@signals.task_prerun.connect
+def discovery_task_prerun(sender=None, task_id=None, **kwargs):
+    """
+    Signal handler publishing the start of a discovery task to the progress stream.
+    """
+    if getattr(sender, "name", None) != discovery_task.name:
+        return
+    try:
+        publish_discovery_event(DiscoveryStatus.STARTED, task_id=task_id)
+    except Exception as err:
+        _logger.error("Failed to publish discovery event. Error: %s", err)
+
+
+@signals.task_postrun.connect
+def discovery_task_postrun(sender=None, task_id=None, state=None, **kwargs):
+    """
+    Signal handler publishing the end of a discovery task to the progress stream.
+    """
+    if getattr(sender, "name", None) != discovery_task.name:
+        return
+    try:
+        publish_discovery_event(DiscoveryStatus.FINISHED, task_id=task_id, message=state or "")
+    except Exception as err:
+        _logger.error("Failed to publish discovery event. Error: %s", err)
+
+
+def start_next_stage(device_ip, stage, **kwargs):
+    """
+    Starts the next stage of the pipeline of a device: scan, install and discovery,
+    with install and discovery selected by install_also and discover_also.
+    Args:
+        device_ip (str): The IP of the device.
+        stage (str): The stage the device completed, "scan" or "install".
+        kwargs (dict): The keyword arguments passed to the tasks.
+    Returns:
+        str: The id of the started task, None if the pipeline of the device is complete.
+    """
+    kwargs = {**kwargs, "device_ips": [device_ip]}
+    try:
+        if stage == "scan" and kwargs.get("install_also", False):
+            return install_task.apply_async(kwargs=kwargs).task_id
+        if kwargs.get("discover_also", False):
+            return discovery_task.apply_async(kwargs=kwargs).task_id
+    except Exception as err:
+        _logger.error("Failed to start next stage for device %s. Error: %s", device_ip, err)
+    return None
 
 
 def create_tasks(device_ips, **kwargs):
     """
-    Creates a Celery task for the 'scan_networks' function.
+    Creates the Celery tasks of a request, every device moves through scan, install and discovery on its own:
+    devices found by a scan are installed or discovered as soon as they are found,
+    given and found devices are discovered by the install task as soon as their installation succeeds.
+    The tasks of the request are started as one group, its id is returned as task_id.
+    Discover only with no devices discovers all devices.
     Args:
-        device_ips (list): A list of device IPs.
+        device_ips (list): A list of device IPs or networks to scan.
         kwargs (dict): The keyword arguments passed to the task.
+    Returns:
+        dict: The ids of the started tasks and of their group.
     """
     ips_to_scan = []
     ips_to_install = []
@@ -153,22 +364,19 @@ def create_tasks(device_ips, **kwargs):
             ips_to_install.append(device_ip)
         else:
             ips_to_scan.append(device_ip)
-    task_details = {}
+    tasks = {}
     if ips_to_scan:
-        task = scan_network_task.apply_async(kwargs={**kwargs, "device_ips": ips_to_scan})
-        task_details["scan_task_id"] = task.task_id
-    discover_also = kwargs.get("discover_also", False)
-    install_also = kwargs.get("install_also", False)
-    if (discover_also and install_also) and len(ips_to_install):
-        task_chain = chain(
-            install_task.si(device_ips=ips_to_install, **kwargs),
-            discovery_task.si(device_ips=ips_to_install, **kwargs),
-        )()
-        task_details["task_id"] = task_chain.id
-    elif install_also and len(ips_to_install):
-        task = install_task.apply_async(kwargs={**kwargs, "device_ips": ips_to_install})
-        task_details["install_task_id"] = task.task_id
-    elif discover_also and len(ips_to_scan) == 0:
-        task = discovery_task.apply_async(kwargs={**kwargs, "device_ips": ips_to_install})
-        task_details["discovery_task_id"] = task.task_id
+        tasks["scan_task_id"] = scan_network_task.si(**{**kwargs, "device_ips": ips_to_scan})
+    if kwargs.get("install_also", False) and len(ips_to_install):
+        tasks["install_task_id"] = install_task.si(**{**kwargs, "device_ips": ips_to_install})
+    elif kwargs.get("discover_also", False) and (len(ips_to_install) or len(ips_to_scan) == 0):
+        # no device_ips discovers all devices
+        tasks["discovery_task_id"] = discovery_task.si(**{**kwargs, "device_ips": ips_to_install})
+    if not tasks:
+        return {}
+    group_result = group(list(tasks.values())).apply_async()
+    # saved so that the tasks of the request can be looked up by the group id
+    group_result.save()
+    task_details = {name: result.id for name, result in zip(tasks, group_result.results)}
+    task_details["task_id"] = group_result.id
     return task_details
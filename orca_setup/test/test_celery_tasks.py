@@ -0,0 +1,80 @@
+from celery import states
+from celery.result import AsyncResult, GroupResult
+from django.urls import reverse
+from django_celery_results.models import TaskResult
+from rest_framework import status
+from rest_framework.authtoken.admin import User
+from rest_framework.test import APITestCase
+
+from orca_backend.celery import app
+from orca_setup.task_records import record_task_sent, flush_task_records
+
+
+class TestCeleryTaskListing(APITestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.force_authenticate(user)
+        record_task_sent("task-1", "orca_setup.tasks.install_task", {
+            "device_ips": ["10.10.10.1", "10.10.10.2"], "http_path": "/install_image",
+        })
+        record_task_sent("task-2", "orca_setup.tasks.discovery_task", {
+            "device_ips": ["10.10.10.2"], "http_path": "/discover",
+        })
+        record_task_sent("task-3", "orca_setup.tasks.switch_image_task", {
+            "device_ip": "10.10.10.3", "http_path": "/switch_image",
+        })
+
+    def get_tasks(self, query):
+        response = self.client.get(reverse("celery_task"), query)
+        if response.status_code != status.HTTP_200_OK:
+            return response, []
+        return response, [task["task_id"] for task in response.json()]
+
+    def test_task_sent_buffered(self):
+        self.assertFalse(TaskResult.objects.exists())
+        flush_task_records()
+        self.assertEqual(TaskResult.objects.filter(status=states.PENDING).count(), 3)
+
+    def test_started_task_not_reset_to_pending(self):
+        TaskResult.objects.store_result(
+            "application/json", "utf-8", "task-1", "{}", states.STARTED, task_kwargs="{}"
+        )
+        flush_task_records()
+        self.assertEqual(TaskResult.objects.get(task_id="task-1").status, states.STARTED)
+
+    def test_filter_tasks(self):
+        _, task_ids = self.get_tasks({"device_ip": "10.10.10.2"})
+        self.assertEqual(sorted(task_ids), ["task-1", "task-2"])
+        _, task_ids = self.get_tasks({"http_path": "/switch_image"})
+        self.assertEqual(task_ids, ["task-3"])
+        _, task_ids = self.get_tasks({"task_ids": "task-1,task-3"})
+        self.assertEqual(sorted(task_ids), ["task-1", "task-3"])
+        _, task_ids = self.get_tasks({"status": "success"})
+        self.assertEqual(task_ids, [])
+        _, task_ids = self.get_tasks({"status": "pending", "from": "2000-01-01T00:00:00"})
+        self.assertEqual(len(task_ids), 3)
+        response, _ = self.get_tasks({"from": "yesterday"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_paginate_tasks(self):
+        response, task_ids = self.get_tasks({"page": 1, "size": 2})
+        self.assertEqual(len(task_ids), 2)
+        self.assertEqual(response["X-Total-Count"], "3")
+        response, task_ids = self.get_tasks({"page": 2, "size": 2})
+        self.assertEqual(len(task_ids), 1)
+        response, task_ids = self.get_tasks({"page": 3, "size": 2})
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_invalid_pagination(self):
+        for query in ({"size": "abc"}, {"size": 0}, {"size": -1}, {"page": "abc"}, {"page": 0}, {"page": 1.5}):
+            response, _ = self.get_tasks(query)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, query)
+
+    def test_get_tasks_by_group_id(self):
+        group_result = GroupResult("group-1", [AsyncResult("task-1", app=app), AsyncResult("task-2", app=app)], app=app)
+        group_result.save()
+        _, task_ids = self.get_tasks({"task_id": "group-1"})
+        self.assertEqual(sorted(task_ids), ["task-1", "task-2"])
+        response = self.client.get(reverse("celery_task"), {"task_id": "task-3"})
+        self.assertEqual(response.json()["task_id"], "task-3")
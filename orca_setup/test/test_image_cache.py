@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import TestCase, override_settings
+
+from fileserver.blobstore import remove_file
+from orca_setup import image_cache
+from orca_setup.models import CachedImage
+from orca_setup.tasks import get_install_image_url
+
+IMAGE = os.urandom(300 * 1024)
+IMAGE_CHECKSUM = hashlib.sha256(IMAGE).hexdigest()
+
+
+class ImageHandler(BaseHTTPRequestHandler):
+    requests = []
+    head_requests = []
+    if_ranges = []
+    image = IMAGE
+    etag = '"v1"'
+    honour_if_range = True
+
+    def do_HEAD(self):
+        self.head_requests.append(self.path)
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(self.image)))
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+
+    def do_GET(self):
+        self.requests.append((self.path, self.headers.get("Range")))
+        if self.path.startswith("/redirect"):
+            self.send_response(302)
+            self.send_header("Location", "ftp://127.0.0.1/images/sonic-test.bin")
+            self.end_headers()
+            return
+        start = 0
+        if self.headers.get("If-Range"):
+            self.if_ranges.append(self.headers["If-Range"])
+        if self.headers.get("Range") and (self.headers.get("If-Range") in (None, self.etag)
+                                          or not self.honour_if_range):
+            start = int(self.headers["Range"][len("bytes="):].rstrip("-"))
+            if start >= len(self.image):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(self.image)}")
+                self.send_header("ETag", self.etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(self.image) - 1}/{len(self.image)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(self.image) - start))
+        self.send_header("ETag", self.etag)
+        self.end_headers()
+        self.wfile.write(self.image[start:])
+
+    def log_message(self, *args):
+        pass
+
+
+class TestImageCache(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.image_url = f"http://127.0.0.1:{cls.server.server_port}/images/sonic-test.bin"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        ImageHandler.requests.clear()
+        ImageHandler.head_requests.clear()
+        ImageHandler.if_ranges.clear()
+        ImageHandler.image = IMAGE
+        ImageHandler.etag = '"v1"'
+        ImageHandler.honour_if_range = True
+
+    def tearDown(self):
+        for image in CachedImage.objects.all():
+            path = os.path.join(image_cache.get_images_path(), image.checksum, image.filename)
+            if os.path.exists(path):
+                remove_file(path)
+                os.rmdir(os.path.dirname(path))
+        for path in (self.partial_path(), f"{self.partial_path()}.json", f"{self.partial_path()}.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def read_cached(self, image):
+        with open(os.path.join(image_cache.get_images_path(), image.checksum, image.filename), "rb") as f:
+            return f.read()
+
+    def test_image_downloaded_once(self):
+        image = image_cache.cache_image(self.image_url, checksum=IMAGE_CHECKSUM)
+        self.assertEqual(image.checksum, IMAGE_CHECKSUM)
+        self.assertEqual(image.filename, "sonic-test.bin")
+        self.assertEqual(self.read_cached(image), IMAGE)
+        self.assertEqual(
+            image_cache.local_image_url("http://10.10.10.100:8000/", image),
+            f"http://10.10.10.100:8000/files/download/images/{IMAGE_CHECKSUM}/sonic-test.bin/",
+        )
+
+        # without a checksum the cached image is revalidated against the origin
+        image_cache.cache_image(self.image_url)
+        self.assertEqual(ImageHandler.head_requests, ["/images/sonic-test.bin"])
+        # the same image from another URL is found by its checksum
+        image_cache.cache_image(self.image_url + "?mirror=1", checksum=IMAGE_CHECKSUM)
+        self.assertEqual(len(ImageHandler.requests), 1)
+        self.assertEqual(len(ImageHandler.head_requests), 1)
+
+    def test_changed_image_downloaded_again(self):
+        image = image_cache.cache_image(self.image_url)
+        self.assertEqual(image.etag, '"v1"')
+        old_path = os.path.join(image_cache.get_images_path(), image.checksum, image.filename)
+        self.addCleanup(os.rmdir, os.path.dirname(old_path))
+        self.addCleanup(remove_file, old_path)
+        ImageHandler.image = IMAGE[::-1]
+        ImageHandler.etag = '"v2"'
+        image = image_cache.cache_image(self.image_url)
+        self.assertEqual(len(ImageHandler.requests), 2)
+        self.assertEqual(image.checksum, hashlib.sha256(IMAGE[::-1]).hexdigest())
+        self.assertEqual(image.etag, '"v2"')
+        self.assertEqual(self.read_cached(image), IMAGE[::-1])
+        self.assertEqual(CachedImage.objects.count(), 1)
+
+    def write_partial(self, content, etag='"v1"'):
+        os.makedirs(os.path.dirname(self.partial_path()), exist_ok=True)
+        with open(self.partial_path(), "wb") as f:
+            f.write(content)
+        if etag:
+            with open(f"{self.partial_path()}.json", "w") as f:
+                json.dump({"etag": etag, "last_modified": ""}, f)
+
+    def test_download_resumed(self):
+        self.write_partial(IMAGE[:1000])
+        image = image_cache.cache_image(self.image_url)
+        self.assertEqual(ImageHandler.requests, [("/images/sonic-test.bin", "bytes=1000-")])
+        self.assertEqual(ImageHandler.if_ranges, ['"v1"'])
+        self.assertEqual(image.checksum, IMAGE_CHECKSUM)
+        self.assertEqual(self.read_cached(image), IMAGE)
+        self.assertFalse(os.path.exists(self.partial_path()))
+        self.assertFalse(os.path.exists(f"{self.partial_path()}.json"))
+
+    def test_changed_image_not_resumed(self):
+        # the image changed at the origin after the download was interrupted
+        self.write_partial(IMAGE[:1000])
+        ImageHandler.image = IMAGE[::-1]
+        ImageHandler.etag = '"v2"'
+        image = image_cache.cache_image(self.image_url)
+        self.assertEqual(ImageHandler.if_ranges, ['"v1"'])
+        self.assertEqual(image.checksum, hashlib.sha256(IMAGE[::-1]).hexdigest())
+        self.assertEqual(self.read_cached(image), IMAGE[::-1])
+
+    def test_partial_without_validators_not_resumed(self):
+        self.write_partial(IMAGE[::-1][:1000], etag=None)
+        image = image_cache.cache_image(self.image_url)
+        self.assertEqual(ImageHandler.requests, [("/images/sonic-test.bin", None)])
+        self.assertEqual(image.checksum, IMAGE_CHECKSUM)
+
+    def test_complete_partial(self):
+        self.write_partial(IMAGE)
+        image = image_cache.cache_image(self.image_url)
+        self.assertEqual(ImageHandler.requests, [("/images/sonic-test.bin", f"bytes={len(IMAGE)}-")])
+        self.assertEqual(image.checksum, IMAGE_CHECKSUM)
+        self.assertEqual(image.etag, '"v1"')
+
+    def test_unconfirmed_416_downloaded_again(self):
+        # the image shrank at the origin and the origin ignores If-Range
+        self.write_partial(IMAGE)
+        ImageHandler.image = IMAGE[:1000]
+        ImageHandler.etag = '"v2"'
+        ImageHandler.honour_if_range = False
+        image = image_cache.cache_image(self.image_url)
+        self.assertEqual(ImageHandler.requests, [("/images/sonic-test.bin", f"bytes={len(IMAGE)}-"),
+                                                 ("/images/sonic-test.bin", None)])
+        self.assertEqual(image.checksum, hashlib.sha256(IMAGE[:1000]).hexdigest())
+        self.assertEqual(self.read_cached(image), IMAGE[:1000])
+
+    def test_checksum_mismatch(self):
+        with self.assertRaises(image_cache.ImageChecksumMismatch):
+            image_cache.cache_image(self.image_url, checksum="0" * 64)
+        self.assertFalse(CachedImage.objects.exists())
+        self.assertFalse(os.path.exists(self.partial_path()))
+
+    def test_only_http_urls_are_downloaded(self):
+        with self.assertRaises(ValueError):
+            image_cache.cache_image("file:///etc/hostname")
+        with self.assertRaises(ValueError):
+            image_cache.cache_image("ftp://127.0.0.1/images/sonic-test.bin")
+        # redirects to other schemes are refused as well
+        redirect_url = self.image_url.replace("/images/", "/redirect/")
+        with self.assertRaises(ValueError):
+            image_cache.cache_image(redirect_url)
+        self.assertFalse(CachedImage.objects.exists())
+        with override_settings(ORCA_IMAGE_CACHE=True, ORCA_IMAGE_BASE_URL="http://10.10.10.100:8000/"):
+            self.assertEqual(get_install_image_url("file:///etc/hostname"), "file:///etc/hostname")
+
+    def test_install_image_url(self):
+        # caching is opt-in
+        self.assertEqual(get_install_image_url(self.image_url), self.image_url)
+        with override_settings(ORCA_IMAGE_CACHE=True, ORCA_IMAGE_BASE_URL=""):
+            # without a configured base URL the devices install from the origin, a URL of the request is ignored
+            self.assertEqual(
+                get_install_image_url(self.image_url, image_base_url="http://10.10.10.200:8000/"), self.image_url
+            )
+        self.assertEqual(ImageHandler.requests, [])
+        with override_settings(ORCA_IMAGE_CACHE=True, ORCA_IMAGE_BASE_URL="http://10.10.10.100:8000/"):
+            self.assertEqual(
+                get_install_image_url(self.image_url),
+                f"http://10.10.10.100:8000/files/download/images/{IMAGE_CHECKSUM}/sonic-test.bin/",
+            )
+            self.assertEqual(get_install_image_url(self.image_url, cache_image=False), self.image_url)
+
+    def partial_path(self):
+        return os.path.join(
+            image_cache._fileserver_path(image_cache.constants.image_partial_path),
+            hashlib.sha256(self.image_url.encode("utf-8")).hexdigest(),
+        )
@@ -0,0 +1,118 @@
+from unittest import mock
+
+from celery.result import AsyncResult, GroupResult
+from django.test import TestCase
+
+from orca_backend.celery import app
+from orca_setup.tasks import install_task, plan_install_waves, discovery_task, scan_network_task, create_tasks
+
+
+class TestParallelInstall(TestCase):
+    device_ips = ["10.10.10.1", "10.10.10.2", "10.10.10.3", "10.10.10.4", "10.10.10.5"]
+    image_url = "http://10.10.10.100/sonic.bin"
+
+    @staticmethod
+    def sent_task(args, kwargs, task_id=None, **options):
+        return AsyncResult(task_id, app=app)
+
+    def test_plan_install_waves(self):
+        self.assertEqual(plan_install_waves(self.device_ips), [self.device_ips])
+        self.assertEqual(
+            plan_install_waves(self.device_ips, canary=1, batch_size=2),
+            [["10.10.10.1"], ["10.10.10.2", "10.10.10.3"], ["10.10.10.4", "10.10.10.5"]],
+        )
+        self.assertEqual(plan_install_waves(self.device_ips, canary=10), [self.device_ips])
+
+    @mock.patch("orca_setup.tasks.install_image_on_device")
+    def test_install_on_all_devices(self, install):
+        install.side_effect = lambda device_ip, **kwargs: f"installed on {device_ip}"
+        result = install_task.apply(
+            kwargs={"device_ips": self.device_ips, "image_url": self.image_url, "parallelism": 3}
+        ).get()
+        self.assertEqual(result, {device_ip: f"installed on {device_ip}" for device_ip in self.device_ips})
+        self.assertEqual(install.call_count, len(self.device_ips))
+
+    @mock.patch("orca_setup.tasks.install_image_on_device")
+    def test_rollout_halts_on_failure_threshold(self, install):
+        def install_image(device_ip, **kwargs):
+            if device_ip == "10.10.10.2":
+                raise Exception("install failed")
+            return "installed"
+
+        install.side_effect = install_image
+        result = install_task.apply(
+            kwargs={
+                "device_ips": self.device_ips,
+                "image_url": self.image_url,
+                "canary": 1,
+                "batch_size": 2,
+                "max_failures": 0,
+            }
+        ).get()
+        self.assertEqual(result["10.10.10.1"], "installed")
+        self.assertEqual(result["10.10.10.2"], {"error": "install failed"})
+        self.assertEqual(result["10.10.10.3"], "installed")
+        self.assertIn("halted", result["10.10.10.4"]["error"])
+        self.assertIn("halted", result["10.10.10.5"]["error"])
+        self.assertEqual(install.call_count, 3)
+
+    @mock.patch("orca_setup.tasks.install_image_on_device")
+    def test_rollout_halts_on_canary_failure(self, install):
+        install.side_effect = Exception("install failed")
+        result = install_task.apply(
+            kwargs={"device_ips": self.device_ips, "image_url": self.image_url, "canary": 1}
+        ).get()
+        self.assertEqual(install.call_count, 1)
+        self.assertTrue(all("halted" in result[device_ip]["error"] for device_ip in self.device_ips[1:]))
+
+    @mock.patch.object(discovery_task, "apply_async")
+    @mock.patch("orca_setup.tasks.install_image_on_device")
+    def test_installed_devices_discovered_one_by_one(self, install, discover):
+        def install_image(device_ip, **kwargs):
+            if device_ip == "10.10.10.2":
+                raise Exception("install failed")
+            return "installed"
+
+        install.side_effect = install_image
+        discover.return_value = mock.Mock(task_id="discovery-task")
+        install_task.apply(
+            kwargs={"device_ips": self.device_ips[:3], "image_url": self.image_url, "discover_also": True}
+        ).get()
+        discovered = sorted(call.kwargs["kwargs"]["device_ips"][0] for call in discover.call_args_list)
+        self.assertEqual(discovered, ["10.10.10.1", "10.10.10.3"])
+
+    @mock.patch.object(scan_network_task, "apply_async")
+    @mock.patch.object(discovery_task, "apply_async")
+    @mock.patch.object(install_task, "apply_async")
+    def test_create_tasks(self, install, discover, scan):
+        for task in (install, discover, scan):
+            task.side_effect = self.sent_task
+        task_details = create_tasks(
+            [*self.device_ips, "10.10.20.0/24"], image_url=self.image_url, install_also=True, discover_also=True
+        )
+        install_task_id = task_details.pop("install_task_id")
+        scan_task_id = task_details.pop("scan_task_id")
+        self.assertEqual(install_task_id, install.call_args.kwargs["task_id"])
+        self.assertEqual(scan_task_id, scan.call_args.kwargs["task_id"])
+        # the install task discovers every device as soon as it is installed
+        self.assertTrue(install.call_args.args[1]["discover_also"])
+        self.assertEqual(install.call_args.args[1]["device_ips"], self.device_ips)
+        discover.assert_not_called()
+        # the tasks of the request are looked up by the group id
+        group_result = GroupResult.restore(task_details.pop("task_id"), app=app)
+        self.assertEqual(sorted(i.id for i in group_result.results), sorted([install_task_id, scan_task_id]))
+        self.assertEqual(task_details, {})
+
+        self.assertIn("install_task_id", create_tasks(self.device_ips, image_url=self.image_url, install_also=True))
+        self.assertIn("discovery_task_id", create_tasks(self.device_ips, discover_also=True))
+
+    @mock.patch.object(discovery_task, "apply_async")
+    def test_create_tasks_discovers_all_devices(self, discover):
+        discover.side_effect = self.sent_task
+        self.assertEqual(
+            create_tasks([], discover_also=True, discover_from_config=True)["discovery_task_id"],
+            discover.call_args.kwargs["task_id"],
+        )
+        self.assertEqual(
+            discover.call_args.args[1], {"discover_also": True, "discover_from_config": True, "device_ips": []}
+        )
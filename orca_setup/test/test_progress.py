@@ -0,0 +1,106 @@
+import datetime
+import json
+from unittest import mock
+
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.authtoken.admin import User
+from rest_framework.test import APITestCase
+
+from network.scheduler import scheduled_discovery
+from orca_setup import progress
+from orca_setup.models import DiscoveryEvent
+from orca_setup.progress import publish_discovery_event, DiscoveryStatus
+from orca_setup.tasks import discovery_task
+
+
+class TestDiscoveryProgress(APITestCase):
+    task_id = "test-discovery-task"
+    device_ip = "10.10.10.10"
+
+    def setUp(self):
+        user = User.objects.create_user(username="testuser", password="testpassword")
+        self.client.force_authenticate(user)
+
+    def read_events(self, query):
+        response = self.client.get(reverse("discovery_progress"), query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        content = b"".join(response.streaming_content).decode("utf-8")
+        return [
+            json.loads(line[len("data: "):])
+            for message in content.split("\n\n")
+            if "event: discovery" in message
+            for line in message.splitlines()
+            if line.startswith("data: ")
+        ]
+
+    def test_progress_stream_ends_when_task_finished(self):
+        publish_discovery_event(DiscoveryStatus.STARTED, task_id=self.task_id)
+        publish_discovery_event(DiscoveryStatus.STARTED, device_ip=self.device_ip, task_id=self.task_id)
+        publish_discovery_event(DiscoveryStatus.SUCCESS, device_ip=self.device_ip, task_id=self.task_id)
+        publish_discovery_event(DiscoveryStatus.FINISHED, task_id=self.task_id, message="SUCCESS")
+        publish_discovery_event(DiscoveryStatus.STARTED, task_id="other-task")
+
+        events = self.read_events({"task_id": self.task_id})
+        self.assertEqual(
+            [e["status"] for e in events],
+            ["started", "started", "success", "finished"],
+        )
+        self.assertTrue(all(e["task_id"] == self.task_id for e in events))
+        self.assertEqual(events[1]["device_ip"], self.device_ip)
+
+    def test_progress_stream_resumes_from_last_event_id(self):
+        first = publish_discovery_event(DiscoveryStatus.STARTED, task_id=self.task_id)
+        publish_discovery_event(DiscoveryStatus.FINISHED, task_id=self.task_id)
+
+        events = self.read_events({"task_id": self.task_id, "last_event_id": first.id})
+        self.assertEqual([e["status"] for e in events], ["finished"])
+
+    def test_progress_stream_invalid_last_event_id(self):
+        response = self.client.get(reverse("discovery_progress"), {"last_event_id": "abc"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @mock.patch("orca_setup.progress.stream_max_clients", 1)
+    def test_progress_stream_limit(self):
+        first = self.client.get(reverse("discovery_progress"), {"task_id": self.task_id})
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        response = self.client.get(reverse("discovery_progress"), {"task_id": self.task_id})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertIn("Retry-After", response)
+        # closing a stream, even one that never started, frees its slot
+        first.close()
+        response = self.client.get(reverse("discovery_progress"), {"task_id": self.task_id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response.close()
+
+    @mock.patch("orca_setup.tasks.trigger_discovery")
+    def test_discovery_task_discovers_all_devices(self, trigger):
+        for device_ips in (None, []):
+            trigger.reset_mock()
+            result = discovery_task.apply(kwargs={"device_ips": device_ips}).get()
+            trigger.assert_called_once_with(device_ips=device_ips)
+            self.assertEqual(result, [{"message": "success", "details": "Discovery successful."}])
+
+    @mock.patch("orca_setup.progress.max_events", 3)
+    def test_old_events_deleted_on_publish(self):
+        old = publish_discovery_event(DiscoveryStatus.STARTED, task_id="old-task")
+        DiscoveryEvent.objects.filter(id=old.id).update(
+            timestamp=datetime.datetime.now(tz=datetime.timezone.utc) - progress.event_retention * 2
+        )
+        with mock.patch("orca_setup.progress._last_prune", 0.0):
+            publish_discovery_event(DiscoveryStatus.STARTED, task_id=self.task_id)
+        self.assertFalse(DiscoveryEvent.objects.filter(id=old.id).exists())
+
+        for _ in range(5):
+            last = publish_discovery_event(DiscoveryStatus.STARTED, task_id=self.task_id)
+        self.assertEqual(
+            list(DiscoveryEvent.objects.order_by("id").values_list("id", flat=True)),
+            [last.id - 2, last.id - 1, last.id],
+        )
+
+    @mock.patch("network.scheduler.publish_discovery_event", side_effect=Exception("database is locked"))
+    def test_scheduled_discovery_survives_failed_publish(self, publish):
+        with mock.patch("network.scheduler.trigger_discovery", side_effect=Exception("unreachable")):
+            scheduled_discovery(self.device_ip)
+        self.assertEqual(publish.call_count, 2)
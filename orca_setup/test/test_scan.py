@@ -0,0 +1,68 @@
+import time
+from unittest import mock
+
+from django.test import TestCase
+
+from orca_setup.scanner import split_prefix, scan_prefixes, RateLimiter
+from orca_setup.tasks import scan_network_task, install_task
+
+
+def scan_host(host):
+    if host == "10.10.10.2/32":
+        return ["10.10.10.2"], []
+    if host == "10.10.10.5/32":
+        return [], ["10.10.10.5"]
+    if host.startswith("10.20.20."):
+        raise Exception("unreachable")
+    return [], []
+
+
+class TestNetworkScan(TestCase):
+
+    def test_split_prefix(self):
+        self.assertEqual(list(split_prefix("10.10.10.0/30")), ["10.10.10.1/32", "10.10.10.2/32"])
+        self.assertEqual(list(split_prefix("10.10.10.7")), ["10.10.10.7/32"])
+        self.assertEqual(len(list(split_prefix("10.10.8.0/22"))), 1022)
+
+    @mock.patch("orca_setup.scanner.scan_networks", side_effect=scan_host)
+    def test_scan_prefixes(self, scan):
+        found = []
+        onie, sonic = scan_prefixes(
+            ["10.10.10.0/29", "10.20.20.0/30"], parallelism=4,
+            on_found=lambda prefix, host, onie, sonic: found.append(host),
+        )
+        self.assertEqual(scan.call_count, 8)
+        self.assertEqual(onie["10.10.10.0/29"], ["10.10.10.2"])
+        self.assertEqual(sonic["10.10.10.0/29"], ["10.10.10.5"])
+        self.assertEqual(onie["10.20.20.0/30"], {"error": "unreachable"})
+        self.assertEqual(sorted(found), ["10.10.10.2", "10.10.10.5"])
+
+    @mock.patch("orca_setup.scanner.scan_networks", side_effect=scan_host)
+    def test_scan_network_task(self, scan):
+        result = scan_network_task.apply(kwargs={"device_ips": ["10.10.10.0/29"], "scan_rate": 1000}).get()
+        self.assertEqual(
+            result,
+            {
+                "onie_devices": {"10.10.10.0/29": ["10.10.10.2"]},
+                "sonic_devices": {"10.10.10.0/29": ["10.10.10.5"]},
+                "next_task_ids": {},
+            },
+        )
+
+    @mock.patch.object(install_task, "apply_async")
+    @mock.patch("orca_setup.scanner.scan_networks", side_effect=scan_host)
+    def test_found_devices_installed(self, scan, install):
+        install.return_value = mock.Mock(task_id="install-task")
+        result = scan_network_task.apply(
+            kwargs={"device_ips": ["10.10.10.0/29"], "install_also": True, "image_url": "http://10.10.10.100/sonic.bin"}
+        ).get()
+        self.assertEqual(result["next_task_ids"], {"10.10.10.2": "install-task", "10.10.10.5": "install-task"})
+        for call in install.call_args_list:
+            self.assertEqual(call.kwargs["kwargs"]["image_url"], "http://10.10.10.100/sonic.bin")
+
+    def test_rate_limiter(self):
+        limiter = RateLimiter(100)
+        start = time.monotonic()
+        for _ in range(11):
+            limiter.wait()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
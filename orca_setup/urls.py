@@ -7,4 +7,5 @@ urlpatterns = [
     path("install_image", setup.install_image, name="install_image"),
     path("celery", views.celery_task, name="celery_task"),
     path("discover", views.discover, name="discover"),
+    path("discover/progress", views.discovery_progress, name="discovery_progress"),
 ]
\ No newline at end of file
@@ -1,13 +1,22 @@
 import ast
-import json
+import datetime
 
+from celery.result import GroupResult
+from django.core.paginator import Paginator, EmptyPage
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django_celery_results.models import TaskResult
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 from log_manager.logger import get_backend_logger
-from orca_backend.celery import cancel_task
+from log_manager.retention import load_task_result
+from orca_backend.celery import app, cancel_task
+from orca_setup.models import TaskDevice
+from orca_setup.progress import DiscoveryEventStream, StreamLimitExceeded, stream_poll_interval
+from orca_setup.task_records import flush_task_records
 from orca_setup.tasks import discovery_task, create_tasks
 
 _logger = get_backend_logger()
@@ -16,20 +25,54 @@ _logger = get_backend_logger()
 @api_view(["GET", "DELETE"])
 def celery_task(request):
     """
-    This function is an API view that handles the HTTP DELETE requests for the 'cancel_celery_task' endpoint.
+    This function is an API view that handles the HTTP GET and DELETE requests for the 'celery_task' endpoint.
+    GET returns one task by task_id, the tasks of a request by the group task_id returned when it was created,
+    several tasks by task_ids (comma separated or repeated), or lists tasks
+    filtered by status, http_path, device_ip and a from/to range of creation time, newest first.
+    Lists are paginated with page and size.
     """
     result = []
     if request.method == "GET":
+        flush_task_records()
         task_id = request.GET.get("task_id", None)
         if task_id:
-            data = _modify_celery_results(TaskResult.objects.get_task(task_id=task_id))
-        else:
-            data = [_modify_celery_results(i) for i in TaskResult.objects.all()]
-        return (
-            Response(data, status=status.HTTP_200_OK)
-            if data
-            else Response({}, status=status.HTTP_204_NO_CONTENT)
-        )
+            group_result = GroupResult.restore(task_id, app=app)
+            if group_result is not None:
+                tasks = TaskResult.objects.filter(task_id__in=[i.id for i in group_result.results])
+                data = [_modify_celery_results(i) for i in tasks.order_by("-date_created")]
+            else:
+                data = _modify_celery_results(TaskResult.objects.get_task(task_id=task_id))
+            return (
+                Response(data, status=status.HTTP_200_OK)
+                if data
+                else Response({}, status=status.HTTP_204_NO_CONTENT)
+            )
+        try:
+            tasks = _filter_celery_results(request.GET)
+        except ValueError as e:
+            _logger.error("Invalid task filter: %s", e)
+            return Response({"result": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        total = None
+        if "page" in request.GET or "size" in request.GET:
+            try:
+                page = _positive_int(request.GET, "page", 1)
+                size = _positive_int(request.GET, "size", 10)
+            except ValueError as e:
+                _logger.error("Invalid task pagination: %s", e)
+                return Response({"result": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                paginator = Paginator(tasks, size)
+                total = paginator.count
+                tasks = paginator.page(page).object_list
+            except EmptyPage:
+                return Response({}, status=status.HTTP_204_NO_CONTENT)
+        data = [_modify_celery_results(i) for i in tasks]
+        if not data:
+            return Response({}, status=status.HTTP_204_NO_CONTENT)
+        response = Response(data, status=status.HTTP_200_OK)
+        if total is not None:
+            response["X-Total-Count"] = str(total)
+        return response
     if request.method == "DELETE":
         req_data_list = (
             request.data if isinstance(request.data, list) else [request.data]
@@ -58,6 +101,66 @@ def celery_task(request):
         return Response({"result": result}, status=status.HTTP_200_OK)
 
 
+def _positive_int(query_params, param, default):
+    """
+    Get a positive integer query parameter.
+
+    Args:
+        query_params (QueryDict): The query parameters of the request.
+        param (str): The name of the parameter.
+        default (int): The value if the parameter is not given.
+
+    Returns:
+        int: The value of the parameter.
+
+    Raises:
+        ValueError: If the value is not a positive integer.
+    """
+    value = query_params.get(param, default)
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {param} {value}, expected a positive integer.")
+    if value < 1:
+        raise ValueError(f"Invalid {param} {value}, expected a positive integer.")
+    return value
+
+
+def _filter_celery_results(query_params):
+    """
+    Build the task query of the celery task listing.
+
+    Args:
+        query_params (QueryDict): The query parameters of the request.
+
+    Returns:
+        QuerySet: The matching tasks, newest first.
+
+    Raises:
+        ValueError: If a time range value is not a valid date time.
+    """
+    tasks = TaskResult.objects.all()
+    task_ids = [i for value in query_params.getlist("task_ids") for i in value.split(",") if i]
+    if task_ids:
+        tasks = tasks.filter(task_id__in=task_ids)
+    statuses = [i.upper() for value in query_params.getlist("status") for i in value.split(",") if i]
+    if statuses:
+        tasks = tasks.filter(status__in=statuses)
+    for param, lookup in (("from", "date_created__gte"), ("to", "date_created__lte")):
+        value = query_params.get(param)
+        if value:
+            date = parse_datetime(value)
+            if date is None:
+                raise ValueError(f"Invalid {param} date time {value}.")
+            if timezone.is_naive(date):
+                date = timezone.make_aware(date, datetime.timezone.utc)
+            tasks = tasks.filter(**{lookup: date})
+    device_filter = {key: query_params[key] for key in ("device_ip", "http_path") if query_params.get(key)}
+    if device_filter:
+        tasks = tasks.filter(task_id__in=TaskDevice.objects.filter(**device_filter).values("task_id"))
+    return tasks.order_by("-date_created")
+
+
 def _modify_celery_results(result):
     try:
         task_kwargs = ast.literal_eval(result.task_kwargs.strip('\"')) if result.task_kwargs else {}
@@ -70,7 +173,7 @@ def _modify_celery_results(result):
         "status_code": 200,
         "http_method": "PUT",
         "processing_time": (result.date_done - result.date_created).total_seconds(),
-        "response": json.loads(result.result),
+        "response": load_task_result(result.result),
         "request_json": task_kwargs,
         "http_path": http_path,
         "task_id": result.task_id,
@@ -102,4 +205,40 @@ def discover(request):
                 result.append({"message": f"{request.method}: request successful", "status": "success", **task_details})
             except Exception as e:
                 result.append({"message": f"{request.method}: request failed with error: {e}", "status": "failed"})
-        return Response({"result": result}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({"result": result}, status=status.HTTP_200_OK)
+
+
+@api_view(["GET"])
+def discovery_progress(request):
+    """
+    This function is an API view that streams discovery progress events as server-sent events.
+    Events can be filtered by task_id and device_ip, the stream ends when the given task has finished.
+    Reconnecting clients resume from the Last-Event-ID header or the last_event_id query parameter.
+    Every stream holds a server thread for up to 10 minutes, at most 8 streams are open at once
+    and further clients get 503 with Retry-After.
+    """
+    if request.method == "GET":
+        last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id", 0)
+        try:
+            last_event_id = int(last_event_id)
+        except ValueError:
+            _logger.error("Invalid last_event_id %s.", last_event_id)
+            return Response(
+                {"result": "Invalid last_event_id."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            events = DiscoveryEventStream(
+                last_event_id=last_event_id,
+                task_id=request.GET.get("task_id", None),
+                device_ip=request.GET.get("device_ip", None),
+            )
+        except StreamLimitExceeded as e:
+            _logger.warning(e)
+            response = Response({"result": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response["Retry-After"] = str(stream_poll_interval * 5)
+            return response
+        response = StreamingHttpResponse(events, content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response